@@ -0,0 +1,55 @@
+"""
+Compares the per-call time of fitting a line through the origin with an
+astropy fitter and model, as `fit_line` used to, with `fit_line`::
+
+    python benchmarks/line_fit.py [--points 5 30 150] [--calls 2000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from astropy.modeling import fitting, models
+
+from hubbleds.utils import fit_line
+
+
+def astropy_fit_line(x, y):
+    fit = fitting.LinearLSQFitter()
+    line_init = models.Linear1D(intercept=0, fixed={"intercept": True})
+    return fit(line_init, x, y)
+
+
+def per_call(func, x, y, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(x, y)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[5, 30, 150])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for points in args.points:
+        x = rng.uniform(10, 500, points)
+        y = 70 * x + rng.normal(0, 1000, points)
+
+        assert np.isclose(astropy_fit_line(x, y).slope.value, fit_line(x, y).slope)
+
+        baseline = per_call(astropy_fit_line, x, y, args.calls)
+        closed_form = per_call(fit_line, x, y, args.calls)
+
+        print(f"{points} points")
+        print(f"  astropy LinearLSQFitter + Linear1D: {baseline * 1e6:8.1f} us")
+        print(
+            f"  fit_line (closed form):             {closed_form * 1e6:8.1f} us"
+            f"  ({baseline / closed_form:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares parsing a measurements response one model at a time, as the API
+client used to, with validating the whole body in one pass::
+
+    python benchmarks/payload_parsing.py [--rows 50000] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from hubbleds.payloads import parse_measurements
+from hubbleds.state import StudentMeasurement
+
+
+def synthetic_payload(rows: int, seed: int = 42) -> bytes:
+    rng = random.Random(seed)
+    galaxies = [
+        {
+            "id": i,
+            "name": f"{i:04d}_galaxy.fits",
+            "ra": rng.uniform(0, 360),
+            "decl": rng.uniform(-30, 70),
+            "z": rng.uniform(0.01, 0.1),
+            "type": "Sp",
+            "element": rng.choice(["H-α", "Mg-I"]),
+        }
+        for i in range(500)
+    ]
+    measurements = [
+        {
+            "student_id": rng.randrange(1, 5000),
+            "class_id": rng.randrange(1, 200),
+            "obs_wave_value": rng.uniform(5000, 7500),
+            "velocity_value": rng.uniform(1000, 30000),
+            "ang_size_value": rng.uniform(10, 200),
+            "est_dist_value": rng.uniform(10, 500),
+            "measurement_number": None,
+            "brightness": 1,
+            "galaxy": rng.choice(galaxies),
+        }
+        for _ in range(rows)
+    ]
+    return json.dumps({"measurements": measurements}).encode()
+
+
+def per_model(content: bytes) -> list[StudentMeasurement]:
+    return [StudentMeasurement(**m) for m in json.loads(content)["measurements"]]
+
+
+def best_of(func, content: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = synthetic_payload(args.rows)
+    print(f"{args.rows} rows, {len(content) / 2**20:.1f} MiB")
+
+    assert per_model(content) == parse_measurements(content)
+
+    baseline = best_of(per_model, content, args.repeat)
+    bulk = best_of(parse_measurements, content, args.repeat)
+    decode_only = best_of(json.loads, content, args.repeat)
+
+    print(f"json.loads + StudentMeasurement(**m): {baseline:8.3f} s")
+    print(f"parse_measurements (single pass):     {bulk:8.3f} s  ({baseline / bulk:.1f}x)")
+    print(f"json.loads only (no models):          {decode_only:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,8 @@ from cosmicds.components import ScaffoldAlert
 from cosmicds.logger import setup_logger
 
 # hubbleds
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.write_queue import get_write_queue
 from hubbleds.base_component_state import (
     transition_to,
     transition_previous,
@@ -45,22 +46,26 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
     
     async def _load_component_state():
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         logger.info("Finished loading component state")
         loaded_component_state.set(True)
     
     solara.lab.use_task(_load_component_state)
     
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-
-        logger.info("Wrote component state to database.")
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
     # === Setup Glue ===
     
@@ -96,12 +101,15 @@ def Page():
             solara.Text(f"free_responses: {LOCAL_STATE.value.free_responses}")
 
     
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     # convenience function
     NoInteractScaffoldAlert = partial(
         ScaffoldAlert, 
         event_next_callback=lambda _: transition_next(COMPONENT_STATE),
         event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-        can_advance=COMPONENT_STATE.value.can_transition(next=True)
+        can_advance=can_advance
     )
     
     logger.info(f"Current step: {COMPONENT_STATE.value.current_step}")
@@ -119,7 +127,7 @@ def Page():
                 GUIDELINE_ROOT / "guideline_mark2.vue",
                 event_next_callback = lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback = lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.mark2),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -133,9 +141,9 @@ def Page():
                 GUIDELINE_ROOT / "guideline_mark3.vue",
                 event_next_callback = lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback = lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.mark3),
-                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
                     'free_response': get_free_response(LOCAL_STATE, COMPONENT_STATE,'fr-1')
                 }
@@ -6,6 +6,7 @@ from pydantic import field_validator
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker 
 from hubbleds.base_component_state import BaseComponentState
+from hubbleds.gate_cache import gate
 from hubbleds.state import LOCAL_STATE
 
 import enum
@@ -30,15 +31,15 @@ class ComponentState(BaseState, BaseComponentState):
             return Marker(v)
         return v
     
-    @property
+    @gate(fields=["button_clicked"])
     def mark2_gate(self) -> bool:
         return self.button_clicked
     
-    @property
+    @gate(questions=["mc-2"])
     def mark3_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("mc-2")
     
-    @property
+    @gate(questions=["fr-1"])
     def mark4_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("fr-1")
 
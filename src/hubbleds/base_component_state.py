@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
+from hubbleds.gate_cache import gate_names, get_gate_cache
 from solara import Reactive
 from solara.toestand import Ref
 
@@ -60,7 +61,35 @@ class BaseComponentState:
                 return False  # TODO: Fix once we sort out transitions between stages
             step = self.current_step.previous(self.current_step)
 
-        return getattr(self, f"{step.name}_gate", True)
+        return self.gate_open(step)
+
+    def gate_open(self, step: BaseMarker) -> bool:
+        """
+        Whether the gate of `step` is open. Gate values are cached for the
+        session and only evaluated again once the state they read changes.
+        """
+        return get_gate_cache(type(self)).evaluate(self, f"{step.name}_gate")
+
+    def reachable_steps(self) -> tuple[bool, ...]:
+        """
+        Whether the gate of each step of the stage is open, in step order.
+        Pages look this up once per render (see `can_advance`), which also
+        subscribes them to the responses the gates read.
+        """
+        cache = get_gate_cache(type(self))
+        return tuple(
+            cache.evaluate(self, name) for name in gate_names(type(self.current_step))
+        )
+
+    def can_advance(self, reachable_steps: tuple[bool, ...]) -> bool:
+        """
+        Whether the next step can be transitioned to, as
+        ``can_transition(next=True)``, from the result of `reachable_steps`.
+        """
+        if self.current_step is self.current_step.last():
+            return False  # TODO: Fix once we sort out transitions between stages
+        # Step values start at 1, so this is the index of the next step
+        return reachable_steps[self.current_step.value]
 
     def current_step_between(self, start: BaseMarker, end: BaseMarker = None):
         end = end or self.current_step.last()
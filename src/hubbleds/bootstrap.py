@@ -0,0 +1,213 @@
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+from hubbleds.utils import HUBBLE_TIME_GYR, data_version
+
+logger = setup_logger("BOOTSTRAP")
+
+# Resamples drawn for each group unless asked otherwise
+BOOTSTRAP_RESAMPLES = 1000
+# Upper bound on the number of resampled points held at once. Resamples are
+#  drawn in chunks of this many points, e.g. 10k resamples of 100 points each
+BOOTSTRAP_CHUNK_POINTS = 1 << 20
+# Confidence levels (in percent) of the bands in `BootstrapResult.bands`
+BOOTSTRAP_LEVELS = (50, 68, 95)
+# Bootstrap results kept by `BOOTSTRAP_CACHE`
+BOOTSTRAP_CACHE_SIZE = 32
+
+
+def _resample_hubble(
+    distances: np.ndarray,
+    velocities: np.ndarray,
+    starts: np.ndarray,
+    counts: np.ndarray,
+    n_resamples: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """
+    Draw `n_resamples` resamples of the points of every group at once and
+    fit each of them through the origin. The points are sorted by group,
+    with group `i` at ``starts[i]:starts[i] + counts[i]``.
+
+    Returns an (n_resamples, n_groups) array of slopes.
+    """
+    rng = np.random.default_rng(seed)
+    group_starts = np.repeat(starts, counts)
+    group_counts = np.repeat(counts, counts)
+
+    picks = rng.random((n_resamples, len(distances)))
+    picks = group_starts + (picks * group_counts).astype(np.intp)
+
+    d = distances[picks]
+    v = velocities[picks]
+    sum_xy = np.add.reduceat(d * v, starts, axis=1)
+    sum_xx = np.add.reduceat(d * d, starts, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sum_xy / sum_xx
+
+
+@dataclass(frozen=True)
+class BootstrapResult:
+    """
+    Bootstrap distributions of the Hubble constant and age for each group,
+    as (n_groups, n_resamples) arrays in the order of `ids`. Groups without
+    any complete measurements have NaN distributions.
+    """
+
+    ids: np.ndarray
+    hubble_fit_value: np.ndarray
+    age_value: np.ndarray
+    count: np.ndarray
+
+    def interval(
+        self, percent: float, field: str = "age_value"
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The lower and upper ends of the central `percent` interval of each
+        group's distribution.
+        """
+        tail = (100 - percent) / 2
+        with warnings.catch_warnings():
+            # Groups without complete measurements are all NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            low, high = np.nanpercentile(
+                getattr(self, field), [tail, 100 - tail], axis=1
+            )
+        return low, high
+
+    def bands(
+        self, levels: Iterable[float] = BOOTSTRAP_LEVELS, field: str = "age_value"
+    ) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        return {f"{level}%": self.interval(level, field) for level in levels}
+
+
+def bootstrap_hubble_fit(
+    ids,
+    distances,
+    velocities,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int | None = 0,
+    chunk_points: int = BOOTSTRAP_CHUNK_POINTS,
+    executor: ProcessPoolExecutor | None = None,
+) -> BootstrapResult:
+    """
+    Bootstrap the through-origin Hubble fit of each group (e.g. student or
+    class) of measurements, resampling the (distance, velocity) pairs of a
+    group with replacement.
+
+    Resamples are drawn in chunks of at most `chunk_points` resampled
+    points, each chunk covering all groups at once. Chunks run on
+    `executor` if one is given. Every chunk has its own seed spawned from
+    `seed`, so the results do not depend on whether or how the work is
+    spread out.
+
+    Measurements missing a distance or a velocity (None or NaN) are left out.
+    """
+    group_ids, inverse = np.unique(np.asarray(ids), return_inverse=True)
+    distances = np.asarray(distances, dtype=float)
+    velocities = np.asarray(velocities, dtype=float)
+
+    complete = np.isfinite(distances) & np.isfinite(velocities)
+    inverse = inverse.ravel()[complete]
+    order = np.argsort(inverse, kind="stable")
+    inverse = inverse[order]
+    distances = distances[complete][order]
+    velocities = velocities[complete][order]
+
+    n_groups = len(group_ids)
+    count = np.bincount(inverse, minlength=n_groups)
+    fitted = count > 0
+    starts = np.searchsorted(inverse, np.flatnonzero(fitted))
+    counts = count[fitted]
+
+    hubble = np.full((n_groups, n_resamples), np.nan)
+    if len(distances) and n_resamples > 0:
+        chunk = max(1, chunk_points // len(distances))
+        sizes = [min(chunk, n_resamples - i) for i in range(0, n_resamples, chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        args = [
+            (distances, velocities, starts, counts, size, chunk_seed)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+        if executor is None:
+            slopes = [_resample_hubble(*a) for a in args]
+        else:
+            slopes = list(executor.map(_resample_hubble, *zip(*args)))
+        hubble[fitted] = np.concatenate(slopes, axis=0).T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        age = HUBBLE_TIME_GYR / hubble
+
+    return BootstrapResult(group_ids, hubble, age, count)
+
+
+class BootstrapCache:
+    """
+    Process-wide cache of bootstrap results, keyed by a label for the data,
+    the version of the data (see `data_version`) and the resampling
+    settings. Sessions showing the same class or all-class data share one
+    result, and it is only recomputed when the data changes.
+    """
+
+    def __init__(self, max_size: int = BOOTSTRAP_CACHE_SIZE):
+        self.max_size = max_size
+        self._results: OrderedDict[tuple, BootstrapResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        label: str,
+        ids,
+        distances,
+        velocities,
+        n_resamples: int = BOOTSTRAP_RESAMPLES,
+        seed: int | None = 0,
+        executor: ProcessPoolExecutor | None = None,
+    ) -> BootstrapResult:
+        key = (
+            label,
+            data_version(ids, distances, velocities),
+            n_resamples,
+            seed,
+        )
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+
+        result = bootstrap_hubble_fit(
+            ids,
+            distances,
+            velocities,
+            n_resamples=n_resamples,
+            seed=seed,
+            executor=executor,
+        )
+        logger.info(
+            "Bootstrapped %d groups of `%s` with %d resamples.",
+            len(result.ids),
+            label,
+            n_resamples,
+        )
+
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+BOOTSTRAP_CACHE = BootstrapCache()
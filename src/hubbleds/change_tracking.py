@@ -0,0 +1,131 @@
+import copy
+from typing import Any
+
+from cosmicds.state import GlobalState
+from hubbleds.serialization import StoryStateSerializer
+from hubbleds.state import LocalState, StudentMeasurement, NON_STORY_STATE_FIELDS
+
+MeasurementKey = tuple[int, str | None]
+
+
+def measurement_key(measurement: StudentMeasurement) -> MeasurementKey:
+    return measurement.galaxy_id, measurement.measurement_number
+
+
+def story_state_fields(local_state: LocalState) -> list[str]:
+    return [
+        field
+        for field in local_state.__class__.model_fields
+        if field not in NON_STORY_STATE_FIELDS
+    ]
+
+
+class ChangeTracker:
+    """
+    Remembers what one session last wrote to the database successfully, so
+    that writers only send the measurements and story state fields that have
+    changed since then.
+
+    Changes are found by comparing against the stored copies rather than by
+    hooking every setter, as state objects in the app are replaced through
+    `Ref(...).set` and occasionally mutated in place.
+    """
+
+    def __init__(self):
+        self._measurements: dict[MeasurementKey, dict] = {}
+        self._example_measurements: dict[MeasurementKey, dict] = {}
+        self._app: dict | None = None
+        self._story: dict[str, Any] = {}
+        # Encoded fields of the story state, reused by later writes
+        self.serializer = StoryStateSerializer()
+        # The story state document the server last acknowledged, and the hash
+        #  it gave for it, which delta writes are based on
+        self.story_document: dict | None = None
+        self.story_hash: str | None = None
+
+    def _written_measurements(self, samples: bool) -> dict[MeasurementKey, dict]:
+        return self._example_measurements if samples else self._measurements
+
+    @staticmethod
+    def _measurement_payload(measurement: StudentMeasurement) -> dict:
+        return measurement.model_dump(exclude={"galaxy"})
+
+    def changed_measurements(
+        self, measurements: list[StudentMeasurement], samples: bool = False
+    ) -> list[StudentMeasurement]:
+        """
+        The measurements that differ from what was last written.
+        """
+        written = self._written_measurements(samples)
+        return [
+            measurement
+            for measurement in measurements
+            if written.get(measurement_key(measurement))
+            != self._measurement_payload(measurement)
+        ]
+
+    def commit_measurements(
+        self, measurements: list[StudentMeasurement], samples: bool = False
+    ):
+        """
+        Record that the given measurements were written successfully.
+        """
+        written = self._written_measurements(samples)
+        for measurement in measurements:
+            written[measurement_key(measurement)] = self._measurement_payload(
+                measurement
+            )
+
+    def story_state_changes(
+        self, global_state: GlobalState, local_state: LocalState
+    ) -> dict[str, Any]:
+        """
+        The parts of the app and story state that differ from what was last
+        written, as ``{"app": ..., "story": {field: value}}``. Either key is
+        omitted if that part is unchanged, so an empty result means there is
+        nothing to write.
+
+        Values are copied, so the result can be committed after the write
+        has completed even if the live state changed in the meantime.
+        """
+        changes: dict[str, Any] = {}
+
+        app = global_state.model_dump()
+        if app != self._app:
+            changes["app"] = app
+
+        story = {}
+        for field in story_state_fields(local_state):
+            value = getattr(local_state, field)
+            if field not in self._story or self._story[field] != value:
+                story[field] = copy.deepcopy(value)
+        if story:
+            changes["story"] = story
+
+        return changes
+
+    def commit_story_state(self, changes: dict[str, Any]):
+        """
+        Record that the changes returned by `story_state_changes` were
+        written successfully.
+        """
+        if "app" in changes:
+            self._app = changes["app"]
+        self._story.update(changes.get("story", {}))
+
+    def acknowledge_story_document(self, document: dict, state_hash: str | None):
+        """
+        Record the story state document the server holds after a write, and
+        its hash. Without a hash, the next write cannot be a delta write.
+        """
+        self.story_document = document if state_hash is not None else None
+        self.story_hash = state_hash
+
+    def mark_written(self, global_state: GlobalState, local_state: LocalState):
+        """
+        Treat the given state as what the database currently holds, e.g.
+        right after it was loaded from there.
+        """
+        self.commit_story_state(self.story_state_changes(global_state, local_state))
+        self.commit_measurements(local_state.measurements)
+        self.commit_measurements(local_state.example_measurements, samples=True)
@@ -5,6 +5,8 @@ from hubbleds.state import LOCAL_STATE
 from hubbleds.widgets import SelectionToolWidget
 from typing import Callable
 from hubbleds.state import GalaxyData
+from hubbleds.spectrum_prefetch import SpectrumPrefetcher
+from hubbleds.galaxy_catalog import GALAXY_CATALOG
 
 
 @solara.component
@@ -21,10 +23,12 @@ def SelectionTool(
             tool_container = rv.Html(tag="div")
 
         def _add_widget():
+            catalog = GALAXY_CATALOG.get(LOCAL_STATE)
             selection_tool_widget = SelectionToolWidget(
                 table_layer_data={
-                    k: [x.dict()[k] for x in LOCAL_STATE.value.galaxies.values()]
-                    for k in ["id", "ra", "decl"]
+                    "id": catalog.ids,
+                    "ra": catalog.ra,
+                    "decl": catalog.decl,
                 }
             )
 
@@ -41,6 +45,11 @@ def SelectionTool(
 
         solara.use_effect(_add_widget, dependencies=[])
 
+        prefetcher = solara.use_memo(
+            lambda: SpectrumPrefetcher(LOCAL_STATE), dependencies=[]
+        )
+        solara.use_effect(lambda: prefetcher.cancel, dependencies=[])
+
         def _on_galaxy_selected(gal: dict):
             data = LOCAL_STATE.value.galaxies[int(gal["id"])]
             galaxy_added_callback(data)
@@ -50,6 +59,16 @@ def SelectionTool(
             data = LOCAL_STATE.value.galaxies[int(gal["id"])]
             galaxy_selected_callback(data)
 
+        def _on_candidate_galaxy_changed(change: dict):
+            gal = change["new"]
+            if not gal:
+                return
+
+            # Warm the spectrum cache before the student picks this galaxy
+            data = LOCAL_STATE.value.galaxies.get(int(gal["id"]))
+            if data is not None:
+                prefetcher.prefetch_near(data)
+
         def _setup_callbacks():
             selection_tool_widget = solara.get_widget(tool_container).children[0]
 
@@ -58,6 +77,10 @@ def SelectionTool(
                 _on_current_galaxy_changed,
                 ["current_galaxy"],
             )
+            selection_tool_widget.observe(
+                _on_candidate_galaxy_changed,
+                ["candidate_galaxy"],
+            )
             selection_tool_widget.deselect_galaxy = deselect_galaxy_callback
 
         solara.use_effect(_setup_callbacks, dependencies=[])
@@ -72,6 +95,11 @@ def SelectionTool(
             if show_galaxies:
                 selection_tool_widget.center_on_start_coordinates()
 
+                start = selection_tool_widget.START_COORDINATES
+                prefetcher.prefetch_around(start.ra.deg, start.dec.deg)
+            else:
+                prefetcher.cancel()
+
         solara.use_effect(
             _update_selection, dependencies=[show_galaxies]
         )
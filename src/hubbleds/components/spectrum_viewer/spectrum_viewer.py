@@ -3,7 +3,8 @@ from typing import Callable, Optional
 import plotly.graph_objects as go
 import reacton.ipyvuetify as rv
 import solara
-from hubbleds.state import GalaxyData
+from hubbleds.state import GalaxyData, LOCAL_STATE
+from hubbleds.remote import ASYNC_LOCAL_API
 from pandas import DataFrame
 from hubbleds.components.spectrum_viewer.plotly_figure import FigurePlotly
 from cosmicds.logger import setup_logger
@@ -52,7 +53,11 @@ def SpectrumViewer(
         if galaxy_data is None:
             return False
 
-        return galaxy_data.spectrum_as_data_frame
+        spec_data = await ASYNC_LOCAL_API.load_spectrum_data(galaxy_data, LOCAL_STATE)
+        if spec_data is None:
+            return None
+
+        return spec_data.as_data_frame()
 
     spec_data_task = solara.lab.use_task(   # noqa: SH101 
         _load_spectrum,
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from hubbleds.galaxy_catalog import GalaxyCatalog
+from hubbleds.measurement_table import MeasurementTable
+from hubbleds.state import ELEMENT_REST
+from hubbleds.utils import (
+    age_in_gyr_simple,
+    distance_from_angular_size,
+    velocity_from_wavelengths,
+)
+
+# Monte Carlo samples drawn unless asked otherwise
+PROPAGATION_SAMPLES = 10_000
+# Default 1-sigma measurement errors, of an observed wavelength in angstroms
+#  and of an angular size in arcseconds
+OBS_WAVE_SIGMA = 5.0
+ANG_SIZE_SIGMA = 5.0
+
+
+@dataclass(frozen=True)
+class PropagationResult:
+    """
+    Monte Carlo distributions of the Hubble constant and age of each student,
+    as (n_students, n_samples) arrays in the order of `ids`. A sample is NaN
+    for a student if none of their perturbed measurements could be used.
+    """
+
+    ids: np.ndarray
+    hubble_fit_value: np.ndarray
+    age_value: np.ndarray
+
+    def spread(
+        self, field: str = "age_value", percent: float = 68
+    ) -> dict[str, np.ndarray]:
+        """
+        The mean, standard deviation and central `percent` interval of each
+        student's distribution.
+        """
+        samples = getattr(self, field)
+        tail = (100 - percent) / 2
+        low, high = np.nanpercentile(samples, [tail, 100 - tail], axis=1)
+        return {
+            "mean": np.nanmean(samples, axis=1),
+            "std": np.nanstd(samples, axis=1),
+            "low": low,
+            "high": high,
+        }
+
+
+def _perturb(
+    rng: np.random.Generator, values: np.ndarray, sigma, n_samples: int
+) -> np.ndarray:
+    # Samples are single precision, which is ample for values that the
+    #  conversions round to whole km/s and Mpc, and much faster to draw
+    samples = rng.standard_normal((n_samples, len(values)), dtype=np.float32)
+    samples *= np.asarray(sigma, dtype=np.float32)
+    samples += values.astype(np.float32)
+    return samples
+
+
+def _ordered(values, order: np.ndarray):
+    # Scalar errors apply to every measurement as they are
+    values = np.asarray(values, dtype=float)
+    return values if values.ndim == 0 else values[order]
+
+
+def propagate_measurement_errors(
+    student_ids,
+    obs_wave_values,
+    rest_wave_values,
+    ang_size_values,
+    obs_wave_sigma=OBS_WAVE_SIGMA,
+    ang_size_sigma=ANG_SIZE_SIGMA,
+    n_samples: int = PROPAGATION_SAMPLES,
+    seed: int | None = None,
+) -> PropagationResult:
+    """
+    Propagate measurement errors in observed wavelength and angular size to
+    the Hubble constant and age of each student.
+
+    Every sample perturbs all measurements at once with Gaussian errors,
+    as (n_samples, n_measurements) arrays, converts them to velocities and
+    distances as the stages do, and fits each student's data through the
+    origin. The errors may be scalars or given per measurement.
+
+    Measurements with a missing value are left out, as are perturbed
+    angular sizes that are not positive.
+    """
+    # SFC64 draws noticeably faster than the default PCG64 for this many samples
+    rng = np.random.Generator(np.random.SFC64(seed))
+    ids, inverse = np.unique(np.asarray(student_ids), return_inverse=True)
+
+    # Measurements of each student next to each other, so that their sums
+    #  are taken over contiguous runs of columns
+    inverse = inverse.ravel()
+    order = np.argsort(inverse, kind="stable")
+    starts = np.searchsorted(inverse[order], np.arange(len(ids)))
+    obs_wave = _ordered(obs_wave_values, order)
+    rest_wave = _ordered(rest_wave_values, order)
+    ang_size = _ordered(ang_size_values, order)
+    obs_wave_sigma = _ordered(obs_wave_sigma, order)
+    ang_size_sigma = _ordered(ang_size_sigma, order)
+
+    complete = (
+        np.isfinite(obs_wave) & np.isfinite(rest_wave) & np.isfinite(ang_size)
+    )
+
+    obs_samples = _perturb(rng, obs_wave, obs_wave_sigma, n_samples)
+    ang_samples = _perturb(rng, ang_size, ang_size_sigma, n_samples)
+    unusable = ~(complete & (ang_samples > 0))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocities = velocity_from_wavelengths(obs_samples, rest_wave.astype(np.float32))
+        distances = distance_from_angular_size(ang_samples)
+    velocities[unusable] = 0
+    distances[unusable] = 0
+
+    if len(ids):
+        sum_xy = np.add.reduceat(distances * velocities, starts, axis=1)
+        sum_xx = np.add.reduceat(distances * distances, starts, axis=1)
+    else:
+        sum_xy = sum_xx = np.empty((n_samples, 0), dtype=np.float32)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hubble = (sum_xy / sum_xx).T.astype(float)
+        age = age_in_gyr_simple(hubble)
+
+    return PropagationResult(ids, hubble, age)
+
+
+def propagate_table_errors(
+    measurements: MeasurementTable,
+    catalog: GalaxyCatalog,
+    obs_wave_sigma=OBS_WAVE_SIGMA,
+    ang_size_sigma=ANG_SIZE_SIGMA,
+    n_samples: int = PROPAGATION_SAMPLES,
+    seed: int | None = None,
+) -> PropagationResult:
+    """
+    `propagate_measurement_errors` for a table of measurements, such as the
+    class measurements, taking rest wavelengths from the galaxy catalog.
+    """
+    # The same rest wavelengths as `GalaxyData.rest_wave_value`
+    rest_waves = {element: round(wave) for element, wave in ELEMENT_REST.items()}
+    galaxies = (catalog.by_id.get(int(i)) for i in measurements.galaxy_id)
+    rest_wave = np.array(
+        [rest_waves[galaxy.element] if galaxy else np.nan for galaxy in galaxies]
+    )
+    return propagate_measurement_errors(
+        measurements.student_id,
+        measurements.obs_wave_value,
+        rest_wave,
+        measurements.ang_size_value,
+        obs_wave_sigma=obs_wave_sigma,
+        ang_size_sigma=ang_size_sigma,
+        n_samples=n_samples,
+        seed=seed,
+    )
@@ -15,7 +15,9 @@ from .viewer_marker_colors import (
 )
 
 from .utils import _add_link
-from .state import StudentMeasurement
+from .state import StudentMeasurement, LocalState
+from .example_seed import EXAMPLE_SEED_CACHE
+from solara import Reactive
 
 
 def create_measurement_subsets(gjapp: JupyterApplication, data: Data):
@@ -56,6 +58,33 @@ def link_example_seed_and_measurements(gjapp: JupyterApplication):
         _add_link(gjapp, egsd, DB_DISTANCE_FIELD, example_data, "est_dist_value")
 
 
+def add_example_seed_data(gjapp: JupyterApplication, local_state: Reactive[LocalState]):
+    """
+    Add the example galaxy seed data, and its first and second measurement
+    splits, to the data collection of a session. The columns are shared by
+    all sessions; only the glue `Data` wrappers are created per session, as
+    they hold session state such as subsets and styles.
+    """
+    if EXAMPLE_GALAXY_SEED_DATA in gjapp.data_collection:
+        return
+
+    seed = EXAMPLE_SEED_CACHE.get(local_state)
+
+    data = Data(label=EXAMPLE_GALAXY_SEED_DATA, **seed.both)
+    gjapp.data_collection.append(data)
+
+    # create 'first measurement' and 'second measurement' datasets
+    # create_measurement_subsets(gjapp, data)
+    first = Data(label=EXAMPLE_GALAXY_SEED_DATA + '_first', **seed.first)
+    first.style.color = GENERIC_COLOR
+    gjapp.data_collection.append(first)
+    second = Data(label=EXAMPLE_GALAXY_SEED_DATA + '_second', **seed.second)
+    second.style.color = GENERIC_COLOR
+    gjapp.data_collection.append(second)
+
+    link_seed_data(gjapp)
+
+
 def link_seed_data(gjapp):
     if EXAMPLE_GALAXY_SEED_DATA in gjapp.data_collection:
         egsd = gjapp.data_collection[EXAMPLE_GALAXY_SEED_DATA]
@@ -0,0 +1,124 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from solara import Reactive
+
+from cosmicds.logger import setup_logger
+from hubbleds.state import LocalState
+
+logger = setup_logger("EXAMPLE-SEED")
+
+# Seconds before the seed measurements of a story are downloaded again
+EXAMPLE_SEED_REFRESH = 15 * 60
+
+Columns = dict[str, np.ndarray]
+
+
+def _columns(records: list[dict[str, Any]]) -> Columns:
+    if not records:
+        return {}
+    columns = {}
+    for key in records[0].keys():
+        column = np.asarray([r[key] for r in records])
+        column.flags.writeable = False
+        columns[key] = column
+    return columns
+
+
+@dataclass(frozen=True)
+class ExampleSeed:
+    """
+    The example galaxy seed measurements of a story, which are the same for
+    every student. Besides the records, it holds read-only columns for all
+    of them and for the first and second measurements only, from which each
+    session builds its glue data without copying.
+    """
+
+    records: tuple[dict[str, Any], ...]
+    both: Columns
+    first: Columns
+    second: Columns
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_records(cls, records: list[dict[str, Any]]) -> "ExampleSeed":
+        return cls(
+            records=tuple(records),
+            both=_columns(records),
+            first=_columns([r for r in records if r["measurement_number"] == "first"]),
+            second=_columns(
+                [r for r in records if r["measurement_number"] == "second"]
+            ),
+        )
+
+    def measurements(self, which="both") -> list[dict[str, Any]]:
+        if which == "both":
+            return list(self.records)
+        return [r for r in self.records if r["measurement_number"] == which]
+
+    def columns(self, which="both") -> Columns:
+        return {"both": self.both, "first": self.first, "second": self.second}[which]
+
+
+class ExampleSeedCache:
+    """
+    Process-wide cache of the example seed measurements of each story, which
+    are downloaded again at most every `refresh` seconds.
+    """
+
+    def __init__(self, refresh: float = EXAMPLE_SEED_REFRESH):
+        self.refresh = refresh
+        self._seeds: dict[str, ExampleSeed] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, seed: ExampleSeed | None) -> bool:
+        return seed is not None and time.monotonic() - seed.loaded_at < self.refresh
+
+    def get(self, local_state: Reactive[LocalState]) -> ExampleSeed:
+        story_id = local_state.value.story_id
+
+        seed = self._seeds.get(story_id)
+        if self._fresh(seed):
+            return seed
+
+        with self._lock:
+            seed = self._seeds.get(story_id)
+            if self._fresh(seed):
+                return seed
+
+            from hubbleds.remote import LOCAL_API
+
+            try:
+                records = LOCAL_API.get_example_seed_measurement(
+                    local_state, which="both"
+                )
+            except Exception:
+                if seed is None:
+                    raise
+                logger.exception(
+                    "Failed to refresh example seed measurements of story `%s`, "
+                    "keeping the previous ones.",
+                    story_id,
+                )
+                return seed
+
+            seed = self._seeds[story_id] = ExampleSeed.from_records(records)
+            logger.info(
+                "Loaded %d example seed measurements for story `%s`.",
+                len(records),
+                story_id,
+            )
+            return seed
+
+    def invalidate(self, story_id: str | None = None):
+        with self._lock:
+            if story_id is None:
+                self._seeds.clear()
+            else:
+                self._seeds.pop(story_id, None)
+
+
+EXAMPLE_SEED_CACHE = ExampleSeedCache()
@@ -0,0 +1,161 @@
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+import numpy as np
+from solara import Reactive
+
+from cosmicds.logger import setup_logger
+from hubbleds.state import GalaxyData, LocalState
+
+logger = setup_logger("GALAXY-CATALOG")
+
+# Seconds before a catalog is downloaded again
+CATALOG_TTL = 60 * 60
+# Seconds before a failed download is tried again, while the previous
+#  catalog keeps being served
+CATALOG_RETRY_AFTER = 60
+
+
+def _read_only(values, dtype) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class GalaxyCatalog:
+    """
+    An immutable snapshot of the galaxy catalog of a story, shared by every
+    session. Besides the galaxies themselves it holds their positions and
+    redshifts as read-only columns, in the same order as `galaxies`.
+    """
+
+    galaxies: tuple[GalaxyData, ...]
+    by_id: Mapping[int, GalaxyData]
+    index: Mapping[int, int]
+    ids: np.ndarray
+    ra: np.ndarray
+    decl: np.ndarray
+    z: np.ndarray
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_galaxies(cls, galaxies: Iterable[GalaxyData]) -> "GalaxyCatalog":
+        galaxies = tuple(galaxies)
+        return cls(
+            galaxies=galaxies,
+            by_id=MappingProxyType({g.id: g for g in galaxies}),
+            index=MappingProxyType({g.id: i for i, g in enumerate(galaxies)}),
+            ids=_read_only([g.id for g in galaxies], np.int64),
+            ra=_read_only([g.ra for g in galaxies], np.float64),
+            decl=_read_only([g.decl for g in galaxies], np.float64),
+            z=_read_only([g.z for g in galaxies], np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.galaxies)
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+class GalaxyCatalogStore:
+    """
+    Process-wide store of the galaxy catalog of each story. A catalog is
+    downloaded once and then handed out by reference until it is older than
+    `ttl` seconds or `refresh` is called. Concurrent requests for a missing
+    catalog, e.g. when a class logs in at once, wait for a single download.
+
+    Once a catalog has expired, the thread that downloads it again is the
+    only one to wait for it; the others keep getting the expired catalog in
+    the meantime. If the download fails, the expired catalog is kept for
+    another `retry_after` seconds before the next attempt.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL, retry_after: float = CATALOG_RETRY_AFTER):
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._catalogs: dict[str, GalaxyCatalog] = {}
+        # One lock per story, so that downloads of different stories do not
+        #  wait for each other
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _story_lock(self, story_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(story_id)
+            if lock is None:
+                lock = self._locks[story_id] = threading.Lock()
+        return lock
+
+    def get(self, local_state: Reactive[LocalState]) -> GalaxyCatalog:
+        story_id = local_state.value.story_id
+
+        catalog = self._catalogs.get(story_id)
+        if catalog is not None and catalog.age() < self.ttl:
+            return catalog
+
+        lock = self._story_lock(story_id)
+        if catalog is not None:
+            # Serve the expired catalog while another thread refreshes it
+            if not lock.acquire(blocking=False):
+                return catalog
+        else:
+            lock.acquire()
+
+        try:
+            # Another thread may have refreshed it while this one waited
+            catalog = self._catalogs.get(story_id)
+            if catalog is not None and catalog.age() < self.ttl:
+                return catalog
+            return self._load(local_state, catalog)
+        finally:
+            lock.release()
+
+    def refresh(self, local_state: Reactive[LocalState]) -> GalaxyCatalog:
+        story_id = local_state.value.story_id
+        with self._story_lock(story_id):
+            return self._load(local_state, self._catalogs.get(story_id))
+
+    def invalidate(self, story_id: str | None = None):
+        with self._lock:
+            if story_id is None:
+                self._catalogs.clear()
+            else:
+                self._catalogs.pop(story_id, None)
+
+    def _load(
+        self, local_state: Reactive[LocalState], stale: GalaxyCatalog | None
+    ) -> GalaxyCatalog:
+        from hubbleds.remote import LOCAL_API
+
+        story_id = local_state.value.story_id
+        try:
+            catalog = GalaxyCatalog.from_galaxies(LOCAL_API.get_galaxies(local_state))
+        except Exception:
+            if stale is None:
+                raise
+            logger.exception(
+                "Failed to refresh galaxy catalog of story `%s`, keeping the "
+                "previous one for another %d seconds.",
+                story_id,
+                self.retry_after,
+            )
+            # Stamped so that it expires again after `retry_after` seconds
+            stale = replace(
+                stale, loaded_at=time.monotonic() - self.ttl + self.retry_after
+            )
+            self._catalogs[story_id] = stale
+            return stale
+
+        self._catalogs[story_id] = catalog
+        logger.info(
+            "Loaded catalog of %d galaxies for story `%s`.", len(catalog), story_id
+        )
+        return catalog
+
+
+GALAXY_CATALOG = GalaxyCatalogStore()
@@ -0,0 +1,150 @@
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+import solara
+
+from hubbleds.response_store import FREE_RESPONSES, MC_SCORES
+
+
+class Gate(property):
+    """
+    A step gate property, along with the state it reads (see `gate`).
+    """
+
+    def __init__(
+        self,
+        fget: Callable[[Any], bool],
+        fields: Iterable[str] = (),
+        questions: Iterable[str] = (),
+    ):
+        super().__init__(fget)
+        self.fields = tuple(fields)
+        self.questions = tuple(questions)
+
+    def dependency_values(self, state) -> tuple:
+        """
+        The values of the state the gate reads. Reading the responses to its
+        questions subscribes the calling component to them.
+        """
+        values = tuple(getattr(state, name) for name in self.fields)
+        if self.questions:
+            from hubbleds.state import LOCAL_STATE
+
+            # Reading the local state subscribes to multiple choice scores,
+            #  which notify it. Free responses are updated quietly, so their
+            #  tags are subscribed to one by one.
+            local_state = LOCAL_STATE.value
+            responses = FREE_RESPONSES.entries_of(local_state)
+            scores = MC_SCORES.entries_of(local_state)
+            for tag in self.questions:
+                FREE_RESPONSES.entry(tag).value
+                values += ((responses.get(tag), scores.get(tag)),)
+        return values
+
+
+def gate(
+    fields: Iterable[str] = (), questions: Iterable[str] = ()
+) -> Callable[[Callable[[Any], bool]], Gate]:
+    """
+    Declare a step gate of a component state class, along with everything
+    it reads: fields of the component state, and questions (by tag) whose
+    completion it checks::
+
+        @gate(fields=["draw_click_count"], questions=["galaxy-trend"])
+        def bes_fit1_gate(self) -> bool:
+            return (
+                self.draw_click_count > 0
+                and LOCAL_STATE.value.question_completed("galaxy-trend")
+            )
+
+    The gate is only evaluated again once one of those changed (see
+    `GateCache`), so it must not read anything else. Component state fields
+    are replaced rather than changed in place, which is what is compared.
+    """
+
+    def decorator(fget: Callable[[Any], bool]) -> Gate:
+        return Gate(fget, fields, questions)
+
+    return decorator
+
+
+@lru_cache(maxsize=None)
+def _gate_property(cls: type, name: str) -> property | None:
+    # Looked up once per class, since most steps have no gate, and missing
+    #  attributes of pydantic models are slow to look up
+    prop = getattr(cls, name, None)
+    return prop if isinstance(prop, property) else None
+
+
+@lru_cache(maxsize=None)
+def gate_names(marker: type) -> tuple[str, ...]:
+    """
+    The names of the gates of the steps of a marker class, in step order.
+    """
+    return tuple(f"{step.name}_gate" for step in marker)
+
+
+class GateCache:
+    """
+    The last value of every gate of a component state class in one
+    session, with the values of the state it declared. Gates declared with
+    `gate` are only evaluated again once any of those change; other gates
+    are evaluated on every call, and steps without a gate are open.
+    """
+
+    def __init__(self):
+        self._values: dict[str, tuple[tuple, bool]] = {}
+
+    def evaluate(self, state, name: str) -> bool:
+        prop = _gate_property(type(state), name)
+        if prop is None:
+            return True
+        if not isinstance(prop, Gate):
+            return prop.fget(state)
+
+        current = prop.dependency_values(state)
+        cached = self._values.get(name)
+        if cached is not None and cached[0] == current:
+            return cached[1]
+
+        value = prop.fget(state)
+        self._values[name] = (current, value)
+        return value
+
+
+_CACHES: dict[tuple[str | None, type], GateCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def _kernel_id() -> str | None:
+    try:
+        return solara.get_kernel_id()
+    except RuntimeError:
+        return None
+
+
+def get_gate_cache(cls: type) -> GateCache:
+    """
+    The gate cache of a component state class for the current session.
+    """
+    key = (_kernel_id(), cls)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = GateCache()
+    return cache
+
+
+def _drop_caches_on_disconnect():
+    kernel_id = solara.get_kernel_id()
+
+    def cleanup():
+        with _CACHES_LOCK:
+            for key in [key for key in _CACHES if key[0] == kernel_id]:
+                del _CACHES[key]
+
+    return cleanup
+
+
+solara.lab.on_kernel_start(_drop_caches_on_disconnect)
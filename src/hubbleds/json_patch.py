@@ -0,0 +1,130 @@
+import copy
+import hashlib
+import json
+import math
+from typing import Any
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def document_hash(document: Any) -> str:
+    """
+    A digest of a JSON document that does not depend on the order of its
+    object members or on how it was formatted.
+    """
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _escape(key: str) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(old: Any, new: Any) -> bool:
+    # NaN is written as null, so two NaNs are the same value for a patch
+    if isinstance(old, float) and isinstance(new, float):
+        return old == new or (math.isnan(old) and math.isnan(new))
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(_same(a, b) for a, b in zip(old, new))
+    if isinstance(old, dict) and isinstance(new, dict):
+        return old.keys() == new.keys() and all(_same(old[k], new[k]) for k in old)
+    return type(old) is type(new) and old == new
+
+
+def diff(old: Any, new: Any, path: str = "") -> list[dict]:
+    """
+    An RFC 6902 JSON Patch that turns `old` into `new`. Objects are compared
+    member by member, so a change deep inside one is a single operation on
+    that member. Arrays and other values are replaced as a whole. Members
+    that are the same object in both documents are skipped without being
+    compared.
+    """
+    if old is new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = []
+        for key, value in new.items():
+            member = f"{path}/{_escape(key)}"
+            if key not in old:
+                patch.append({"op": "add", "path": member, "value": value})
+            else:
+                patch.extend(diff(old[key], value, member))
+        for key in old:
+            if key not in new:
+                patch.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        return patch
+    if _same(old, new):
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _tokens(path: str) -> list[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer `{path}`")
+    return [_unescape(token) for token in path[1:].split("/")]
+
+
+def apply(document: Any, patch: list[dict]) -> Any:
+    """
+    The result of applying an RFC 6902 JSON Patch with `add`, `remove` and
+    `replace` operations to a document. Only the containers along the
+    patched paths are copied, so `document` is left unchanged.
+    """
+    for operation in patch:
+        op = operation.get("op")
+        if op not in ("add", "remove", "replace"):
+            raise JsonPatchError(f"Unsupported operation `{op}`")
+        tokens = _tokens(operation.get("path", ""))
+
+        if not tokens:
+            if op == "remove":
+                raise JsonPatchError("Cannot remove the whole document")
+            document = operation["value"]
+            continue
+
+        document = copy.copy(document)
+        parent = document
+        for token in tokens[:-1]:
+            try:
+                child = parent[int(token) if isinstance(parent, list) else token]
+            except (KeyError, IndexError, ValueError, TypeError) as e:
+                raise JsonPatchError(f"Path `{operation['path']}` does not exist") from e
+            child = copy.copy(child)
+            parent[int(token) if isinstance(parent, list) else token] = child
+            parent = child
+
+        last = tokens[-1]
+        try:
+            if isinstance(parent, list):
+                index = len(parent) if last == "-" else int(last)
+                if index < 0 or index > len(parent) - (op != "add"):
+                    raise IndexError(index)
+                if op == "add":
+                    parent.insert(index, operation["value"])
+                elif op == "remove":
+                    del parent[index]
+                else:
+                    parent[index] = operation["value"]
+            elif isinstance(parent, dict):
+                if op == "add":
+                    parent[last] = operation["value"]
+                elif op == "remove":
+                    del parent[last]
+                elif last in parent:
+                    parent[last] = operation["value"]
+                else:
+                    raise KeyError(last)
+            else:
+                raise TypeError(type(parent))
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            raise JsonPatchError(f"Path `{operation['path']}` does not exist") from e
+
+    return document
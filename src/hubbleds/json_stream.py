@@ -0,0 +1,153 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a number, e.g. one cut off at its decimal
+#  point or exponent
+_NUMBER_CHARS = "0123456789.eE+-"
+
+# Consumed text is dropped from the buffer once it grows past this many
+#  characters, so that the buffer stays around the size of a chunk
+_TRIM_AT = 1 << 16
+
+
+class _Buffer:
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """
+        Append the next chunk, returning whether there was one.
+        """
+        if self.exhausted:
+            return False
+        if self.pos > _TRIM_AT:
+            self.text = self.text[self.pos :]
+            self.pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.text += text
+                return True
+        self.text += self._decoder.decode(b"", final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream.")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(
+                f"Expected {char!r} at position {self.pos} of JSON stream, "
+                f"found {self.text[self.pos]!r}."
+            )
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the very end of the buffer, or cut off such that
+            #  only part of it was decoded, may continue in the next chunk
+            if (
+                isinstance(value, (int, float))
+                and (end == len(self.text) or self.text[end] in _NUMBER_CHARS)
+                and self.fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks: Iterable[bytes]) -> Iterator[tuple[str, Any]]:
+    """
+    Decode a JSON object whose members are arrays from a stream of byte
+    chunks, yielding ``(member name, element)`` for each element of each
+    array as soon as it has been read. Only one element is held in memory
+    at a time, along with the undecoded remainder of the current chunk.
+    Members that are not arrays are skipped.
+    """
+    buffer = _Buffer(chunks)
+
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+
+    while True:
+        key = buffer.value()
+        buffer.expect(":")
+
+        if buffer.peek() == "[":
+            buffer.pos += 1
+            if buffer.peek() == "]":
+                buffer.pos += 1
+            else:
+                while True:
+                    yield key, buffer.value()
+                    if buffer.peek() == ",":
+                        buffer.pos += 1
+                        continue
+                    buffer.expect("]")
+                    break
+        else:
+            buffer.value()
+
+        if buffer.peek() == ",":
+            buffer.pos += 1
+            continue
+        buffer.expect("}")
+        return
+
+
+class ColumnBuffers:
+    """
+    Rows appended one at a time and kept as one list per field.
+
+    Nested objects in the fields listed in `intern` are shared between rows
+    that have the same value for the given key, e.g. one dict per galaxy
+    rather than one per measurement.
+    """
+
+    def __init__(self, fields: Iterable[str], intern: dict[str, str] | None = None):
+        self.columns: dict[str, list] = {field: [] for field in fields}
+        self._intern = intern or {}
+        self._interned: dict[str, dict] = {field: {} for field in self._intern}
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def append(self, row: dict[str, Any]):
+        for field, column in self.columns.items():
+            value = row.get(field)
+            if field in self._intern and isinstance(value, dict):
+                value = self._interned[field].setdefault(
+                    value.get(self._intern[field]), value
+                )
+            column.append(value)
+
+    def rows(self) -> Iterator[dict[str, Any]]:
+        for values in zip(*self.columns.values()):
+            yield dict(zip(self.columns.keys(), values))
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {field: np.asarray(column) for field, column in self.columns.items()}
@@ -4,7 +4,10 @@ from .state import GLOBAL_STATE, LOCAL_STATE
 import solara
 from solara.toestand import Ref
 from cosmicds.components import MathJaxSupport, PlotlySupport, GoogleAnalyticsSupport
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import ASYNC_LOCAL_API
+from hubbleds.change_tracking import ChangeTracker
+from hubbleds.response_store import FREE_RESPONSES, MC_SCORES, register_story_writer
+from hubbleds.write_queue import get_write_queue
 from cosmicds.logger import setup_logger
 
 logger = setup_logger("LAYOUT")
@@ -20,6 +23,9 @@ def Layout(children=[]):
 
     student_id = Ref(GLOBAL_STATE.fields.student.id)
     loaded_states = solara.use_reactive(False)
+    # Tracks what has been written for this student, so that the writer
+    #  below only sends what changed
+    tracker = solara.use_memo(ChangeTracker, dependencies=[student_id.value])
 
     router = solara.use_router()
     Ref(LOCAL_STATE.fields.last_route).set(router.path)
@@ -37,12 +43,18 @@ def Layout(children=[]):
         )
 
         # Retrieve the student's app and local states
-        LOCAL_API.get_app_story_states(GLOBAL_STATE, LOCAL_STATE)
-
+        await ASYNC_LOCAL_API.get_app_story_states(GLOBAL_STATE, LOCAL_STATE)
+        MC_SCORES.sync(LOCAL_STATE)
+        FREE_RESPONSES.sync(LOCAL_STATE)
 
         # Load in the student's measurements
-        measurements = LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
-        sample_measurements = LOCAL_API.get_sample_measurements(
+        measurements = await ASYNC_LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
+
+        # Example measurements are not part of the baseline, since any that
+        #  are missing get created locally and still need to be written
+        tracker.mark_written(GLOBAL_STATE.value, LOCAL_STATE.value)
+
+        sample_measurements = await ASYNC_LOCAL_API.get_sample_measurements(
             GLOBAL_STATE, LOCAL_STATE
         )
 
@@ -57,27 +69,62 @@ def Layout(children=[]):
 
     # solara.use_memo(_load_local_state, dependencies=[student_id.value])
 
-    async def _write_local_global_states():
+    write_queue = get_write_queue()
+
+    def _write_story_state():
+        if not loaded_states.value:
+            return
+
+        write_queue.submit(
+            "story-state",
+            ASYNC_LOCAL_API.put_story_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            tracker=tracker,
+        )
+
+    # Responses that are updated without notifying the local state, such as
+    #  free responses being typed, ask for their write through this
+    solara.use_effect(
+        lambda: register_story_writer(_write_story_state), dependencies=[tracker]
+    )
+
+    def _write_local_global_states():
         if not loaded_states.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        put_state = LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)
+        # Listen for changes in the states and queue writes to the database;
+        #  bursts of changes are coalesced into a single write each
+        _write_story_state()
 
         # Be sure to write the measurement data separately since it's stored
         #  in another location in the database
-        put_meas = LOCAL_API.put_measurements(GLOBAL_STATE, LOCAL_STATE)
-        put_samp = LOCAL_API.put_sample_measurements(GLOBAL_STATE, LOCAL_STATE)
-        
-        if put_state and put_meas and put_samp:
-            logger.info("Wrote state to database.")
-        else:
-            logger.info(f"Did not write {'story state' if not put_state else ''} {'measurements' if not put_meas else ''} {'sample measurements' if not put_samp else ''} to database.")
-
-    solara.lab.use_task(
+        write_queue.submit(
+            "measurements",
+            ASYNC_LOCAL_API.put_measurements,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            tracker=tracker,
+        )
+        write_queue.submit(
+            "sample-measurements",
+            ASYNC_LOCAL_API.put_sample_measurements,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            tracker=tracker,
+        )
+
+    solara.use_effect(
         _write_local_global_states, dependencies=[GLOBAL_STATE.value, LOCAL_STATE.value]
     )
 
+    def _flush_on_route_change():
+        write_queue.flush()
+
+    # Registered after the writer above so that the state of the page being
+    #  left is part of the flush
+    solara.use_effect(_flush_on_route_change, dependencies=[router.path])
+
     with BaseLayout(
         local_state=LOCAL_STATE,
         children=children,
@@ -0,0 +1,278 @@
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+import numpy as np
+from glue.core import Data
+from glue.core.component import CategoricalComponent, Component
+
+from hubbleds.json_stream import ColumnBuffers
+
+if TYPE_CHECKING:
+    # `hubbleds.state` declares its measurement sets as tables
+    from hubbleds.state import GalaxyData, StudentMeasurement
+
+# Columns of a `MeasurementTable`, and the field holding the unit of each
+#  value column, which is the same on every row and so is kept once per table
+ID_FIELDS = ("student_id", "class_id", "galaxy_id")
+VALUE_FIELDS = (
+    "obs_wave_value",
+    "velocity_value",
+    "ang_size_value",
+    "est_dist_value",
+    "brightness",
+)
+UNIT_FIELDS = {
+    "rest_wave_value": "rest_wave_unit",
+    "obs_wave_value": "obs_wave_unit",
+    "velocity_value": "velocity_unit",
+    "ang_size_value": "ang_size_unit",
+    "est_dist_value": "est_dist_unit",
+}
+
+# Stored for ids that are missing, the same as `StudentMeasurement.galaxy_id`
+#  for a measurement without a galaxy
+NO_ID = 0
+
+
+def _read_only(values, dtype) -> np.ndarray:
+    array = np.asarray(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def _default_units() -> dict[str, str]:
+    from hubbleds.state import StudentMeasurement
+
+    return {
+        unit: StudentMeasurement.model_fields[unit].default
+        for unit in UNIT_FIELDS.values()
+    }
+
+
+def _units_of(row: Mapping | None) -> dict[str, str]:
+    units = _default_units()
+    if row is not None:
+        units.update({unit: row[unit] for unit in units if row.get(unit)})
+    return units
+
+
+def _ids(values: Iterable) -> np.ndarray:
+    return _read_only([NO_ID if v is None else v for v in values], np.int64)
+
+
+def _values(values: Iterable) -> np.ndarray:
+    return _read_only([np.nan if v is None else v for v in values], np.float64)
+
+
+def _measurement_numbers(values: Iterable) -> np.ndarray:
+    return _read_only(["" if v is None else v for v in values], np.str_)
+
+
+@dataclass(frozen=True, eq=False)
+class MeasurementTable:
+    """
+    A set of student measurements held as one read-only NumPy column per
+    field, in place of a list of `StudentMeasurement` models.
+
+    Missing values are NaN and missing ids are `NO_ID`. Galaxies are kept as
+    ids into the galaxy catalog of the story, and the units, which are the
+    same for every measurement, are kept once in `units`. Tables are never
+    changed in place: filtering and concatenating return new tables, and
+    `to_glue_data` hands the columns to glue without copying them.
+
+    Tables compare by identity, so that setting a new table on a reactive
+    state always counts as a change.
+    """
+
+    student_id: np.ndarray
+    class_id: np.ndarray
+    galaxy_id: np.ndarray
+    obs_wave_value: np.ndarray
+    velocity_value: np.ndarray
+    ang_size_value: np.ndarray
+    est_dist_value: np.ndarray
+    brightness: np.ndarray
+    measurement_number: np.ndarray
+    # Plain dicts, which `LocalState` dumps can serialize; neither is
+    #  changed after the table is built
+    units: dict[str, str] = field(default_factory=lambda: _units_of(None))
+    # Row indexes by id column, built on first use, see `rows_by`
+    _indexes: dict[str, dict[int, np.ndarray]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    @classmethod
+    def empty(cls) -> "MeasurementTable":
+        return cls.from_models([])
+
+    @classmethod
+    def from_models(
+        cls, measurements: Iterable["StudentMeasurement"]
+    ) -> "MeasurementTable":
+        measurements = list(measurements)
+        return cls(
+            student_id=_ids(m.student_id for m in measurements),
+            class_id=_ids(m.class_id for m in measurements),
+            galaxy_id=_ids(m.galaxy_id for m in measurements),
+            **{
+                name: _values(getattr(m, name) for m in measurements)
+                for name in VALUE_FIELDS
+            },
+            measurement_number=_measurement_numbers(
+                m.measurement_number for m in measurements
+            ),
+            units=_units_of(measurements[0].model_dump() if measurements else None),
+        )
+
+    @classmethod
+    def from_columns(cls, columns: ColumnBuffers) -> "MeasurementTable":
+        """
+        A table from measurement rows decoded into column buffers, such as
+        those of `hubbleds.payloads.stream_all_data`.
+        """
+        rows = columns.columns
+        galaxies = rows.get("galaxy", ())
+        return cls(
+            student_id=_ids(rows["student_id"]),
+            class_id=_ids(rows["class_id"]),
+            galaxy_id=_ids(
+                g.get("id") if isinstance(g, dict) else None for g in galaxies
+            ),
+            **{name: _values(rows[name]) for name in VALUE_FIELDS},
+            measurement_number=_measurement_numbers(rows["measurement_number"]),
+            units=_units_of(next(columns.rows(), None)),
+        )
+
+    @classmethod
+    def concat(cls, *tables: "MeasurementTable") -> "MeasurementTable":
+        tables = tuple(t for t in tables if len(t)) or tables[:1]
+        if not tables:
+            return cls.empty()
+        return cls(
+            **{
+                name: _read_only(
+                    np.concatenate([getattr(t, name) for t in tables]), None
+                )
+                for name in cls.column_names()
+            },
+            units=tables[0].units,
+        )
+
+    @staticmethod
+    def column_names() -> tuple[str, ...]:
+        return (*ID_FIELDS, *VALUE_FIELDS, "measurement_number")
+
+    @property
+    def columns(self) -> dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.column_names()}
+
+    def __len__(self) -> int:
+        return len(self.student_id)
+
+    def filter(self, mask: np.ndarray) -> "MeasurementTable":
+        """
+        The rows selected by a boolean mask or an array of indices.
+        """
+        return replace(
+            self,
+            **{
+                name: _read_only(column[mask], None)
+                for name, column in self.columns.items()
+            },
+        )
+
+    def rows_by(self, name: str) -> Mapping[int, np.ndarray]:
+        """
+        The indices of the rows with each value of the id column `name`, in
+        table order. The index is built once per table, which never changes.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            column = getattr(self, name)
+            ids, inverse, counts = np.unique(
+                column, return_inverse=True, return_counts=True
+            )
+            order = np.argsort(inverse.ravel(), kind="stable")
+            rows = np.split(order, np.cumsum(counts)[:-1])
+            index = {int(i): _read_only(r, np.intp) for i, r in zip(ids, rows)}
+            self._indexes[name] = index
+        return index
+
+    def rows_for(self, name: str, ids: Iterable[int]) -> np.ndarray:
+        index = self.rows_by(name)
+        rows = [index[i] for i in set(ids) if i in index]
+        return np.sort(np.concatenate(rows)) if rows else np.empty(0, np.intp)
+
+    def lookup(
+        self, student_id: int | None = None, class_id: int | None = None
+    ) -> "MeasurementTable":
+        """
+        The rows of a student and/or of a class.
+        """
+        rows = None
+        for name, value in (("student_id", student_id), ("class_id", class_id)):
+            if value is not None:
+                found = self.rows_for(name, [value])
+                rows = found if rows is None else np.intersect1d(rows, found)
+        return self if rows is None else self.filter(rows)
+
+    def for_students(self, student_ids: Iterable[int]) -> "MeasurementTable":
+        return self.filter(self.rows_for("student_id", student_ids))
+
+    def with_class_id(self, class_id: int) -> "MeasurementTable":
+        return replace(
+            self, class_id=_read_only(np.full(len(self), class_id), np.int64)
+        )
+
+    def complete(self) -> np.ndarray:
+        """
+        Mask of the rows that have both a distance and a velocity.
+        """
+        return ~(np.isnan(self.est_dist_value) | np.isnan(self.velocity_value))
+
+    def student_ids(self) -> list[int]:
+        return [int(i) for i in np.unique(self.student_id)]
+
+    def to_glue_data(self, label: str | None = None) -> Data:
+        data = Data(label=label) if label else Data()
+        for name, column in self.columns.items():
+            if column.dtype.kind == "U":
+                component = CategoricalComponent(column)
+            else:
+                unit = self.units.get(UNIT_FIELDS.get(name))
+                component = Component(column, units=unit)
+            data.add_component(component, name)
+        data.meta["units"] = dict(self.units)
+        return data
+
+    def to_models(
+        self, galaxies: Mapping[int, "GalaxyData"] | None = None
+    ) -> list["StudentMeasurement"]:
+        """
+        The rows as `StudentMeasurement` models, with their galaxies looked up
+        in `galaxies` if given. Missing values are left to the model defaults.
+        """
+        from hubbleds.state import StudentMeasurement
+
+        galaxies = galaxies or {}
+        columns = self.columns
+        measurements = []
+        for i in range(len(self)):
+            fields = {
+                name: float(columns[name][i])
+                for name in VALUE_FIELDS
+                if not np.isnan(columns[name][i])
+            }
+            if self.class_id[i] != NO_ID:
+                fields["class_id"] = int(self.class_id[i])
+            if self.measurement_number[i]:
+                fields["measurement_number"] = str(self.measurement_number[i])
+            measurements.append(
+                StudentMeasurement(
+                    student_id=int(self.student_id[i]),
+                    galaxy=galaxies.get(int(self.galaxy_id[i])),
+                    **fields,
+                    **self.units,
+                )
+            )
+        return measurements
@@ -2,7 +2,14 @@ import solara
 from solara.lab import computed
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, get_multiple_choice, mc_callback
 from .component_state import COMPONENT_STATE, Marker
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.galaxy_catalog import GALAXY_CATALOG
+from hubbleds.write_queue import get_write_queue
+from hubbleds.validation import (
+    REDSHIFT_TOLERANCE,
+    poorly_measured_wavelengths,
+    validate_measurement_list,
+)
 from glue_jupyter import JupyterApplication
 import asyncio
 from pathlib import Path
@@ -50,6 +57,7 @@ from hubbleds.example_measurement_helpers import (
     create_measurement_subsets,
     link_example_seed_and_measurements,
     link_seed_data,
+    add_example_seed_data,
     _update_second_example_measurement
 )
 
@@ -60,10 +68,8 @@ GUIDELINE_ROOT = Path(__file__).parent / "guidelines"
 EXAMPLE_GALAXY_MEASUREMENTS_FIRST = EXAMPLE_GALAXY_MEASUREMENTS + '_first'
 EXAMPLE_GALAXY_MEASUREMENTS_SECOND = EXAMPLE_GALAXY_MEASUREMENTS + '_second'
 
-def is_wavelength_poorly_measured(measwave, restwave, z, tolerance = 0.5):
-    z_meas =  (measwave - restwave) / restwave
-    fractional_difference = (((z_meas - z) / z)** 2)**0.5
-    return fractional_difference > tolerance
+def is_wavelength_poorly_measured(measwave, restwave, z, tolerance = REDSHIFT_TOLERANCE):
+    return bool(poorly_measured_wavelengths(measwave, restwave, z, tolerance))
 
 @solara.component
 def Page():
@@ -75,7 +81,7 @@ def Page():
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         #   considered higher-level and is loaded when the story starts.
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
         total_galaxies = Ref(COMPONENT_STATE.fields.total_galaxies)
 
@@ -92,18 +98,20 @@ def Page():
     solara.lab.use_task(_load_component_state)
     # solara.use_memo(_load_component_state)
 
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state to database.")
-        else:
-            logger.info("Did not write component state to database.")
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
 
     def _glue_setup() -> JupyterApplication:
         # NOTE: use_memo has to be part of the main page render. Including it
@@ -112,33 +120,7 @@ def Page():
             GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
         )
 
-        if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
-            example_seed_data = LOCAL_API.get_example_seed_measurement(LOCAL_STATE, which='both')
-            
-            data = Data(
-                label=EXAMPLE_GALAXY_SEED_DATA,
-                **{
-                    k: np.asarray([r[k] for r in example_seed_data])
-                    for k in example_seed_data[0].keys()
-                }
-            )
-            gjapp.data_collection.append(data)
-            # create 'first measurement' and 'second measurement' datasets
-            # create_measurement_subsets(gjapp, data)
-            first = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_first', 
-                         **{k: np.asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'first'])
-                            for k in example_seed_data[0].keys()}
-                            )
-            first.style.color = GENERIC_COLOR
-            gjapp.data_collection.append(first)
-            second = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_second', 
-                         **{k: np.asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'second'])
-                            for k in example_seed_data[0].keys()}
-                            )
-            second.style.color = GENERIC_COLOR
-            gjapp.data_collection.append(second)
-            
-            link_seed_data(gjapp)
+        add_example_seed_data(gjapp, LOCAL_STATE)
         
         return gjapp
 
@@ -276,37 +258,27 @@ def Page():
         need = 5 - len(LOCAL_STATE.value.measurements)
         if need <= 0:
             return
-        galaxies = LOCAL_API.get_galaxies(LOCAL_STATE)
-        sample = np.random.choice(galaxies, size=need, replace=False)
+        galaxies = GALAXY_CATALOG.get(LOCAL_STATE).galaxies
+        sample = np.random.choice(len(galaxies), size=need, replace=False)
         new_measurements = [StudentMeasurement(student_id=GLOBAL_STATE.value.student.id,
-                                               galaxy=galaxy)
-                             for galaxy in sample]
+                                               galaxy=galaxies[index])
+                             for index in sample]
         measurements = LOCAL_STATE.value.measurements + new_measurements
         Ref(LOCAL_STATE.fields.measurements).set(measurements)
     
     def num_bad_velocities():
-        measurements = Ref(LOCAL_STATE.fields.measurements)
-        num = 0
-        for meas in measurements.value:
-            if meas.obs_wave_value is None or meas.rest_wave_value is None:
-                # Skip measurements with missing data cuz they have not been attempted
-                continue
-            elif is_wavelength_poorly_measured(meas.obs_wave_value, meas.rest_wave_value, meas.galaxy.z):
-                num += 1
-        
+        # Measurements with missing data are not flagged, as they have not been attempted
+        masks = validate_measurement_list(LOCAL_STATE.value.measurements)
+        num = int(masks.bad_redshift.sum())
+
         has_multiple_bad_velocities = Ref(COMPONENT_STATE.fields.has_multiple_bad_velocities)
         has_multiple_bad_velocities.set(num > 1)
         return num
     
     def set_obs_wave_total():
         obs_wave_total = Ref(COMPONENT_STATE.fields.obs_wave_total)
-        measurements = LOCAL_STATE.value.measurements
-        num = 0
-        for meas in measurements:
-            # print(meas)
-            if meas.obs_wave_value is not None:
-                num += 1
-        obs_wave_total.set(num)
+        masks = validate_measurement_list(LOCAL_STATE.value.measurements)
+        obs_wave_total.set(int((~masks.missing_wavelength).sum()))
 
     def _initialize_state(isloaded):
         if (not isloaded):
@@ -515,12 +487,15 @@ def Page():
             solara.Button(label="Shortcut: Fill in galaxy velocity data & Jump to Stage 2", on_click=_fill_stage1_go_stage2, classes=["demo-button"])
             solara.Button(label="Choose 5 random galaxies", on_click=_select_random_galaxies, classes=["demo-button"])
 
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     with rv.Row():
         with rv.Col(cols=12, lg=4):
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineIntro.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.mee_gui1),
                 speech=speech.value,
             )
@@ -529,7 +504,7 @@ def Page():
                 # If at least 1 galaxy has already been selected, we want to go straight from here to sel_gal3.
                 event_next_callback=lambda _: transition_to(COMPONENT_STATE, Marker.sel_gal2 if COMPONENT_STATE.value.total_galaxies == 0 else Marker.sel_gal3, force=True),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sel_gal1),
                 speech=speech.value,
             )
@@ -538,7 +513,7 @@ def Page():
                 # I think we don't need this next callback because meeting the "next" criteria will autoadvance you to not_gal1 anyway, and then we skip over this guideline if we go backwards from sel_gal3. (But leave it just in case)
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sel_gal2),
                 state_view={
                     "total_galaxies": COMPONENT_STATE.value.total_galaxies,
@@ -551,7 +526,7 @@ def Page():
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 # You can't get to this marker until at least 1 galaxy has been selected. Once a galaxy has been selected, sel_gal2 doesn't make sense, so jump back to sel_gal1.
                 event_back_callback=lambda _: transition_to(COMPONENT_STATE, Marker.sel_gal1, force=True),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sel_gal3),
                 state_view={
                     "total_galaxies": COMPONENT_STATE.value.total_galaxies,
@@ -563,7 +538,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineSelectGalaxies4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sel_gal4),
                 speech=speech.value,
             )
@@ -666,7 +641,7 @@ def Page():
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 # You can't get to this marker until at least 1 galaxy has been selected. Once a galaxy has been selected, sel_gal2 doesn't make sense, so jump back to sel_gal1.
                 event_back_callback=lambda _: transition_to(COMPONENT_STATE, Marker.sel_gal1, force=True),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.not_gal1),
                 speech=speech.value,
             )
@@ -674,7 +649,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineChooseRow.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.cho_row1),
                 speech=speech.value,
             )
@@ -703,7 +678,7 @@ def Page():
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineDopplerCalc4.vue",
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.current_step_in(
                     [Marker.dop_cal4, Marker.dop_cal5]
                 ),
@@ -795,7 +770,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineCheckMeasurement.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: _on_validate_transition(True), # Send user back to dop_cal5 and open dialog
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.che_mea1),
                 speech=speech.value,
             )
@@ -804,7 +779,7 @@ def Page():
             #     GUIDELINE_ROOT / "GuidelineDotSequence13.vue",
             #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            #     can_advance=can_advance,
             #     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq13),
             # )
             set_obs_wave_total()
@@ -812,7 +787,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineRemainingGals.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.rem_gal1),
                 state_view={
                     "obswaves_total": COMPONENT_STATE.value.obs_wave_total,
@@ -832,7 +807,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDopplerCalc6.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dop_cal6),
                 speech=speech.value,
             )
@@ -840,7 +815,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineReflectVelValues.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 show=COMPONENT_STATE.value.is_current_step(Marker.ref_vel1),
                 state_view={'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, "reflect_vel_value"), 'score_tag': 'reflect_vel_value'},
@@ -850,7 +825,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineEndStage1.vue",
                 event_next_callback=lambda _: router.push("02-distance-introduction"),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.end_sta1),
                 state_view={
                     "has_bad_velocities": COMPONENT_STATE.value.has_bad_velocities,
@@ -1031,7 +1006,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineIntroDotplot.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.int_dot1),
                     speech=speech.value,
                     state_view={
@@ -1042,7 +1017,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence01.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq1),
                     speech=speech.value,
                 )
@@ -1050,7 +1025,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence02.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq2),
                     speech=speech.value,
                 )
@@ -1058,7 +1033,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence03.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq3),
                     speech=speech.value,
                 )
@@ -1066,7 +1041,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence04a.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq4a),
                     speech=speech.value,
                 )
@@ -1074,7 +1049,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence05.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq5),
                     speech=speech.value,
                 )
@@ -1082,7 +1057,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence06.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq6),
                     speech=speech.value,
                 )
@@ -1090,7 +1065,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence07.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq7),
                     speech=speech.value,
                 )
@@ -1098,7 +1073,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence08.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq8),
                     state_view={
@@ -1127,7 +1102,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence14.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq14),
                     speech=speech.value,
                 )
@@ -1148,7 +1123,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineSpectrum.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.mee_spe1),
                     state_view={
                         "spectrum_tutorial_opened": COMPONENT_STATE.value.spectrum_tutorial_opened
@@ -1166,7 +1141,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineRestwave.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.res_wav1),
                     state_view={
                         "selected_example_galaxy": selected_example_galaxy_data,
@@ -1178,7 +1153,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineObswave1.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.obs_wav1),
                     state_view={"selected_example_galaxy": selected_example_galaxy_data},
                     speech=speech.value,
@@ -1187,7 +1162,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineObswave2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.obs_wav2),
                     state_view={
                         "selected_example_galaxy": selected_example_galaxy_data,
@@ -1200,7 +1175,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDopplerCalc0.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dop_cal0),
                     speech=speech.value,
                 )
@@ -1208,7 +1183,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDopplerCalc2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dop_cal2),
                     speech=speech.value,
                 )
@@ -1216,7 +1191,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence04.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq4),
                     speech=speech.value,
                     state_view={
@@ -1227,7 +1202,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence10.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq10),
                     speech=speech.value,
                 )
@@ -1235,7 +1210,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineDotSequence11.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq11),
                     speech=speech.value,
                 )
@@ -1243,7 +1218,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineRemeasureVelocity.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.rem_vel1),
                     speech=speech.value,
                 )
@@ -1251,7 +1226,7 @@ def Page():
                 #     GUIDELINE_ROOT / "GuidelineDotSequence13a.vue",
                 #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                #     can_advance=can_advance,
                 #     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq13a),
                 #     speech=speech.value,
                 # )
@@ -1259,7 +1234,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineReflectOnData.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.ref_dat1),
                     speech=speech.value,
                 )
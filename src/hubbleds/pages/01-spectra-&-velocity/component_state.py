@@ -4,6 +4,7 @@ from hubbleds.base_marker import BaseMarker
 import enum
 from functools import cached_property
 from hubbleds.base_component_state import BaseComponentState
+from hubbleds.gate_cache import gate
 import solara
 from typing import Any
 
@@ -122,7 +123,7 @@ class ComponentState(BaseComponentState, BaseState):
             return Marker(v)
         return v
 
-    @property
+    @gate(fields=["current_step", "total_galaxies", "selected_galaxy"])
     def mee_gui1_gate(self) -> bool:
         return (
             self.current_step == Marker.mee_gui1
@@ -130,67 +131,67 @@ class ComponentState(BaseComponentState, BaseState):
             and not self.selected_galaxy
         )
 
-    @property
+    @gate(fields=["total_galaxies"])
     def not_gal1_gate(self) -> bool:
         return self.total_galaxies >= 1
 
-    @property
+    @gate(fields=["total_galaxies"])
     def sel_gal3_gate(self) -> bool:
         return self.total_galaxies >= 1
 
-    @property
+    @gate(fields=["total_galaxies"])
     def sel_gal4_gate(self) -> bool:
         return self.total_galaxies == 5
 
-    @property
+    @gate(fields=["total_galaxies"])
     def cho_row1_gate(self) -> bool:
         return self.total_galaxies == 5
 
-    @property
+    @gate(fields=["selected_example_galaxy"])
     def mee_spe1_gate(self) -> bool:
         return bool(self.selected_example_galaxy)
 
-    @property
+    @gate(fields=["selected_example_galaxy", "spectrum_tutorial_opened"])
     def spe_tut1_gate(self) -> bool:
         return bool(self.selected_example_galaxy) and self.spectrum_tutorial_opened
 
-    @property
+    @gate(fields=["selected_example_galaxy", "spectrum_tutorial_opened"])
     def res_wav1_gate(self) -> bool:
         return bool(self.selected_example_galaxy) and self.spectrum_tutorial_opened
 
-    @property
+    @gate(fields=["rest_wave_tool_activated"])
     def obs_wav1_gate(self) -> bool:
         return self.rest_wave_tool_activated
 
-    @property
+    @gate(fields=["obs_wave_tool_used"])
     def obs_wav2_gate(self) -> bool:
         return self.obs_wave_tool_used
 
-    @property
+    @gate(fields=["zoom_tool_activated"])
     def dop_cal0_gate(self) -> bool:
         return self.zoom_tool_activated
 
-    @property
+    @gate(fields=["dotplot_tutorial_finished"])
     def dot_seq1_gate(self) -> bool:
         return self.dotplot_tutorial_finished
     
-    @property
+    @gate(questions=["vel_meas_consensus"])
     def dot_seq10_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("vel_meas_consensus")
 
-    @property
+    @gate(fields=["obs_wave_total"])
     def ref_dat1_gate(self) -> bool:
         return self.obs_wave_total >= 5
 
-    @property
+    @gate(fields=["reflection_complete"])
     def dop_cal6_gate(self) -> bool:
         return self.reflection_complete
 
-    @property
+    @gate(fields=["velocities_total"])
     def ref_vel1_gate(self) -> bool:
         return self.velocities_total >= 5
 
-    @property
+    @gate(fields=["has_bad_velocities", "has_multiple_bad_velocities"])
     def nxt_stg_gate(self) -> bool:
         return not (self.has_bad_velocities or self.has_multiple_bad_velocities)
 
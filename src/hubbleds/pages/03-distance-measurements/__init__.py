@@ -34,7 +34,8 @@ from hubbleds.components import (
     )
 
 from hubbleds.data_management import *
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.write_queue import get_write_queue
 from hubbleds.state import (
     GLOBAL_STATE, 
     LOCAL_STATE,
@@ -66,7 +67,8 @@ from hubbleds.example_measurement_helpers import (
     create_example_subsets,
     link_example_seed_and_measurements,
     _update_second_example_measurement,
-    link_seed_data
+    link_seed_data,
+    add_example_seed_data,
 )
 
 
@@ -174,24 +176,26 @@ def Page():
     distance_tool_bg_count = solara.use_reactive(0)
 
     async def _load_component_state():
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         logger.info("Finished loading component state")
         loaded_component_state.set(True)
     
     solara.lab.use_task(_load_component_state)
     
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state for stage 3 to database.")
-        else:
-            logger.info("Did not write component state for stage 3 to database.")
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
     
     def _glue_setup() -> JupyterApplication:
@@ -200,27 +204,7 @@ def Page():
         )
         
         # Get the example seed data
-        if EXAMPLE_GALAXY_SEED_DATA not in gjapp.data_collection:
-            example_seed_data = LOCAL_API.get_example_seed_measurement(LOCAL_STATE, which = 'both')
-            data = Data(label=EXAMPLE_GALAXY_SEED_DATA, **{k: asarray([r[k] for r in example_seed_data]) for k in example_seed_data[0].keys()})
-            gjapp.data_collection.append(data)
-            
-            # create 'first measurement' and 'second measurement' datasets
-            # create_measurement_subsets(gjapp, data)
-            first = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_first', 
-                         **{k: asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'first'])
-                            for k in example_seed_data[0].keys()}
-                            )
-            first.style.color = GENERIC_COLOR
-            gjapp.data_collection.append(first)
-            second = Data(label = EXAMPLE_GALAXY_SEED_DATA + '_second', 
-                         **{k: asarray([r[k] for r in example_seed_data if r['measurement_number'] == 'second'])
-                            for k in example_seed_data[0].keys()}
-                            )
-            second.style.color = GENERIC_COLOR
-            gjapp.data_collection.append(second)
-            
-            link_seed_data(gjapp)
+        add_example_seed_data(gjapp, LOCAL_STATE)
         
         return gjapp
     
@@ -345,12 +329,6 @@ def Page():
     # StateEditor(Marker, cast(solara.Reactive[BaseState],COMPONENT_STATE), LOCAL_STATE, LOCAL_API, show_all=False)
     
 
-    def put_measurements(samples):
-        if samples:
-            LOCAL_API.put_sample_measurements(GLOBAL_STATE, LOCAL_STATE)
-        else:
-            LOCAL_API.put_measurements(GLOBAL_STATE, LOCAL_STATE)
-            
     def _update_angular_size(update_example: bool, galaxy, angular_size, count, meas_num = 'first', brightness = 1.0):
         # if bool(galaxy) and angular_size is not None:
         arcsec_value = int(angular_size.to(u.arcsec).value)
@@ -475,47 +453,50 @@ def Page():
         else:
             return 'first'
 
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     with solara.ColumnsResponsive(12, large=[4,8]):
         with rv.Col():
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz2),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas2b.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz2b),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz3),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz4),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas5a.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz5a),
                 state_view={
                     "dosdonts_tutorial_opened": COMPONENT_STATE.value.dosdonts_tutorial_opened
@@ -526,7 +507,7 @@ def Page():
             #     GUIDELINE_ROOT / "GuidelineAngsizeMeas6.vue",
             #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            #     can_advance=can_advance,
             #     show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz6),
             # )
 
@@ -537,7 +518,7 @@ def Page():
                 # event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
                 event_next_callback=lambda _: transition_to(COMPONENT_STATE, Marker.dot_seq5b), #
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq5),
                 event_force_transition=lambda _: transition_to(COMPONENT_STATE, Marker.rep_rem1),
             )
@@ -546,7 +527,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq5b.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq5b),
             )
 
@@ -577,13 +558,12 @@ def Page():
             def _ang_size_cb(angle):
                 """
                 Callback for when the angular size is measured. This function
-                updates the angular size of the galaxy in the data model and
-                puts the measurements in the database.
+                updates the angular size of the galaxy in the data model, from
+                where the layout writes it to the database.
                 """
                 data = current_data.value
                 count = Ref(COMPONENT_STATE.fields.example_angular_sizes_total) if on_example_galaxy_marker.value else Ref(COMPONENT_STATE.fields.angular_sizes_total)
                 _update_angular_size(on_example_galaxy_marker.value, current_galaxy.value, angle, count, example_galaxy_measurement_number.value, brightness = current_brightness.value)
-                put_measurements(samples=on_example_galaxy_marker.value)
                 if on_example_galaxy_marker.value:
                     value = int(angle.to(u.arcsec).value)
                     meas_theta = Ref(COMPONENT_STATE.fields.meas_theta)
@@ -617,12 +597,11 @@ def Page():
             def _distance_cb(theta):
                 """
                 Callback for when the distance is estimated. This function
-                updates the distance of the galaxy in the data model and
-                puts the measurements in the database.
+                updates the distance of the galaxy in the data model, from
+                where the layout writes it to the database.
                 """
                 logger.info(f'_distance_cb. example: {on_example_galaxy_marker.value}')
                 _update_distance_measurement(on_example_galaxy_marker.value, current_galaxy.value, theta, example_galaxy_measurement_number.value)
-                put_measurements(samples=on_example_galaxy_marker.value)
 
             def _get_ruler_clicks_cb(count):
                 ruler_click_count = Ref(COMPONENT_STATE.fields.ruler_click_count)
@@ -663,28 +642,28 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineChooseRow1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.cho_row1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAngsizeMeas5.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.ang_siz5),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineEstimateDistance1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.est_dis1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineEstimateDistance2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.est_dis2),
                 state_view={
                     "distance_const": DISTANCE_CONSTANT
@@ -694,7 +673,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineEstimateDistance3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.est_dis3),
                 event_set_distance=_distance_cb,
                 state_view={
@@ -707,7 +686,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineEstimateDistance4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.est_dis4),
                 state_view={
                     "distance_const": DISTANCE_CONSTANT,
@@ -720,7 +699,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq5a.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq5a),
             )
             # the 2nd measurement
@@ -728,14 +707,14 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq5c.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq5c),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineRepeatRemainingGalaxies.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_to(COMPONENT_STATE, Marker.dot_seq5),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.rep_rem1),
                 scroll_on_mount=False,
                 state_view={
@@ -751,7 +730,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineFillRemainingGalaxies.vue",
                 event_next_callback=lambda _: router.push("04-explore-data"),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.fil_rem1),
                 state_view={
                     "distances_total": COMPONENT_STATE.value.distances_total
@@ -776,7 +755,6 @@ def Page():
                         elif measurement.ang_size_value is None:
                             logger.info(f"Galaxy {measurement.galaxy_id} has no angular size")
                     logger.info(f"fill_galaxy_distances: Filled {count} distances")
-                    put_measurements(samples=False)
                     distances_total.set(count)
                     fill_galaxy_pressed.set(True)
 
@@ -872,7 +850,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq1),
                 state_view={
                     "color": MY_DATA_COLOR_NAME,
@@ -882,7 +860,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq2),
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'ang_meas_consensus'), 'score_tag': 'ang_meas_consensus'}
@@ -891,21 +869,21 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineDotplotSeq3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq3),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineDotplotSeq4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq4),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineDotplotSeq4a.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq4a),
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'ang_meas_dist_relation'), 'score_tag': 'ang_meas_dist_relation'}
@@ -915,7 +893,7 @@ def Page():
             #     GUIDELINE_ROOT / "GuidelineDotplotSeq6.vue",
             #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            #     can_advance=can_advance,
             #     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq6),
             #     event_mc_callback=lambda event: mc_callback(event = event, local_state = LOCAL_STATE, callback=set_mc_scoring),
             #     state_view={'color': MY_DATA_COLOR_NAME, 'mc_score': get_multiple_choice(LOCAL_STATE, 'ang_meas_consensus_2'), 'score_tag': 'ang_meas_consensus_2'}
@@ -925,7 +903,7 @@ def Page():
             #     GUIDELINE_ROOT / "GuidelineDotplotSeq7.vue",
             #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            #     can_advance=can_advance,
             #     show=COMPONENT_STATE.value.is_current_step(Marker.dot_seq7),
             # )
 
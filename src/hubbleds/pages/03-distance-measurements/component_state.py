@@ -11,6 +11,7 @@ from hubbleds.base_component_state import (
     transition_previous,
     transition_next
 )
+from hubbleds.gate_cache import gate
 from hubbleds.state import LOCAL_STATE
 
 from typing import Any, Optional
@@ -73,41 +74,41 @@ class ComponentState(BaseComponentState, BaseState):
             return Marker(v)
         return v
 
-    @property
+    @gate(fields=["selected_example_galaxy"])
     def ang_siz2_gate(self):
         return bool(self.selected_example_galaxy)
 
-    @property
+    @gate(fields=["ruler_click_count"])
     def ang_siz4_gate(self):
         return self.ruler_click_count == 1
 
-    @property
+    @gate(fields=["n_meas"])
     def ang_siz5_gate(self):
         return self.n_meas > 0
 
-    @property
+    @gate(questions=["ang_meas_consensus"])
     def dot_seq3_gate(self):
         return LOCAL_STATE.value.question_completed("ang_meas_consensus")
 
-    @property
+    @gate(questions=["ang_meas_dist_relation"])
     def ang_siz5a_gate(self):
         return LOCAL_STATE.value.question_completed("ang_meas_dist_relation")
 
-    @property
+    @gate(questions=["ang_meas_consensus_2"])
     def dot_seq7_gate(self):
         return LOCAL_STATE.value.question_completed("ang_meas_consensus_2")
 
-    @property
+    @gate(fields=["dosdonts_tutorial_opened"])
     def dot_seq5_gate(self):
         return (
             bool(self.dosdonts_tutorial_opened)
         )
     
-    @property
+    @gate(fields=["angular_sizes_total"])
     def fil_rem1_gate(self):
         return self.angular_sizes_total >=5
 
-    @property
+    @gate(fields=["distances_total"])
     def end_sta3_gate(self):
         return self.distances_total >= 5
 
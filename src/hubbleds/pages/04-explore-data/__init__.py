@@ -17,8 +17,10 @@ from hubbleds.components import DataTable, HubbleExpUniverseSlideshow, LineDrawV
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, StudentMeasurement, get_multiple_choice, get_free_response, mc_callback, fr_callback
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
 from .component_state import COMPONENT_STATE, Marker
-from hubbleds.remote import LOCAL_API
-from hubbleds.utils import AGE_CONSTANT, models_to_glue_data, PLOTLY_MARGINS
+from hubbleds.measurement_table import MeasurementTable
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.write_queue import get_write_queue
+from hubbleds.utils import AGE_CONSTANT, PLOTLY_MARGINS
 
 from cosmicds.logger import setup_logger
 
@@ -30,16 +32,16 @@ GUIDELINE_ROOT = Path(__file__).parent / "guidelines"
 @solara.lab.task
 async def load_class_data():
     logger.info("Loading class data")
-    class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
+    class_measurements = await ASYNC_LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
     logger.info(len(class_measurements))
     measurements = Ref(LOCAL_STATE.fields.class_measurements)
     student_ids = Ref(LOCAL_STATE.fields.stage_4_class_data_students)
-    if class_measurements and not student_ids.value:
-        ids = [int(id) for id in np.unique([m.student_id for m in class_measurements])]
+    if len(class_measurements) and not student_ids.value:
+        ids = class_measurements.student_ids()
         student_ids.set(ids)
     measurements.set(class_measurements)
 
-    class_data_points = [m for m in class_measurements if m.student_id in student_ids.value]
+    class_data_points = class_measurements.for_students(student_ids.value)
     return class_data_points
 
 
@@ -52,7 +54,7 @@ def Page():
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         # considered higher-level and is loaded when the story starts
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 4.")
@@ -60,27 +62,28 @@ def Page():
 
     solara.lab.use_task(_load_component_state)
 
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote component state for stage 4 to database.")
-        else:
-            logger.info("Did not write component state for stage 4 to database.")
-
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
 
-    class_plot_data = solara.use_reactive([])
+    class_plot_data = solara.use_reactive(MeasurementTable.empty())
 
     student_plot_data = solara.use_reactive(LOCAL_STATE.value.measurements)
     async def _load_student_data():
         if not LOCAL_STATE.value.measurements_loaded:
             logger.info("Loading measurements")
-            measurements = LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
+            measurements = await ASYNC_LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
             student_plot_data.set(measurements)
     solara.lab.use_task(_load_student_data)
 
@@ -122,12 +125,12 @@ def Page():
     if not (load_class_data.finished or load_class_data.pending):
         load_class_data()
 
-    def _on_class_data_loaded(class_data_points: List[StudentMeasurement]):
+    def _on_class_data_loaded(class_data_points: MeasurementTable):
         logger.info("Setting up class glue data")
-        if not class_data_points:
+        if not len(class_data_points):
             return
 
-        class_data = models_to_glue_data(class_data_points, label="Stage 4 Class Data")
+        class_data = class_data_points.to_glue_data(label="Stage 4 Class Data")
         if not class_data.components:
             class_data = empty_data_from_model_class(StudentMeasurement, label="Stage 4 Class Data")
         class_data = GLOBAL_STATE.value.add_or_update_data(class_data)
@@ -161,19 +164,22 @@ def Page():
         with solara.Column():
             solara.Button(label="Shortcut: Jump to Stage 5", on_click=_jump_stage_5, classes=["demo-button"])
 
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     with solara.ColumnsResponsive(12, large=[4,8]):
         with rv.Col():
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineExploreData.vue",
                 event_next_callback = lambda _: transition_next(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.exp_dat1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAgeUniverseEstimate3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.age_uni3),
                 state_view={
                     "age_const": AGE_CONSTANT,
@@ -185,7 +191,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineAgeUniverseEstimate4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.age_uni4),
                 state_view={
                     "age_const": AGE_CONSTANT,
@@ -216,7 +222,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineTrendsDataMC1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.tre_dat1),
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -228,14 +234,14 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineTrendsData2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.tre_dat2),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineTrendsDataMC3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.tre_dat3),
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -247,7 +253,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineRelationshipVelDistMC.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.rel_vel1),
                 event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -259,42 +265,42 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineTrendLines1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.tre_lin1),               
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineTrendLinesDraw2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.tre_lin2),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineBestFitLine.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.bes_fit1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineHubblesExpandingUniverse1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.hub_exp1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAgeUniverse.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.age_uni1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineHypotheticalGalaxy.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.hyp_gal1),
                 state_view={
                     "hypgal_distance": COMPONENT_STATE.value.best_fit_gal_dist,
@@ -305,14 +311,14 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineAgeRaceEquation.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.age_rac1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineAgeUniverseEquation2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.age_uni2),
                 state_view={
                     "age_const": AGE_CONSTANT
@@ -322,16 +328,16 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineYourAgeEstimate.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.you_age1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineShortcomingsEstReflect1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sho_est1),
-                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
                     'free_response_a': get_free_response(LOCAL_STATE, COMPONENT_STATE,'shortcoming-1'),
                     'free_response_b': get_free_response(LOCAL_STATE, COMPONENT_STATE,'shortcoming-2'),
@@ -342,7 +348,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineShortcomingsEst2.vue",
                 event_next_callback=lambda _: router.push("05-class-results-uncertainty"),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sho_est2),
             )
 
@@ -424,18 +430,23 @@ def Page():
                     with rv.Col(class_="no-padding"):
                         if student_plot_data.value and class_plot_data.value:
                             # Note the ordering here - we want the student data on top
-                            layers = (class_plot_data.value, student_plot_data.value)
+                            class_points = class_plot_data.value
+                            student_points = student_plot_data.value
+                            layers = (
+                                (class_points.est_dist_value.tolist(), class_points.velocity_value.tolist()),
+                                ([t.est_dist_value for t in student_points], [t.velocity_value for t in student_points]),
+                            )
                             layers_visible = (False, True)
 
                             plot_data=[
                                 {
-                                    "x": [t.est_dist_value for t in data],
-                                    "y": [t.velocity_value for t in data],
+                                    "x": x,
+                                    "y": y,
                                     "mode": "markers",
                                     "marker": { "color": color, "size": size },
                                     "visible": visibility,    
                                     "hoverinfo": "none"
-                                } for data, color, size, visibility in zip(layers, colors, sizes, layers_visible)
+                                } for (x, y), color, size, visibility in zip(layers, colors, sizes, layers_visible)
                             ]
 
                             draw_click_count = Ref(COMPONENT_STATE.fields.draw_click_count)
@@ -5,6 +5,7 @@ from pydantic import BaseModel, field_validator
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
 from hubbleds.base_component_state import BaseComponentState
+from hubbleds.gate_cache import gate
 from hubbleds.state import LOCAL_STATE
 
 import enum
@@ -56,33 +57,33 @@ class ComponentState(BaseComponentState, BaseState):
             return Marker(v)
         return v
     
-    @property
+    @gate(questions=["tre-dat-mc1"])
     def tre_dat2_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("tre-dat-mc1")
 
-    @property
+    @gate(fields=["class_data_displayed"])
     def tre_dat3_gate(self) -> bool:
-        return COMPONENT_STATE.value.class_data_displayed
+        return self.class_data_displayed
     
-    @property
+    @gate(questions=["tre-dat-mc3"])
     def rel_vel1_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("tre-dat-mc3")
     
-    @property
+    @gate(questions=["galaxy-trend"])
     def hub_exp1_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("galaxy-trend")
 
-    @property
+    @gate(fields=["hubble_slideshow_finished"])
     def tre_lin1_gate(self) -> bool:
-        return COMPONENT_STATE.value.hubble_slideshow_finished
+        return self.hubble_slideshow_finished
     
-    @property
+    @gate(fields=["draw_click_count"])
     def bes_fit1_gate(self) -> bool:
-        return COMPONENT_STATE.value.draw_click_count > 0
+        return self.draw_click_count > 0
     
-    @property
+    @gate(fields=["best_fit_click_count"])
     def age_uni1_gate(self) -> bool:
-        return COMPONENT_STATE.value.best_fit_click_count > 0
+        return self.best_fit_click_count > 0
 
     
     # @property
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import ExitStack
 from echo import delay_callback, add_callback
 from glue.core import Subset
@@ -19,6 +20,7 @@ from cosmicds.components import LayerToggle, PercentageSelector, ScaffoldAlert,
 from cosmicds.utils import empty_data_from_model_class, show_legend, show_layer_traces_in_legend
 from cosmicds.viewers import CDSHistogramView
 from hubbleds.base_component_state import transition_next, transition_previous
+from hubbleds.measurement_table import MeasurementTable
 from hubbleds.components import UncertaintySlideshow, IdSlider
 from hubbleds.tools import *  # noqa
 from hubbleds.state import LOCAL_STATE, GLOBAL_STATE, ClassSummary, StudentMeasurement, StudentSummary, get_free_response, get_multiple_choice, mc_callback, fr_callback
@@ -26,7 +28,8 @@ from hubbleds.utils import create_single_summary, make_summary_data, models_to_g
 from hubbleds.viewers.hubble_histogram_viewer import HubbleHistogramView
 from hubbleds.viewers.hubble_scatter_viewer import HubbleScatterView
 from .component_state import COMPONENT_STATE, Marker
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.write_queue import get_write_queue
 from hubbleds.viewer_marker_colors import (
     MY_DATA_COLOR,
     MY_DATA_COLOR_NAME,
@@ -57,7 +60,7 @@ def Page():
     async def _load_component_state():
         # Load stored component state from database, measurement data is
         # considered higher-level and is loaded when the story starts
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
 
         # TODO: What else to we need to do here?
         logger.info("Finished loading component state for stage 4.")
@@ -65,21 +68,20 @@ def Page():
 
     solara.lab.use_task(_load_component_state)
 
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote stage 5 component state to database.")
-        else:
-            logger.info("Did not write stage 5 component state to database.")
-
-
-        
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
     
     student_default_color = MY_CLASS_COLOR
     student_highlight_color = MY_DATA_COLOR
@@ -112,10 +114,54 @@ def Page():
                 viewer.state.hist_x_min = xmin
                 viewer.state.hist_x_max = xmax
 
+    data_loaded = solara.use_reactive(False)
+
+    async def _load_data():
+        if not LOCAL_STATE.value.measurements_loaded:
+            await ASYNC_LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
+
+        # The all-data payload is the largest one, so both are fetched at once
+        class_measurements, (all_measurements, student_summaries, class_summaries) = await asyncio.gather(
+            ASYNC_LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE),
+            ASYNC_LOCAL_API.get_all_data(GLOBAL_STATE, LOCAL_STATE),
+        )
+
+        measurements = Ref(LOCAL_STATE.fields.class_measurements)
+        student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
+        if len(class_measurements) and not student_ids.value:
+            ids = class_measurements.student_ids()
+            student_ids.set(ids)
+        measurements.set(class_measurements)
+
+        if GLOBAL_STATE.value.classroom.class_info is not None:
+            class_id = GLOBAL_STATE.value.classroom.class_info["id"]
+            complete = class_measurements.complete()
+            class_distances = class_measurements.est_dist_value[complete]
+            class_velocities = class_measurements.velocity_value[complete]
+            my_class_h0, my_class_age = create_single_summary(distances=class_distances, velocities=class_velocities)
+            class_summaries.append(ClassSummary(class_id=class_id, hubble_fit_value=my_class_h0, age_value=my_class_age))
+            class_measurements = class_measurements.with_class_id(class_id)
+            measurements.set(class_measurements)
+            all_measurements = MeasurementTable.concat(all_measurements, class_measurements)
+
+        all_meas = Ref(LOCAL_STATE.fields.all_measurements)
+        all_stu_summaries = Ref(LOCAL_STATE.fields.student_summaries)
+        all_cls_summaries = Ref(LOCAL_STATE.fields.class_summaries)
+        all_meas.set(all_measurements)
+        all_stu_summaries.set(student_summaries)
+        all_cls_summaries.set(class_summaries)
+
+        data_loaded.set(True)
+
+    solara.lab.use_task(_load_data, dependencies=[])
+
     data_ready = solara.use_reactive(False)
-    def glue_setup() -> Tuple[JupyterApplication, Dict[str, PlotlyBaseView]]:
+    def glue_setup() -> Tuple[JupyterApplication, Dict[str, PlotlyBaseView]] | Tuple[None, None]:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
+        if not data_loaded.value:
+            return None, None
+
         gjapp = JupyterApplication(
             GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
         )
@@ -139,34 +185,9 @@ def Page():
         for att in ('x_min', 'x_max'):
             link((all_student_hist_viewer.state, att), (class_hist_viewer.state, att))
 
-        if not LOCAL_STATE.value.measurements_loaded:
-            LOCAL_API.get_measurements(GLOBAL_STATE, LOCAL_STATE)
-
-        class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
-        measurements = Ref(LOCAL_STATE.fields.class_measurements)
-        student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
-        if class_measurements and not student_ids.value:
-            ids = list(np.unique([m.student_id for m in class_measurements]))
-            student_ids.set(ids)
-        measurements.set(class_measurements)
-
-        all_measurements, student_summaries, class_summaries = LOCAL_API.get_all_data(GLOBAL_STATE, LOCAL_STATE)
-        if GLOBAL_STATE.value.classroom.class_info is not None:
-            class_id = GLOBAL_STATE.value.classroom.class_info["id"]
-            class_distances = [distance for m in class_measurements if ((distance := m.est_dist_value) is not None and m.velocity_value is not None)]
-            class_velocities = [velocity for m in class_measurements if (m.est_dist_value is not None and (velocity := m.velocity_value) is not None)]
-            my_class_h0, my_class_age = create_single_summary(distances=class_distances, velocities=class_velocities)
-            class_summaries.append(ClassSummary(class_id=class_id, hubble_fit_value=my_class_h0, age_value=my_class_age))
-            for measurement in class_measurements:
-                measurement.class_id = class_id
-            all_measurements.extend(class_measurements)
-
-        all_meas = Ref(LOCAL_STATE.fields.all_measurements)
-        all_stu_summaries = Ref(LOCAL_STATE.fields.student_summaries)
-        all_cls_summaries = Ref(LOCAL_STATE.fields.class_summaries)
-        all_meas.set(all_measurements)
-        all_stu_summaries.set(student_summaries)
-        all_cls_summaries.set(class_summaries)
+        all_measurements = LOCAL_STATE.value.all_measurements
+        student_summaries = LOCAL_STATE.value.student_summaries
+        class_summaries = LOCAL_STATE.value.class_summaries
 
         student_data = models_to_glue_data(LOCAL_STATE.value.measurements, label="My Data")
         if not student_data.components:
@@ -174,8 +195,8 @@ def Page():
         student_data = GLOBAL_STATE.value.add_or_update_data(student_data)
 
         class_ids = LOCAL_STATE.value.stage_5_class_data_students
-        class_data_points = [m for m in LOCAL_STATE.value.class_measurements if m.student_id in class_ids]
-        class_data = models_to_glue_data(class_data_points, label="Class Data")
+        class_data_points = LOCAL_STATE.value.class_measurements.for_students(class_ids)
+        class_data = class_data_points.to_glue_data(label="Class Data")
         class_data = GLOBAL_STATE.value.add_or_update_data(class_data)
 
         for component in ("est_dist_value", "velocity_value"):
@@ -246,7 +267,7 @@ def Page():
         student_hist_viewer.layers[0].state.color = MY_CLASS_COLOR
         student_hist_viewer.add_subset(my_summ_subset)
 
-        all_data = models_to_glue_data(all_measurements, label="All Measurements")
+        all_data = all_measurements.to_glue_data(label="All Measurements")
         all_data = GLOBAL_STATE.value.add_or_update_data(all_data)
 
         student_summ_data = models_to_glue_data(student_summaries, label="All Student Summaries")
@@ -306,7 +327,7 @@ def Page():
 
         return gjapp, viewers
 
-    gjapp, viewers = solara.use_memo(glue_setup, dependencies=[])
+    gjapp, viewers = solara.use_memo(glue_setup, dependencies=[data_loaded.value])
 
     if not data_ready.value:
         rv.ProgressCircular(
@@ -408,6 +429,9 @@ def Page():
 
     loaded_component_state.subscribe(_on_component_state_loaded)
 
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     #--------------------- Row 1: OUR DATA HUBBLE VIEWER -----------------------
     if (
             COMPONENT_STATE.value.current_step_between(Marker.ran_var1, Marker.fin_cla1) \
@@ -419,7 +443,7 @@ def Page():
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineRandomVariability.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     allow_back=False,
                     show=COMPONENT_STATE.value.is_current_step(Marker.ran_var1),
                 )
@@ -427,7 +451,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineFinishedClassmates.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.fin_cla1),
                     state_view={
                         "class_data_size": COMPONENT_STATE.value.class_data_size
@@ -437,7 +461,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassData.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_dat1),
                     state_view={
                         "class_data_size": COMPONENT_STATE.value.class_data_size
@@ -449,21 +473,21 @@ def Page():
                 #     GUIDELINE_ROOT / "GuidelineTrendLinesDraw2c.vue",
                 #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                #     can_advance=can_advance,
                 #     show=COMPONENT_STATE.value.is_current_step(Marker.tre_lin2c),
                 # )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineBestFitLinec.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.bes_fit1c),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineYourAgeEstimatec.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.you_age1c),
                     state_view={
                         "low_guess": get_free_response(LOCAL_STATE, COMPONENT_STATE,"likely-low-age").get("response"),
@@ -483,7 +507,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassmatesResults.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_res1),
                     state_view={
                         "class_data_size": COMPONENT_STATE.value.class_data_size,
@@ -495,7 +519,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineRelationshipAgeSlopeMC.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.rel_age1),
                     event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     state_view={
@@ -507,7 +531,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeRange.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_age1),
                     state_view={
                         "student_low_age": COMPONENT_STATE.value.student_low_age,
@@ -518,7 +542,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeRange2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_age2),
                     state_view={
                         "student_low_age": COMPONENT_STATE.value.student_low_age,
@@ -529,7 +553,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeRange3.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_age3),
                     state_view={
                         "student_low_age": COMPONENT_STATE.value.student_low_age,
@@ -540,7 +564,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeRange4.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _:transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_age4),
                     state_view={
                         "student_low_age": COMPONENT_STATE.value.student_low_age,
@@ -551,7 +575,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineLearnUncertainty1.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.lea_unc1),
                     state_view={
                         "uncertainty_slideshow_finished": COMPONENT_STATE.value.uncertainty_slideshow_finished,
@@ -561,7 +585,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineMostLikelyValue1.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.mos_lik1),
                 )
 
@@ -604,7 +628,7 @@ def Page():
                             age_calc_short1=get_free_response(LOCAL_STATE, COMPONENT_STATE,"shortcoming-1").get("response"),
                             age_calc_short2=get_free_response(LOCAL_STATE, COMPONENT_STATE,"shortcoming-2").get("response"),
                             age_calc_short_other=get_free_response(LOCAL_STATE, COMPONENT_STATE,"other-shortcomings").get("response"),    
-                            event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                            event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                             free_responses=[get_free_response(LOCAL_STATE, COMPONENT_STATE,'shortcoming-4'), get_free_response(LOCAL_STATE, COMPONENT_STATE,'systematic-uncertainty')]   
                         )
             
@@ -617,7 +641,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassmatesResultsc.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_res1c),
                     state_view={
                         "my_class_color": MY_CLASS_COLOR_NAME,
@@ -628,7 +652,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeRangec.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.cla_age1c),
                     state_view={
                         "class_low_age": COMPONENT_STATE.value.class_low_age,
@@ -669,7 +693,7 @@ def Page():
                         age_calc_short1=get_free_response(LOCAL_STATE, COMPONENT_STATE,"shortcoming-1").get("response"),
                         age_calc_short2=get_free_response(LOCAL_STATE, COMPONENT_STATE,"shortcoming-2").get("response"),
                         age_calc_short_other=get_free_response(LOCAL_STATE, COMPONENT_STATE,"other-shortcomings").get("response"),  
-                        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                         free_responses=[get_free_response(LOCAL_STATE, COMPONENT_STATE,'shortcoming-4'), get_free_response(LOCAL_STATE, COMPONENT_STATE,'systematic-uncertainty')]
                 )
 
@@ -706,28 +730,28 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeDistribution.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.age_dis1),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineShowMyAgeDistribution.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.sho_mya1),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineMostLikelyValue2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.mos_lik2),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineMostLikelyValue3.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.mos_lik3),
                 )
 
@@ -735,14 +759,14 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineConfidenceInterval.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.con_int1),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineConfidenceInterval2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.con_int2),
                 )
 
@@ -770,9 +794,9 @@ def Page():
         GUIDELINE_ROOT / "GuidelineMostLikelyValueReflect4.vue",
         event_next_callback=lambda _: transition_next(COMPONENT_STATE),
         event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-        can_advance=COMPONENT_STATE.value.can_transition(next=True),
+        can_advance=can_advance,
         show=COMPONENT_STATE.value.is_current_step(Marker.mos_lik4),
-        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
         state_view={
             'free_response_a': get_free_response(LOCAL_STATE, COMPONENT_STATE,'best-guess-age'),
             # 'best_guess_answered': LOCAL_STATE.value.question_completed("best-guess-age"),
@@ -784,9 +808,9 @@ def Page():
         GUIDELINE_ROOT / "GuidelineConfidenceIntervalReflect3.vue",
         event_next_callback=lambda _: transition_next(COMPONENT_STATE),
         event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-        can_advance=COMPONENT_STATE.value.can_transition(next=True),
+        can_advance=can_advance,
         show=COMPONENT_STATE.value.is_current_step(Marker.con_int3),
-        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+        event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
         state_view={
             'free_response_a': get_free_response(LOCAL_STATE, COMPONENT_STATE,'likely-low-age'),
             'free_response_b': get_free_response(LOCAL_STATE, COMPONENT_STATE,'likely-high-age'),
@@ -826,21 +850,21 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineClassAgeDistributionc.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.age_dis1c),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineTwoHistograms1.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.two_his1),
                 )
                 ScaffoldAlert(
                     GUIDELINE_ROOT / "GuidelineTwoHistogramsMC2.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.two_his2),
                     event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     state_view = {
@@ -852,7 +876,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineTwoHistogramsMC3.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.two_his3),
                     event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     state_view = {
@@ -864,7 +888,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineTwoHistogramsMC4.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.two_his4),
                     event_mc_callback=lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     state_view = {
@@ -876,9 +900,9 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineTwoHistogramsReflect5.vue",
                     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.two_his5),
-                    event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                    event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                     state_view={
                         'free_response': get_free_response(LOCAL_STATE, COMPONENT_STATE,'unc-range-change-reasoning'),
                     }
@@ -888,7 +912,7 @@ def Page():
                     GUIDELINE_ROOT / "GuidelineMoreDataDistribution.vue",
                     event_next_callback=lambda _: router.push("06-prodata"),
                     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                    can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                    can_advance=can_advance,
                     show=COMPONENT_STATE.value.is_current_step(Marker.mor_dat1),
                 )
 
@@ -902,9 +926,9 @@ def Page():
             GUIDELINE_ROOT / "GuidelineConfidenceIntervalReflect2c.vue",
             event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            can_advance=can_advance,
             show=COMPONENT_STATE.value.is_current_step(Marker.con_int2c),
-            event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+            event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
             state_view={
                 "low_guess": get_free_response(LOCAL_STATE, COMPONENT_STATE,"likely-low-age").get("response"),
                 "high_guess": get_free_response(LOCAL_STATE, COMPONENT_STATE,"likely-high-age").get("response"),
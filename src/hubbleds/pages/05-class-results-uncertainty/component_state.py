@@ -5,6 +5,7 @@ from pydantic import BaseModel, field_validator
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
 from hubbleds.base_component_state import BaseComponentState
+from hubbleds.gate_cache import gate
 from hubbleds.state import LOCAL_STATE
 
 import enum
@@ -70,13 +71,13 @@ class ComponentState(BaseComponentState, BaseState):
             return Marker(v)
         return v
 
-    @property
+    @gate(questions=["age-slope-trend"])
     def cla_age1_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("age-slope-trend")
 
-    @property
+    @gate(fields=["uncertainty_slideshow_finished"])
     def mos_lik1_gate(self) -> bool:
-        return COMPONENT_STATE.value.uncertainty_slideshow_finished
+        return self.uncertainty_slideshow_finished
 
     # @property
     # def con_int1_gate(self) -> bool:
@@ -86,23 +87,23 @@ class ComponentState(BaseComponentState, BaseState):
     # def cla_dat1_gate(self) -> bool:
     #     return LOCAL_STATE.value.question_completed("likely-low-age") and LOCAL_STATE.value.question_completed("likely-high-age") and LOCAL_STATE.value.question_completed("my-reasoning-2")  
 
-    @property
+    @gate(fields=["class_best_fit_clicked"])
     def you_age1c_gate(self) -> bool:
-        return COMPONENT_STATE.value.class_best_fit_clicked
+        return self.class_best_fit_clicked
     
     # @property
     # def two_his1_gate(self) -> bool:
     #     return LOCAL_STATE.value.question_completed("new-most-likely-age") and LOCAL_STATE.value.question_completed("new-likely-low-age") and LOCAL_STATE.value.question_completed("new-likely-high-age") and LOCAL_STATE.value.question_completed("my-updated-reasoning")  
 
-    @property
+    @gate(questions=["histogram-range"])
     def two_his3_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("histogram-range")
     
-    @property
+    @gate(questions=["histogram-percent-range"])
     def two_his4_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("histogram-percent-range")
     
-    @property
+    @gate(questions=["histogram-distribution"])
     def two_his5_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("histogram-distribution")
 
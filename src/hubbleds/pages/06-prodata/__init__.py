@@ -14,7 +14,8 @@ from cosmicds.logger import setup_logger
 from cosmicds.utils import show_legend, show_layer_traces_in_legend
 
 # hubbleds
-from hubbleds.remote import LOCAL_API
+from hubbleds.remote import LOCAL_API, ASYNC_LOCAL_API
+from hubbleds.write_queue import get_write_queue
 from hubbleds.base_component_state import (
     transition_previous,
     transition_next,
@@ -36,7 +37,7 @@ from hubbleds.viewer_marker_colors import (
     HST_KEY_COLOR_NAME,
 )
 
-from ...utils import HST_KEY_AGE, models_to_glue_data, AGE_CONSTANT
+from ...utils import HST_KEY_AGE, AGE_CONSTANT
 
 from .component_state import COMPONENT_STATE, Marker
 
@@ -78,30 +79,48 @@ def Page():
     loaded_component_state = solara.use_reactive(False)
 
     async def _load_component_state():
-        LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
+        await ASYNC_LOCAL_API.get_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
         logger.info("Finished loading component state")
         loaded_component_state.set(True)
     
     solara.lab.use_task(_load_component_state)
     
-    async def _write_component_state():
+    def _write_component_state():
         if not loaded_component_state.value:
             return
 
-        # Listen for changes in the states and write them to the database
-        res = LOCAL_API.put_stage_state(GLOBAL_STATE, LOCAL_STATE, COMPONENT_STATE)
-        if res:
-            logger.info("Wrote stage 6 component state to database.")
-        else:
-            logger.info("Did not write stage 6 component state to database.")
+        # Listen for changes in the states and queue writes to the database
+        get_write_queue().submit(
+            f"stage-state/{COMPONENT_STATE.value.stage_id}",
+            ASYNC_LOCAL_API.put_stage_state,
+            GLOBAL_STATE,
+            LOCAL_STATE,
+            COMPONENT_STATE,
+        )
+
+    solara.use_effect(_write_component_state, dependencies=[COMPONENT_STATE.value])
+
+    class_data_loaded = solara.use_reactive(False)
 
-    solara.lab.use_task(_write_component_state, dependencies=[COMPONENT_STATE.value])
+    async def _load_class_data():
+        if len(LOCAL_STATE.value.class_measurements) == 0:
+            class_measurements = await ASYNC_LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
+            student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
+            if len(class_measurements) and not student_ids.value:
+                ids = class_measurements.student_ids()
+                student_ids.set(ids)
+        class_data_loaded.set(True)
+
+    solara.lab.use_task(_load_class_data, dependencies=[])
     
     # === Setup Glue ===
     
-    def _glue_setup() -> Tuple[JupyterApplication, HubbleFitView]:
+    def _glue_setup() -> Tuple[JupyterApplication, HubbleFitView] | Tuple[None, None]:
         # NOTE: use_memo has to be part of the main page render. Including it
         #  in a conditional will result in an error.
+        if not class_data_loaded.value:
+            return None, None
+
         gjapp = JupyterApplication(
             GLOBAL_STATE.value.glue_data_collection, GLOBAL_STATE.value.glue_session
         )
@@ -119,17 +138,8 @@ def Page():
         if HUBBLE_1929_DATA_LABEL not in gjapp.data_collection:
             gjapp.data_collection.append(load_data(data_dir / f"{HUBBLE_1929_DATA_LABEL}.csv"))
         
-        if len(LOCAL_STATE.value.class_measurements) == 0:
-            class_measurements = LOCAL_API.get_class_measurements(GLOBAL_STATE, LOCAL_STATE)
-            measurements = Ref(LOCAL_STATE.fields.class_measurements)
-            student_ids = Ref(LOCAL_STATE.fields.stage_5_class_data_students)
-            if class_measurements and not student_ids.value:
-                ids = list(np.unique([m.student_id for m in class_measurements]))
-                student_ids.set(ids)
-            measurements.set(class_measurements)
-        
         if 'Class Data' not in gjapp.data_collection:
-            class_data = models_to_glue_data(LOCAL_STATE.value.class_measurements, label="Class Data")
+            class_data = LOCAL_STATE.value.class_measurements.to_glue_data(label="Class Data")
             class_data = GLOBAL_STATE.value.add_or_update_data(class_data)
 
         add_link(HUBBLE_1929_DATA_LABEL, 'Distance (Mpc)', HUBBLE_KEY_DATA_LABEL, 'Distance (Mpc)')
@@ -146,7 +156,7 @@ def Page():
         return gjapp, viewer
     
 
-    gjapp, viewer = solara.use_memo(_glue_setup)
+    gjapp, viewer = solara.use_memo(_glue_setup, dependencies=[class_data_loaded.value])
 
     def _state_callback_setup():
         # We want to minimize duplicate state handling, but also keep the states
@@ -156,6 +166,37 @@ def Page():
         pass
 
     solara.use_memo(_state_callback_setup)    
+
+    def linear_slope(x, y):
+        # returns the slope, m,  of y(x) = m*x
+        return sum(x * y) / sum(x * x)
+
+    def _update_class_age():
+        # The class data may be loaded before or after the component state
+        if not loaded_component_state.value or gjapp is None:
+            return
+
+        class_age = Ref(COMPONENT_STATE.fields.class_age)
+
+        data = gjapp.data_collection['Class Data']
+        vel = data['velocity_value']
+        dist = data['est_dist_value']
+        # only accept rows where both velocity and distance exist
+        indices = where((vel != 0) & (vel is not None) & (dist != 0) & (dist is not None))
+        if (indices[0].size > 0):
+            slope = linear_slope(dist[indices], vel[indices])
+            class_age.set(round(AGE_CONSTANT / slope, 8))
+
+    solara.use_effect(_update_class_age, dependencies=[loaded_component_state.value, gjapp])
+
+    if gjapp is None:
+        rv.ProgressCircular(
+            width=3,
+            color="primary",
+            indeterminate=True,
+            size=100,
+        )
+        return
     
     
     def show_class_data(viewer):
@@ -235,43 +276,25 @@ def Page():
     current_step.subscribe(display_fit_legend)
     display_fit_legend(COMPONENT_STATE.value.current_step)
 
-    @staticmethod
-    def linear_slope(x, y):
-        # returns the slope, m,  of y(x) = m*x
-        return sum(x * y) / sum(x * x)
-
-    def _on_component_state_loaded(value: bool):
-        if not value:
-            return
-
-        class_age = Ref(COMPONENT_STATE.fields.class_age)
-
-        data = gjapp.data_collection['Class Data']
-        vel = data['velocity_value']
-        dist = data['est_dist_value']
-        # only accept rows where both velocity and distance exist
-        indices = where((vel != 0) & (vel is not None) & (dist != 0) & (dist is not None))
-        if (indices[0].size > 0):
-            slope = linear_slope(dist[indices], vel[indices])
-            class_age.set(round(AGE_CONSTANT / slope, 8))     
-
-    loaded_component_state.subscribe(_on_component_state_loaded) 
 
     StateEditor(Marker, COMPONENT_STATE, LOCAL_STATE, LOCAL_API, show_all=True)
     
+    reachable_steps = COMPONENT_STATE.value.reachable_steps()
+    can_advance = COMPONENT_STATE.value.can_advance(reachable_steps)
+
     with solara.ColumnsResponsive(12, large=[4,8]):
         with rv.Col():
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineProfessionalData0.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat0),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineProfessionalData1.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat1),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -284,7 +307,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat2),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat2'), 'score_tag': 'pro-dat2'}
@@ -293,7 +316,7 @@ def Page():
             #     GUIDELINE_ROOT / "GuidelineProfessionalData3.vue",
             #     event_next_callback=lambda _: transition_next(COMPONENT_STATE),
             #     event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-            #     can_advance=COMPONENT_STATE.value.can_transition(next=True),
+            #     can_advance=can_advance,
             #     show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat3),
             #     event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE),
             #     state_view={'mc_score': get_multiple_choice(LOCAL_STATE, 'pro-dat3'), 'score_tag': 'pro-dat3'}
@@ -302,10 +325,10 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData4.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat4),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
-                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
                     'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat4'), 
                     'score_tag': 'pro-dat4',
@@ -317,7 +340,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData5.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat5),
                 state_view={
                     'hst_key_color': HST_KEY_COLOR_NAME
@@ -327,7 +350,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData6.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat6),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
@@ -343,10 +366,10 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData7.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat7),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
-                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
                     'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat7'), 
                     'score_tag': 'pro-dat7',
@@ -358,9 +381,9 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData8.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat8),
-                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE, lambda: LOCAL_API.put_story_state(GLOBAL_STATE, LOCAL_STATE)),
+                event_fr_callback = lambda event: fr_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={
                     'free_response_a': get_free_response(LOCAL_STATE, COMPONENT_STATE,'prodata-reflect-8a'),
                     'free_response_b': get_free_response(LOCAL_STATE, COMPONENT_STATE,'prodata-reflect-8b'),
@@ -371,7 +394,7 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineProfessionalData9.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.pro_dat9),
                 event_mc_callback = lambda event: mc_callback(event, LOCAL_STATE, COMPONENT_STATE),
                 state_view={'mc_score': get_multiple_choice(LOCAL_STATE, COMPONENT_STATE, 'pro-dat9'), 'score_tag': 'pro-dat9'}
@@ -380,21 +403,21 @@ def Page():
                 GUIDELINE_ROOT / "GuidelineStoryFinish.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sto_fin1),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineStoryFinish2.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sto_fin2),
             )
             ScaffoldAlert(
                 GUIDELINE_ROOT / "GuidelineStoryFinish3.vue",
                 event_next_callback=lambda _: transition_next(COMPONENT_STATE),
                 event_back_callback=lambda _: transition_previous(COMPONENT_STATE),
-                can_advance=COMPONENT_STATE.value.can_transition(next=True),
+                can_advance=can_advance,
                 show=COMPONENT_STATE.value.is_current_step(Marker.sto_fin3),
             )
         
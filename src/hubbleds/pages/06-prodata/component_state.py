@@ -5,6 +5,7 @@ from pydantic import field_validator
 from cosmicds.state import BaseState
 from hubbleds.base_marker import BaseMarker
 from hubbleds.base_component_state import BaseComponentState
+from hubbleds.gate_cache import gate
 from hubbleds.state import LOCAL_STATE
 
 import enum
@@ -51,23 +52,23 @@ class ComponentState(BaseComponentState, BaseState):
             return Marker(v)
         return v
     
-    @property
+    @gate(questions=["pro-dat1"])
     def pro_dat2_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat1")
     
-    @property
+    @gate(questions=["pro-dat2"])
     def pro_dat4_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat2") 
     
-    @property
+    @gate(questions=["pro-dat4"])
     def pro_dat5_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat4") #and LOCAL_STATE.value.question_completed("prodata-free-4")
     
-    @property
+    @gate(questions=["pro-dat6"])
     def pro_dat7_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat6")
     
-    @property
+    @gate(questions=["pro-dat7"])
     def pro_dat8_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat7") #and LOCAL_STATE.value.question_completed("prodata-free-7")
     
@@ -75,7 +76,7 @@ class ComponentState(BaseComponentState, BaseState):
     # def pro_dat9_gate(self) -> bool:
     #     return LOCAL_STATE.value.question_completed("prodata-reflect-8a") #and LOCAL_STATE.value.question_completed("prodata-reflect-8b") and LOCAL_STATE.value.question_completed("prodata-reflect-8c")
     
-    @property
+    @gate(questions=["pro-dat9"])
     def sto_fin1_gate(self) -> bool:
         return LOCAL_STATE.value.question_completed("pro-dat9")
     
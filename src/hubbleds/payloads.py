@@ -0,0 +1,86 @@
+from typing import Iterable, NamedTuple, TypeVar
+
+from pydantic import BaseModel
+
+from hubbleds.json_stream import ColumnBuffers, iter_array_items
+from hubbleds.state import ClassSummary, StudentMeasurement, StudentSummary
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class MeasurementsPayload(BaseModel):
+    measurements: list[StudentMeasurement]
+
+
+class AllDataPayload(BaseModel):
+    measurements: list[StudentMeasurement]
+    studentData: list[StudentSummary]
+    classData: list[ClassSummary]
+
+
+def parse_measurements(content: bytes | str) -> list[StudentMeasurement]:
+    """
+    The measurements of a ``{"measurements": [...]}`` response body.
+
+    The body is validated straight from its bytes in a single pass, rather
+    than decoded with `json` and then validated one measurement at a time.
+    """
+    return MeasurementsPayload.model_validate_json(content).measurements
+
+
+def parse_all_data(
+    content: bytes | str,
+) -> tuple[list[StudentMeasurement], list[StudentSummary], list[ClassSummary]]:
+    """
+    The measurements, student summaries and class summaries of an
+    ``all-data`` response body, validated in a single pass.
+    """
+    payload = AllDataPayload.model_validate_json(content)
+    return payload.measurements, payload.studentData, payload.classData
+
+
+# Bytes read from the response at a time when streaming `all-data`
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class AllDataColumns(NamedTuple):
+    measurements: ColumnBuffers
+    student_summaries: ColumnBuffers
+    class_summaries: ColumnBuffers
+
+
+def stream_all_data(chunks: Iterable[bytes]) -> AllDataColumns:
+    """
+    Decode an ``all-data`` response body from a stream of byte chunks into
+    columns, one row at a time.
+
+    Measurements without a class are dropped as they are read, and the
+    galaxy of each measurement is shared by all measurements of that galaxy,
+    so memory use follows the number of measurements kept rather than the
+    size of the body.
+    """
+    columns = AllDataColumns(
+        measurements=ColumnBuffers(
+            StudentMeasurement.model_fields, intern={"galaxy": "id"}
+        ),
+        student_summaries=ColumnBuffers(StudentSummary.model_fields),
+        class_summaries=ColumnBuffers(ClassSummary.model_fields),
+    )
+    buffers = {
+        "measurements": columns.measurements,
+        "studentData": columns.student_summaries,
+        "classData": columns.class_summaries,
+    }
+
+    for key, row in iter_array_items(chunks):
+        if key == "measurements" and row.get("class_id") is None:
+            continue
+        buffer = buffers.get(key)
+        if buffer is not None:
+            buffer.append(row)
+
+    return columns
+
+
+def summaries_from_columns(columns: ColumnBuffers, model: type[T]) -> list[T]:
+    return [model.model_validate(row) for row in columns.rows()]
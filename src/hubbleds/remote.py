@@ -1,13 +1,31 @@
-from cosmicds.utils import CDSJSONEncoder
 from hubbleds.state import ClassSummary, StudentMeasurement, StudentSummary
 from contextlib import closing
+from functools import cached_property
+from itertools import zip_longest
 from io import BytesIO
-import json
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
 from astropy.io import fits
-from hubbleds.state import GalaxyData, SpectrumData, LocalState
+from hubbleds.state import GalaxyData, SpectrumData, LocalState, NON_STORY_STATE_FIELDS
+from hubbleds.change_tracking import ChangeTracker
+from hubbleds.serialization import StoryStateSerializer, encode_json
+from hubbleds import json_patch
+from hubbleds.spectrum_cache import SPECTRUM_CACHE
+from hubbleds.measurement_table import MeasurementTable
+from hubbleds.payloads import (
+    STREAM_CHUNK_SIZE,
+    AllDataColumns,
+    parse_measurements,
+    stream_all_data,
+    summaries_from_columns,
+)
 from cosmicds.remote import BaseAPI
-from cosmicds.state import GlobalState, BaseState, GLOBAL_STATE
+from cosmicds.state import GlobalState, BaseState
 from solara import Reactive
+from solara.server import kernel_context
 from solara.toestand import Ref
 from cosmicds.logger import setup_logger
 from typing import List
@@ -20,55 +38,178 @@ logger = setup_logger("API")
 from .data_management import DB_VELOCITY_FIELD
 from numpy.random import Generator, PCG64, SeedSequence
 from numpy import arange, asarray, ravel, column_stack
-from typing import Any
+from typing import Any, Coroutine, TypeVar
+
+T = TypeVar("T")
 
 ELEMENT_REST = {"H-α": 6562.79, "Mg-I": 5176.7}
 DEBOUNCE_TIMEOUT = 1
 
+# Timeouts (in seconds) applied to every request. Endpoints that return
+#  whole-deployment payloads get a longer budget.
+REQUEST_TIMEOUT = 10
+LONG_REQUEST_TIMEOUT = 60
+MAX_CONNECTIONS = 20
+
+# Responses to a bulk submission that mean the server predates the bulk
+#  endpoints, so rows have to be submitted one at a time instead.
+BULK_UNSUPPORTED_STATUSES = {404, 405}
+
+# Responses to a story state patch that mean the server does not accept
+#  delta writes, or that the document the patch is based on is not the one
+#  the server holds. Either way the full story state is written instead.
+DELTA_UNSUPPORTED_STATUSES = {404, 405}
+DELTA_BASE_MISMATCH_STATUS = 409
+
+# Fields of the local state holding `MeasurementTable`s
+MEASUREMENT_TABLE_FIELDS = ("class_measurements", "all_measurements")
+
+# Fields of the app state that belong to the current session and must not be
+#  overwritten by what was stored in the database.
+SESSION_APP_FIELDS = {
+    "student",
+    "classroom",
+    "update_db",
+    "show_team_interface",
+    "allow_advancing",
+}
+
+
+# Threads that run the coroutines of synchronous calls made from a thread
+#  with a running event loop (see `LocalAPI._run`), each with an event loop
+#  of its own that is reused from call to call
+_SYNC_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_CONNECTIONS, thread_name_prefix="hubbleds-api-sync"
+)
+_thread_local = threading.local()
+
+
+def _thread_runner() -> asyncio.Runner:
+    runner = getattr(_thread_local, "runner", None)
+    if runner is None:
+        runner = _thread_local.runner = asyncio.Runner()
+    return runner
+
+
+def _current_kernel_context():
+    try:
+        if kernel_context.has_current_context():
+            return kernel_context.get_current_context()
+    except RuntimeError:
+        pass
+    return None
+
 
 class LocalAPI(BaseAPI):
-    def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
-        galaxy_data_json = self.request_session.get(
-            f"{self.API_URL}/{local_state.value.story_id}/galaxies?types=Sp"
-        ).json()
+    """
+    Synchronous interface to the CosmicDS API server.
+
+    The endpoints are implemented once, by `AsyncLocalAPI`, from the URLs
+    and response handling defined here. The public methods here run those
+    coroutines to completion (see `_run`) and are intended for scripts and
+    synchronous callbacks; coroutines should await the equivalent methods on
+    `ASYNC_LOCAL_API` instead.
+    """
+
+    # Set once the server turns down a story state patch as unsupported,
+    #  after which only full story states are written
+    _story_delta_unsupported = False
+
+    @cached_property
+    def aio(self) -> "AsyncLocalAPI":
+        return AsyncLocalAPI(self)
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine of `AsyncLocalAPI` to completion and return its
+        result. It runs in the calling thread, so that the reactive state it
+        updates is that of the caller's session. A thread that is already
+        running an event loop cannot block on another one, so from there it
+        runs on one of a shared pool of threads, in the caller's kernel
+        context.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        if loop is self.aio._loop:
+            # Its requests would wait for the loop that is blocked on them
+            coro.close()
+            raise RuntimeError(
+                "LocalAPI cannot be used on the API loop, await ASYNC_LOCAL_API instead."
+            )
 
-        galaxy_data = [GalaxyData(**x) for x in galaxy_data_json]
+        context = _current_kernel_context()
 
-        return galaxy_data
+        def run():
+            if context is None:
+                return _thread_runner().run(coro)
+            with context:
+                return _thread_runner().run(coro)
 
-    def load_spectrum_data(
+        return _SYNC_EXECUTOR.submit(run).result()
+
+    def _galaxies_url(self, local_state: Reactive[LocalState]) -> str:
+        return f"{self.API_URL}/{local_state.value.story_id}/galaxies?types=Sp"
+
+    def _galaxies_from_response(self, r) -> list[GalaxyData]:
+        return [GalaxyData(**x) for x in r.json()]
+
+    def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
+        return self._run(self.aio.get_galaxies(local_state))
+
+    def _spectrum_url(
         self, gal_data: GalaxyData, local_state: Reactive[LocalState]
-    ) -> SpectrumData | None:
+    ) -> str:
         file_name = f"{gal_data.name.replace('.fits', '')}.fits"
 
         type_folders = {"Sp": "spiral", "E": "elliptical", "Ir": "irregular"}
         folder = type_folders[gal_data.type]
-        url = (
+        return (
             f"{self.API_URL}/{local_state.value.story_id}/spectra/{folder}/{file_name}"
         )
-        response = self.request_session.get(url)
 
-        with closing(BytesIO(response.content)) as f:
+    def _cached_spectrum(self, gal_data: GalaxyData) -> SpectrumData | None:
+        spec_data = SPECTRUM_CACHE.get(gal_data.name, gal_data.type)
+        if spec_data is not None:
+            logger.info(
+                "Loaded spectrum data for galaxy `%s` from cache.", gal_data.id
+            )
+        return spec_data
+
+    def _spectrum_from_response(
+        self, r, gal_data: GalaxyData
+    ) -> SpectrumData | None:
+        with closing(BytesIO(r.content)) as f:
             f.name = gal_data.name
 
             with fits.open(f) as hdulist:
                 data = hdulist["COADD"].data if "COADD" in hdulist else None
 
+                if data is not None:
+                    # Copied out so that the arrays outlive the file
+                    loglam = asarray(data["loglam"]).copy()
+                    flux = asarray(data["flux"]).copy()
+                    ivar = asarray(data["ivar"]).copy()
+
         if data is None:
             logger.error("No extension named 'COADD' in spectrum file.")
             return
 
-        spec_data = SpectrumData(
-            name=gal_data.name,
-            wave=10 ** data["loglam"],
-            flux=data["flux"],
-            ivar=data["ivar"],
+        spec_data = SPECTRUM_CACHE.put(
+            gal_data.name, gal_data.type, loglam=loglam, flux=flux, ivar=ivar
         )
 
         logger.info("Loaded spectrum data for galaxy `%s` from database.", gal_data.id)
 
         return spec_data
 
+    def load_spectrum_data(
+        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
+    ) -> SpectrumData | None:
+        return self._run(self.aio.load_spectrum_data(gal_data, local_state))
+
     def get_dummy_data(self) -> List[StudentMeasurement]:
         path = (Path(__file__).parent / "data" / "dummy_student_data.csv").as_posix()
         measurements = []
@@ -88,26 +229,122 @@ class LocalAPI(BaseAPI):
                 measurements.append(StudentMeasurement(**measurement))
         return measurements
 
-    def get_measurements(
+    def _app_story_states_url(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
-    ) -> list[StudentMeasurement]:
-        url = (
+    ) -> str:
+        return (
+            f"{self.API_URL}/story-state/{global_state.value.student.id}/"
+            f"{local_state.value.story_id}"
+        )
+
+    def _set_app_story_states(
+        self,
+        r,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ):
+        state_json = r.json().get("state") if r.status_code == 200 else None
+
+        if state_json is None:
+            logger.warning(
+                "No stored state for story `%s` for user `%s`.",
+                local_state.value.story_id,
+                global_state.value.student.id,
+            )
+            return
+
+        app_json = {
+            k: v
+            for k, v in state_json.get("app", {}).items()
+            if k not in SESSION_APP_FIELDS
+            and k in global_state.value.__class__.model_fields
+        }
+        if app_json:
+            # Validate the stored fields, but only copy those onto the current
+            #  app state so that session-only members are left untouched
+            restored = global_state.value.__class__(
+                **{**global_state.value.model_dump(), **app_json}
+            )
+            global_state.set(
+                global_state.value.model_copy(
+                    update={k: getattr(restored, k) for k in app_json}
+                )
+            )
+
+        story_json = state_json.get("story", {})
+        # The measurement tables are carried over as they are, rather than
+        #  dumped and validated again
+        local = local_state.value
+        tables = {name: getattr(local, name) for name in MEASUREMENT_TABLE_FIELDS}
+        local_state.set(
+            local.__class__(
+                **{**local.model_dump(exclude=set(tables)), **story_json, **tables}
+            )
+        )
+
+        logger.info("Updated app and story state from database.")
+
+        return global_state, local_state
+
+    def get_app_story_states(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ):
+        return self._run(self.aio.get_app_story_states(global_state, local_state))
+
+    def _stage_state_url(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ) -> str:
+        return (
+            f"{self.API_URL}/stage-state/{global_state.value.student.id}/"
+            f"{local_state.value.story_id}/{component_state.value.stage_id}"
+        )
+
+    def _set_stage_state(self, r, component_state: Reactive[BaseState]):
+        stage_json = r.json().get("state") if r.status_code == 200 else None
+
+        if stage_json is None:
+            logger.warning(
+                "No stored state for stage `%s`.", component_state.value.stage_id
+            )
+            return
+
+        component_state.set(
+            component_state.value.__class__(
+                **{**component_state.value.model_dump(), **stage_json}
+            )
+        )
+
+        logger.info("Updated component state from database.")
+
+        return component_state
+
+    def get_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ):
+        return self._run(
+            self.aio.get_stage_state(global_state, local_state, component_state)
+        )
+
+    def _measurements_url(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> str:
+        return (
             f"{self.API_URL}/{local_state.value.story_id}/measurements/"
             f"{global_state.value.student.id}"
         )
-        r = self.request_session.get(url)
-            
+
+    def _set_measurements(
+        self, r, local_state: Reactive[LocalState]
+    ) -> list[StudentMeasurement]:
         measurements = Ref(local_state.fields.measurements)
         if r.status_code == 200:
-            measurement_json = r.json()
-
-            parsed_measurements = []
-
-            for measurement in measurement_json["measurements"]:
-                measurement = StudentMeasurement(**measurement)
-                parsed_measurements.append(measurement)
-
-            measurements.set(parsed_measurements)
+            measurements.set(parse_measurements(r.content))
 
         Ref(local_state.fields.measurements_loaded).set(True)
 
@@ -115,131 +352,197 @@ class LocalAPI(BaseAPI):
 
         return measurements.value
 
-    def get_sample_measurements(
+    def get_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ) -> list[StudentMeasurement]:
-        r = self.request_session.get(
+        return self._run(self.aio.get_measurements(global_state, local_state))
+
+    def _sample_measurements_url(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> str:
+        return (
             f"{self.API_URL}/{local_state.value.story_id}/sample-"
             f"measurements/{global_state.value.student.id}"
         )
 
-        sample_measurement_json = r.json()
-
-        if len(sample_measurement_json["measurements"]) == 0:
+    def _missing_sample_measurements(
+        self,
+        sample_measurements: list[StudentMeasurement],
+        global_state: Reactive[GlobalState],
+    ) -> list[str]:
+        count = len(sample_measurements)
+        if count == 0:
             logger.info(
                 "Failed to find sample galaxies for user `%s`: creating new "
                 "sample measurement.",
                 global_state.value.student.id,
             )
-            sample_gal_data = LOCAL_API.get_sample_galaxy(local_state)
-            for meas in ['first', 'second']:
-                sample_measurement_json["measurements"].append(
-                    StudentMeasurement(
-                        student_id=global_state.value.student.id,
-                        galaxy=sample_gal_data,
-                        measurement_number=meas
-                    ).dict()
-                )
-        elif len(sample_measurement_json["measurements"]) == 1:
+            return ["first", "second"]
+        elif count == 1:
             logger.info(
                 "Example measurements only had the first. Creating missing second measurement"
             )
-            sample_gal_data = LOCAL_API.get_sample_galaxy(local_state)
-            sample_measurement_json["measurements"].append(
+            return ["second"]
+        return []
+
+    def _set_sample_measurements(
+        self,
+        parsed_sample_measurements: list[StudentMeasurement],
+        missing: list[str],
+        sample_gal_data: GalaxyData | None,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> list[StudentMeasurement]:
+        for meas in missing:
+            parsed_sample_measurements.append(
                 StudentMeasurement(
                     student_id=global_state.value.student.id,
                     galaxy=sample_gal_data,
-                    measurement_number='second'
-                ).dict()
+                    measurement_number=meas
+                )
             )
 
         sample_measurements = Ref(local_state.fields.example_measurements)
-        parsed_sample_measurements = []
-
-        for measurement in sample_measurement_json["measurements"]:
-            measurement = StudentMeasurement(**measurement)
-            parsed_sample_measurements.append(measurement)
-
         sample_measurements.set(parsed_sample_measurements)
 
         logger.info("Loaded example measurements from database.")
 
         return sample_measurements.value
 
-    def put_measurements(
+    def get_sample_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
-    ):  
-        
-        if not GLOBAL_STATE.value.update_db: 
-            logger.info('Skipping DB write')
-            return False
-        
-        url = f"{self.API_URL}/{local_state.value.story_id}/submit-measurement/"
+    ) -> list[StudentMeasurement]:
+        return self._run(self.aio.get_sample_measurements(global_state, local_state))
+
+    def _submit_measurement_urls(
+        self, local_state: Reactive[LocalState], samples: bool = False
+    ) -> tuple[str, str]:
+        """
+        The bulk and the single-row submission URLs for measurements (or for
+        example measurements if `samples` is set).
+        """
+        story_url = f"{self.API_URL}/{local_state.value.story_id}"
+        if samples:
+            return (
+                f"{story_url}/submit-sample-measurements/",
+                f"{story_url}/sample-measurement/",
+            )
+        return (
+            f"{story_url}/submit-measurements/",
+            f"{story_url}/submit-measurement/",
+        )
 
-        for measurement in local_state.value.measurements:
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
+    def _bulk_measurements_payload(
+        self,
+        measurements: list[StudentMeasurement],
+        global_state: Reactive[GlobalState],
+    ) -> dict:
+        return {
+            "student_id": global_state.value.student.id,
+            "measurements": [m.model_dump(exclude={"galaxy"}) for m in measurements],
+        }
 
-            if r.status_code != 200:
-                logger.warning(
-                    f"Failed to add measurement for galaxy `%s` by student `%s`.",
-                    global_state.value.student.id,
-                    measurement.galaxy_id,
-                )
+    def _failed_bulk_measurements(
+        self, r, measurements: list[StudentMeasurement]
+    ) -> list[StudentMeasurement] | None:
+        """
+        The measurements that the server rejected, based on the per-row
+        statuses of a bulk submission. Returns `None` if the server does not
+        provide the bulk endpoint, in which case the caller should fall back
+        to submitting one row at a time.
+        """
+        if r.status_code in BULK_UNSUPPORTED_STATUSES:
+            return None
 
-        logger.info(
-            "Stored measurements for student `%s`.",
-            global_state.value.student.id,
-        )
-        return True
+        if r.status_code != 200:
+            logger.error("Bulk measurement submission failed.")
+            logger.error(r.text)
+            return list(measurements)
+
+        # Rows the server did not report a result for are treated as failed
+        results = r.json().get("results", [])
+        return [
+            measurement
+            for measurement, result in zip_longest(measurements, results)
+            if measurement is not None
+            and (result is None or result.get("status") != 200)
+        ]
+
+    def _log_failed_measurements(
+        self,
+        failed: list[StudentMeasurement],
+        global_state: Reactive[GlobalState],
+        samples: bool = False,
+    ):
+        kind = "example measurement" if samples else "measurement"
+        for measurement in failed:
+            logger.warning(
+                "Failed to add %s for galaxy `%s` by student `%s`.",
+                kind,
+                measurement.galaxy_id,
+                global_state.value.student.id,
+            )
 
-    def put_sample_measurements(
-        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    def _commit_measurements(
+        self,
+        tracker: ChangeTracker | None,
+        measurements: list[StudentMeasurement],
+        failed: list[StudentMeasurement],
+        samples: bool = False,
     ):
-        if not GLOBAL_STATE.value.update_db: 
-            logger.info('Skipping DB write')
-            return False
-        
-        url = f"{self.API_URL}/{local_state.value.story_id}/sample-measurement/"
-    
-        for i, measurement in enumerate(local_state.value.example_measurements):
-            if i == 0:
-                logger.info(
-                    f"Adding example measurement for galaxy `%s` by student `%s`.",
-                    measurement.galaxy_id,
-                    global_state.value.student.id,
-                )
+        if tracker is None:
+            return
+        failed_ids = {id(m) for m in failed}
+        tracker.commit_measurements(
+            [m for m in measurements if id(m) not in failed_ids], samples
+        )
 
-            r = self.request_session.put(url, json=measurement.dict(exclude={"galaxy"}))
+    def _changed_measurements(
+        self,
+        tracker: ChangeTracker | None,
+        measurements: list[StudentMeasurement],
+        samples: bool = False,
+    ) -> list[StudentMeasurement]:
+        if tracker is None:
+            return measurements
+        return tracker.changed_measurements(measurements, samples)
 
-            if r.status_code != 200:
-                logger.warning(
-                    f"Failed to add example measurement for galaxy `%s` by student `%s`.",
-                    measurement.galaxy_id,
-                    global_state.value.student.id,
-                )
+    def put_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ):
+        return self._run(self.aio.put_measurements(global_state, local_state, tracker))
 
-            logger.info(
-                "Stored example measurements for student %s.",
-                global_state.value.student.id,
-            )
-        return True
+    def put_sample_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ):
+        return self._run(
+            self.aio.put_sample_measurements(global_state, local_state, tracker)
+        )
 
-    def get_measurement(
+    def _measurement_url(
         self,
         galaxy_id: int,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
-    ) -> StudentMeasurement:
-        logger.info(
-            "Retrieving measurement of galaxy %s for student %s...",
-            (galaxy_id, global_state.value.student.id),
-        )
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/measurements/"
-            f"{global_state.value.student.id}/{galaxy_id}"
-        )
-        measurement_json = self.request_session.get(url).json()
-        measurement = measurement_json["measurements"]
+    ) -> str:
+        return f"{self._measurements_url(global_state, local_state)}/{galaxy_id}"
+
+    def _single_sample_measurement_url(
+        self,
+        galaxy_id: int,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> str:
+        return f"{self._sample_measurements_url(global_state, local_state)}/{galaxy_id}"
+
+    def _add_measurement(self, r, local_state: Reactive[LocalState]):
+        measurement = r.json()["measurements"]
 
         measurements = Ref(local_state.fields.measurements)
 
@@ -247,198 +550,227 @@ class LocalAPI(BaseAPI):
 
         return measurement
 
-    def get_sample_measurement(
+    def get_measurement(
         self,
         galaxy_id: int,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
     ) -> StudentMeasurement:
-        logger.info(
-            "Retrieving sample measurement of galaxy %s for student %s...",
-            (galaxy_id, global_state.value.student.id),
-        )
-        url = (
-            f"{self.API_URL}/{local_state.value.story_id}/"
-            f"sample-measurements/{global_state.value.student.id}/"
-            f"{galaxy_id}"
+        return self._run(
+            self.aio.get_measurement(galaxy_id, global_state, local_state)
         )
-        measurement_json = self.request_session.get(url).json()
-        measurement = measurement_json["measurements"]
 
-        measurements = Ref(local_state.fields.measurements)
-
-        measurements.set(measurements.value + [measurement])
-
-        return measurement
+    def get_sample_measurement(
+        self,
+        galaxy_id: int,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> StudentMeasurement:
+        return self._run(
+            self.aio.get_sample_measurement(galaxy_id, global_state, local_state)
+        )
 
     def delete_all_measurements(
         self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
     ):
-        url = f"{self.API_URL}/{local_state.value.story_id}/measurements/{global_state.value.student.id}"
-        measurements_json = self.request_session.get(url).json()
+        return self._run(self.aio.delete_all_measurements(global_state, local_state))
 
-        for measurement in measurements_json["measurements"]:
-            # url = url + "/first" if samples else url + f"/{measurement['galaxy']['id']}"
-            url += f"/{measurement['galaxy']['id']}"
-            r = self.request_session.delete(url)
-
-            if r.status_code != 200:
-                logger.error(
-                    "Failed to delete measurement of galaxy `%s` for student `%s`.",
-                    measurement["galaxy"]["id"],
-                    global_state.value.student.id,
-                )
-                logger.error(r.text)
+    def _sample_galaxy_url(self, local_state: Reactive[LocalState]) -> str:
+        return f"{self.API_URL}/{local_state.value.story_id}/sample-galaxy"
 
     def get_sample_galaxy(self, local_state: Reactive[LocalState]) -> GalaxyData:
-        galaxy_json = self.request_session.get(
-            f"{self.API_URL}/{local_state.value.story_id}/sample-galaxy"
-        ).json()
+        return self._run(self.aio.get_sample_galaxy(local_state))
 
-        galaxy_data = GalaxyData(**galaxy_json)
-
-        return galaxy_data
-
-    def get_class_measurements(
-        self,
-        global_state: Reactive[GlobalState],
-        local_state: Reactive[LocalState],
-    ) -> list[StudentMeasurement]:
-        url = (
+    def _class_measurements_url(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> str:
+        return (
             f"{self.API_URL}/{local_state.value.story_id}/class-measurements/"
             f"{global_state.value.student.id}/{global_state.value.classroom.class_info['id']}"
             f"?complete_only=true"
         )
-        r = self.request_session.get(url)
-        measurement_json = r.json()
 
+    def _set_class_measurements(
+        self, r, local_state: Reactive[LocalState]
+    ) -> MeasurementTable:
         measurements = Ref(local_state.fields.class_measurements)
-        parsed_measurements = []
-
-        for measurement in measurement_json["measurements"]:
-            measurement = StudentMeasurement(**measurement)
-            parsed_measurements.append(measurement)
-
-        measurements.set(parsed_measurements)
+        measurements.set(MeasurementTable.from_models(parse_measurements(r.content)))
 
         logger.info("Loaded class measurements from database.")
 
         return measurements.value
 
-    def get_all_data(
+    def get_class_measurements(
         self,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
-    ) -> tuple[list[StudentMeasurement], list[StudentSummary], list[ClassSummary]]:
+    ) -> MeasurementTable:
+        return self._run(self.aio.get_class_measurements(global_state, local_state))
+
+    def _all_data_url(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> str:
         url = f"{self.API_URL}/{local_state.value.story_id}/all-data?minimal=True"
         if global_state.value.classroom.class_info is not None:
             url += f"&class_id={global_state.value.classroom.class_info['id']}"
-        r = self.request_session.get(url)
-        res_json = r.json()
+        return url
 
+    def _set_all_data(
+        self, columns: AllDataColumns, local_state: Reactive[LocalState]
+    ) -> tuple[MeasurementTable, list[StudentSummary], list[ClassSummary]]:
         measurements = Ref(local_state.fields.all_measurements)
-        parsed_measurements = []
-        for measurement in res_json["measurements"]:
-            if measurement["class_id"] is None:
-                continue
-            measurement = StudentMeasurement(**measurement)
-            parsed_measurements.append(measurement)
-
-        measurements.set(parsed_measurements)
+        measurements.set(MeasurementTable.from_columns(columns.measurements))
 
         student_summaries = Ref(local_state.fields.student_summaries)
-        parsed_student_summaries = []
-        for summary in res_json["studentData"]:
-            summary = StudentSummary(**summary)
-            parsed_student_summaries.append(summary)
-
-        student_summaries.set(parsed_student_summaries)
+        student_summaries.set(
+            summaries_from_columns(columns.student_summaries, StudentSummary)
+        )
 
         class_summaries = Ref(local_state.fields.class_summaries)
-        parsed_class_summaries = []
-        for summary in res_json["classData"]:
-            summary = ClassSummary(**summary)
-            parsed_class_summaries.append(summary)
-
-        class_summaries.set(parsed_class_summaries)
+        class_summaries.set(
+            summaries_from_columns(columns.class_summaries, ClassSummary)
+        )
 
         logger.info("Loaded all measurements and summary data from database.")
 
         return measurements.value, student_summaries.value, class_summaries.value
 
-    def put_stage_state(
+    def get_all_data(
         self,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
-        component_state: Reactive[BaseState],
-    ):
-        if not GLOBAL_STATE.value.update_db: 
-            logger.info('Skipping DB write')
-            return False
-        
-        logger.info("Serializing stage state into DB.")
+    ) -> tuple[MeasurementTable, list[StudentSummary], list[ClassSummary]]:
+        return self._run(self.aio.get_all_data(global_state, local_state))
 
+    def _stage_state_payload(self, component_state: Reactive[BaseState]) -> dict:
         comp_state_dict = component_state.value.dict(
             exclude={"selected_galaxy", "selected_example_galaxy"}
         )
         comp_state_dict.update(
             {"current_step": component_state.value.current_step.value}
         )
+        return comp_state_dict
 
-        r = self.request_session.put(
-            f"{self.API_URL}/stage-state/{global_state.value.student.id}/"
-            f"{local_state.value.story_id}/{component_state.value.stage_id}",
-            json=comp_state_dict,
+    def put_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ):
+        return self._run(
+            self.aio.put_stage_state(global_state, local_state, component_state)
+        )
+
+    def _story_state_payload(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ) -> bytes:
+        # The serializer of the tracker keeps the encoded fields of the last
+        #  write, so only the fields that changed since are encoded again
+        serializer = tracker.serializer if tracker is not None else StoryStateSerializer()
+        return serializer.payload(
+            global_state.value, local_state.value, exclude=NON_STORY_STATE_FIELDS
+        )
+
+    def _story_state_document(
+        self,
+        tracker: ChangeTracker | None,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> dict | None:
+        if tracker is None:
+            return None
+        return tracker.serializer.document(
+            global_state.value, local_state.value, exclude=NON_STORY_STATE_FIELDS
         )
 
+    def _story_state_patch(
+        self, tracker: ChangeTracker | None, document: dict | None
+    ) -> bytes | None:
+        """
+        The body of a delta write of `document`: an RFC 6902 patch from the
+        document the server last acknowledged, along with the hash the server
+        gave for that document as the base of the patch. Returns `None` if
+        the full story state has to be written instead.
+        """
+        if (
+            document is None
+            or tracker.story_hash is None
+            or self._story_delta_unsupported
+        ):
+            return None
+        patch = json_patch.diff(tracker.story_document, document)
+        return encode_json({"base": tracker.story_hash, "patch": patch})
+
+    @staticmethod
+    def _story_state_hash(r) -> str | None:
+        try:
+            return r.json().get("hash")
+        except (ValueError, AttributeError):
+            return None
+
+    def _story_state_written(
+        self,
+        r,
+        tracker: ChangeTracker | None,
+        document: dict | None,
+        delta: bool = False,
+    ) -> bool:
+        """
+        Whether a full or delta story state write succeeded. On success, the
+        written document and the hash the server returned for it are
+        recorded in `tracker` as the base of the next delta write.
+        """
         if r.status_code != 200:
-            logger.error("Failed to write story state to database.")
-            logger.error(r.text)
+            if delta and r.status_code in DELTA_UNSUPPORTED_STATUSES:
+                logger.info("Server does not accept story state patches.")
+                self._story_delta_unsupported = True
+            elif delta and r.status_code == DELTA_BASE_MISMATCH_STATUS:
+                logger.info("Stored story state changed, writing it in full.")
+            else:
+                logger.error("Failed to write story state to database.")
+                logger.error(r.text)
             return False
-        
+
+        if tracker is not None and document is not None:
+            tracker.acknowledge_story_document(document, self._story_state_hash(r))
         return True
 
+    def _story_state_changes(
+        self,
+        tracker: ChangeTracker | None,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> dict | None:
+        """
+        The pending story state changes to commit to `tracker` once written,
+        or `None` if there is no tracker. An empty dict means that nothing
+        has changed since the last write.
+        """
+        if tracker is None:
+            return None
+        changes = tracker.story_state_changes(global_state.value, local_state.value)
+        if not changes:
+            logger.info("No story state changes to write.")
+        return changes
+
     def put_story_state(
         self,
         global_state: Reactive[GlobalState],
         local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
     ):
-        if not GLOBAL_STATE.value.update_db: 
-            logger.info('Skipping DB write')
-            return False
-        
-        logger.info("Serializing state into DB.")
-
-        state = {
-            "app": global_state.value.model_dump(),
-            "story": local_state.value.as_dict(),
-        }
+        return self._run(self.aio.put_story_state(global_state, local_state, tracker))
 
-        state_json = json.dumps(state, cls=CDSJSONEncoder)
-        r = self.request_session.put(
-            f"{self.API_URL}/story-state/{global_state.value.student.id}/{local_state.value.story_id}",
-            headers={"Content-Type": "application/json"},
-            data=state_json,
-        )
+    def _example_seed_url(self, local_state: Reactive[LocalState]) -> str:
+        return f"{self.API_URL}/{local_state.value.story_id}/sample-measurements"
 
-        if r.status_code != 200:
-            logger.error("Failed to write story state to database.")
-            logger.error(r.text)
-            return False
-        
-        return True
+    def _example_seed_from_response(self, r, which="both") -> list[dict[str, Any]]:
+        res_json = r.json()
 
 
-    def get_example_seed_measurement(
-            self, 
-            local_state: Reactive[LocalState],
-            which="both"
-            ) -> list[dict[str, Any]]:
-        url = f"{self.API_URL}/{local_state.value.story_id}/sample-measurements"
-        r = self.request_session.get(url)
-        res_json = r.json()
-        
-        
         # TODO: Note that though this is from the old code
         # it seems to only pick the 2nd measurement
         vels = [record[DB_VELOCITY_FIELD] for record in res_json]
@@ -464,4 +796,463 @@ class LocalAPI(BaseAPI):
 
         return measurements
 
+    def get_example_seed_measurement(
+            self,
+            local_state: Reactive[LocalState],
+            which="both"
+            ) -> list[dict[str, Any]]:
+        return self._run(
+            self.aio.get_example_seed_measurement(local_state, which=which)
+        )
+
+
+
+class AsyncLocalAPI:
+    """
+    Awaitable interface to the CosmicDS API server, for use inside
+    coroutines such as those passed to `solara.lab.use_task`. This is the
+    one implementation of the endpoints, which the synchronous `LocalAPI`
+    wraps.
+
+    Requests go through a pooled `httpx.AsyncClient`, so a slow response
+    suspends only the awaiting task instead of the whole event loop. The
+    response handling always runs in the awaiting task so that reactive
+    state is updated from within the right session.
+
+    Solara runs each threaded task on an event loop of its own that is thrown
+    away afterwards, so the client lives on a single background loop instead
+    (see `loop`); that way its connections are reused by every task in every
+    session.
+    """
+
+    def __init__(
+        self,
+        api: LocalAPI,
+        timeout: float = REQUEST_TIMEOUT,
+        max_connections: int = MAX_CONNECTIONS,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._api = api
+        self._timeout = timeout
+        self._transport = transport
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def API_URL(self) -> str:
+        return self._api.API_URL
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """
+        The event loop that requests are sent from, which runs for the
+        lifetime of the process in a daemon thread of its own.
+        """
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="hubbleds-api",
+                    daemon=True,
+                ).start()
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Only to be used from coroutines running on `loop`
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=dict(self._api.request_session.headers),
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """
+        Schedule a coroutine on `loop` from any thread.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _on_loop(self, coro: Coroutine[Any, Any, T]) -> T:
+        if asyncio.get_running_loop() is self._loop:
+            return await coro
+        # Cancelling the awaiting task cancels the request as well
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        return await self._on_loop(self._request("GET", url, **kwargs))
+
+    async def _put(self, url: str, **kwargs) -> httpx.Response:
+        return await self._on_loop(self._request("PUT", url, **kwargs))
+
+    async def _patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self._on_loop(self._request("PATCH", url, **kwargs))
+
+    async def _delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self._on_loop(self._request("DELETE", url, **kwargs))
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.client.request(method, url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._on_loop(self._client.aclose())
+
+    async def get_galaxies(self, local_state: Reactive[LocalState]) -> list[GalaxyData]:
+        r = await self._get(self._api._galaxies_url(local_state))
+        return self._api._galaxies_from_response(r)
+
+    async def load_spectrum_data(
+        self, gal_data: GalaxyData, local_state: Reactive[LocalState]
+    ) -> SpectrumData | None:
+        while True:
+            spec_data = self._api._cached_spectrum(gal_data)
+            if spec_data is not None:
+                return spec_data
+
+            future, owner = SPECTRUM_CACHE.download(gal_data.name, gal_data.type)
+            if owner:
+                break
+
+            # Another session or prefetch worker is downloading it already.
+            #  Shielded so that cancelling this task leaves its download be.
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Its download was cancelled, so download it here instead
+
+        try:
+            r = await self._get(self._api._spectrum_url(gal_data, local_state))
+            spec_data = self._api._spectrum_from_response(r, gal_data)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(spec_data)
+        finally:
+            SPECTRUM_CACHE.finish_download(gal_data.name, gal_data.type)
+        return spec_data
+
+    async def get_app_story_states(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ):
+        r = await self._get(
+            self._api._app_story_states_url(global_state, local_state)
+        )
+        return self._api._set_app_story_states(r, global_state, local_state)
+
+    async def get_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ):
+        r = await self._get(
+            self._api._stage_state_url(global_state, local_state, component_state)
+        )
+        return self._api._set_stage_state(r, component_state)
+
+    async def get_measurements(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> list[StudentMeasurement]:
+        r = await self._get(
+            self._api._measurements_url(global_state, local_state)
+        )
+        return self._api._set_measurements(r, local_state)
+
+    async def get_sample_galaxy(self, local_state: Reactive[LocalState]) -> GalaxyData:
+        r = await self._get(self._api._sample_galaxy_url(local_state))
+        return GalaxyData(**r.json())
+
+    async def get_sample_measurements(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ) -> list[StudentMeasurement]:
+        r = await self._get(
+            self._api._sample_measurements_url(global_state, local_state)
+        )
+        sample_measurements = parse_measurements(r.content)
+
+        missing = self._api._missing_sample_measurements(
+            sample_measurements, global_state
+        )
+        sample_gal_data = (
+            await self.get_sample_galaxy(local_state) if missing else None
+        )
+
+        return self._api._set_sample_measurements(
+            sample_measurements,
+            missing,
+            sample_gal_data,
+            global_state,
+            local_state,
+        )
+
+    async def _submit_measurements(
+        self,
+        measurements: list[StudentMeasurement],
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        samples: bool = False,
+    ):
+        if not measurements:
+            return []
+
+        bulk_url, single_url = self._api._submit_measurement_urls(
+            local_state, samples
+        )
+
+        r = await self._put(
+            bulk_url,
+            json=self._api._bulk_measurements_payload(measurements, global_state),
+        )
+        failed = self._api._failed_bulk_measurements(r, measurements)
+
+        if failed is None:
+            responses = await asyncio.gather(
+                *(
+                    self._put(single_url, json=m.model_dump(exclude={"galaxy"}))
+                    for m in measurements
+                )
+            )
+            failed = [
+                m for m, r in zip(measurements, responses) if r.status_code != 200
+            ]
+
+        self._api._log_failed_measurements(failed, global_state, samples)
+        return failed
+
+    async def put_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ):
+        if not global_state.value.update_db:
+            logger.info('Skipping DB write')
+            return False
+
+        measurements = self._api._changed_measurements(
+            tracker, local_state.value.measurements
+        )
+        failed = await self._submit_measurements(
+            measurements, global_state, local_state
+        )
+        self._api._commit_measurements(tracker, measurements, failed)
+
+        logger.info(
+            "Stored measurements for student `%s`.",
+            global_state.value.student.id,
+        )
+        return True
+
+    async def put_sample_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ):
+        if not global_state.value.update_db:
+            logger.info('Skipping DB write')
+            return False
+
+        measurements = self._api._changed_measurements(
+            tracker, local_state.value.example_measurements, samples=True
+        )
+        failed = await self._submit_measurements(
+            measurements, global_state, local_state, samples=True
+        )
+        self._api._commit_measurements(tracker, measurements, failed, samples=True)
+
+        logger.info(
+            "Stored example measurements for student %s.",
+            global_state.value.student.id,
+        )
+        return True
+
+    async def get_measurement(
+        self,
+        galaxy_id: int,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> StudentMeasurement:
+        logger.info(
+            "Retrieving measurement of galaxy %s for student %s...",
+            galaxy_id,
+            global_state.value.student.id,
+        )
+        r = await self._get(
+            self._api._measurement_url(galaxy_id, global_state, local_state)
+        )
+        return self._api._add_measurement(r, local_state)
+
+    async def get_sample_measurement(
+        self,
+        galaxy_id: int,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> StudentMeasurement:
+        logger.info(
+            "Retrieving sample measurement of galaxy %s for student %s...",
+            galaxy_id,
+            global_state.value.student.id,
+        )
+        r = await self._get(
+            self._api._single_sample_measurement_url(
+                galaxy_id, global_state, local_state
+            )
+        )
+        return self._api._add_measurement(r, local_state)
+
+    async def delete_all_measurements(
+        self, global_state: Reactive[GlobalState], local_state: Reactive[LocalState]
+    ):
+        r = await self._get(self._api._measurements_url(global_state, local_state))
+
+        for measurement in r.json()["measurements"]:
+            galaxy_id = measurement["galaxy"]["id"]
+            r = await self._delete(
+                self._api._measurement_url(galaxy_id, global_state, local_state)
+            )
+
+            if r.status_code != 200:
+                logger.error(
+                    "Failed to delete measurement of galaxy `%s` for student `%s`.",
+                    galaxy_id,
+                    global_state.value.student.id,
+                )
+                logger.error(r.text)
+
+    async def get_class_measurements(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> MeasurementTable:
+        r = await self._get(
+            self._api._class_measurements_url(global_state, local_state)
+        )
+        return self._api._set_class_measurements(r, local_state)
+
+    async def _stream_all_data(self, url: str) -> AllDataColumns:
+        # Decoding the body is CPU-bound, so it runs on a worker thread rather
+        #  than on the request loop, and is handed each chunk as it arrives
+        chunks: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        decoded = asyncio.ensure_future(
+            asyncio.to_thread(stream_all_data, iter(chunks.get, None))
+        )
+        try:
+            async with self.client.stream(
+                "GET", url, timeout=LONG_REQUEST_TIMEOUT
+            ) as r:
+                r.raise_for_status()
+                async for chunk in r.aiter_bytes(STREAM_CHUNK_SIZE):
+                    chunks.put(chunk)
+        except BaseException:
+            decoded.cancel()
+            raise
+        finally:
+            chunks.put(None)
+        return await decoded
+
+    async def get_all_data(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+    ) -> tuple[MeasurementTable, list[StudentSummary], list[ClassSummary]]:
+        columns = await self._on_loop(
+            self._stream_all_data(self._api._all_data_url(global_state, local_state))
+        )
+        return self._api._set_all_data(columns, local_state)
+
+    async def put_stage_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        component_state: Reactive[BaseState],
+    ):
+        if not global_state.value.update_db:
+            logger.info('Skipping DB write')
+            return False
+
+        logger.info("Serializing stage state into DB.")
+
+        r = await self._put(
+            self._api._stage_state_url(global_state, local_state, component_state),
+            json=self._api._stage_state_payload(component_state),
+        )
+
+        if r.status_code != 200:
+            logger.error("Failed to write story state to database.")
+            logger.error(r.text)
+            return False
+
+        return True
+
+    async def put_story_state(
+        self,
+        global_state: Reactive[GlobalState],
+        local_state: Reactive[LocalState],
+        tracker: ChangeTracker | None = None,
+    ):
+        if not global_state.value.update_db:
+            logger.info('Skipping DB write')
+            return False
+
+        changes = self._api._story_state_changes(tracker, global_state, local_state)
+        if changes == {}:
+            return True
+
+        logger.info("Serializing state into DB.")
+
+        url = self._api._app_story_states_url(global_state, local_state)
+        document = self._api._story_state_document(tracker, global_state, local_state)
+        patch = self._api._story_state_patch(tracker, document)
+
+        written = False
+        if patch is not None:
+            r = await self._patch(
+                url, headers={"Content-Type": "application/json"}, content=patch
+            )
+            written = self._api._story_state_written(
+                r, tracker, document, delta=True
+            )
+
+        if not written:
+            r = await self._put(
+                url,
+                headers={"Content-Type": "application/json"},
+                content=self._api._story_state_payload(
+                    global_state, local_state, tracker
+                ),
+            )
+            if not self._api._story_state_written(r, tracker, document):
+                return False
+
+        if changes:
+            tracker.commit_story_state(changes)
+
+        return True
+
+    async def get_example_seed_measurement(
+        self,
+        local_state: Reactive[LocalState],
+        which="both",
+    ) -> list[dict[str, Any]]:
+        r = await self._get(self._api._example_seed_url(local_state))
+        return self._api._example_seed_from_response(r, which=which)
+
+
 LOCAL_API = LocalAPI()
+ASYNC_LOCAL_API = LOCAL_API.aio
@@ -0,0 +1,187 @@
+import threading
+from typing import Any, Callable, Mapping
+
+import solara
+from solara import Reactive
+from solara.toestand import Ref
+
+from cosmicds.logger import setup_logger
+
+logger = setup_logger("RESPONSE-STORE")
+
+
+class ResponseStore:
+    """
+    Keyed store of one kind of student response, kept in a `LocalState`
+    field as ``{key: {tag: entry}}``, e.g. ``free_responses["responses"]``.
+
+    Entries are never changed in place. Updating a tag creates a new entry,
+    and a new mapping that shares every other entry with the previous one,
+    so comparing the old and new state only has to look at one entry.
+
+    Every tag also has a reactive variable of its own (see `entry`) that is
+    only set when that tag changes, so components showing one response do
+    not depend on the whole local state. Updates made with ``quiet=True``
+    are swapped into the local state without notifying its listeners, so
+    that e.g. typing into a free response box does not re-render the story;
+    they are written by the story writer of the session instead (see
+    `register_story_writer`).
+
+    Parameters
+    ----------
+    field : str
+        The `LocalState` field holding the responses.
+    key : str
+        The key of the responses within the field.
+    defaults : Callable
+        Returns the entry of a new tag, given the tag and the stage id.
+    """
+
+    def __init__(
+        self, field: str, key: str, defaults: Callable[[str, Any], dict]
+    ):
+        self.field = field
+        self.key = key
+        self.defaults = defaults
+        self._tags: dict[str, Reactive[dict | None]] = {}
+        self._lock = threading.Lock()
+
+    def entries(self, local_state: Reactive) -> Mapping[str, dict]:
+        return self.entries_of(local_state.value)
+
+    def entries_of(self, state) -> Mapping[str, dict]:
+        """
+        The entries kept in a `LocalState` value.
+        """
+        return getattr(state, self.field).get(self.key, {})
+
+    def get(self, local_state: Reactive, tag: str) -> dict | None:
+        return self.entries(local_state).get(tag)
+
+    def entry(self, tag: str) -> Reactive[dict | None]:
+        """
+        The reactive variable of a single tag, which is only set when the
+        entry of that tag changes.
+        """
+        entry = self._tags.get(tag)
+        if entry is None:
+            with self._lock:
+                entry = self._tags.get(tag)
+                if entry is None:
+                    entry = self._tags[tag] = solara.reactive(None)
+        return entry
+
+    def watch(self, local_state: Reactive, tag: str) -> dict | None:
+        """
+        The entry of `tag`, read so that the component rendering it is
+        updated whenever that entry changes, quiet updates included, but not
+        when the rest of the local state does.
+        """
+        # Read for the subscription only: the variable of a tag that was
+        #  loaded but never updated in this session has not been set yet
+        self.entry(tag).value
+        return self.get(local_state, tag)
+
+    def sync(self, local_state: Reactive):
+        """
+        Set the reactive variables of the tags from the local state, e.g.
+        after the state was loaded from the database. Tags whose entry did
+        not change are left alone.
+        """
+        entries = self.entries(local_state)
+        with self._lock:
+            tags = list(self._tags.items())
+        for tag, entry in tags:
+            entry.set(entries.get(tag))
+
+    def ensure(self, local_state: Reactive, tag: str, stage) -> dict:
+        """
+        The entry of `tag`, which is created if it does not exist yet.
+        Existing entries without a stage get `stage`.
+        """
+        current = self.get(local_state, tag)
+        if current is not None and "stage" in current:
+            return current
+        if current is None:
+            logger.info(f"Initializing `{self.field}` entry for tag: {tag}")
+            entry = self.defaults(tag, stage)
+        else:
+            entry = {**current, "stage": stage}
+        self._commit(local_state, tag, entry)
+        return entry
+
+    def update(
+        self,
+        local_state: Reactive,
+        tag: str,
+        changes: Mapping[str, Any],
+        stage,
+        quiet: bool = False,
+    ) -> dict:
+        """
+        Apply `changes` to the entry of `tag` as a new entry. The stage of
+        an entry is kept, or set to `stage` if it has none.
+        """
+        current = self.get(local_state, tag)
+        entry = dict(current) if current is not None else self.defaults(tag, stage)
+        entry.setdefault("stage", stage)
+        entry.update(changes)
+        if entry != current:
+            self._commit(local_state, tag, entry, quiet=quiet)
+        return entry
+
+    def _commit(
+        self, local_state: Reactive, tag: str, entry: dict, quiet: bool = False
+    ):
+        entries = {**self.entries(local_state), tag: entry}
+        value = {**getattr(local_state.value, self.field), self.key: entries}
+        if quiet:
+            # Seen by the next write and by anything that sets the local state
+            #  later, without re-rendering everything that depends on it now
+            setattr(local_state.value, self.field, value)
+            request_story_write()
+        else:
+            Ref(getattr(local_state.fields, self.field)).set(value)
+        self.entry(tag).set(entry)
+
+
+def _mc_score(tag: str, stage) -> dict:
+    return dict(tag=tag, score=None, choice=None, tries=0, wrong_attempts=0, stage=stage)
+
+
+def _free_response(tag: str, stage) -> dict:
+    return dict(tag=tag, response="", initialized=True, stage=stage)
+
+
+MC_SCORES = ResponseStore("mc_scoring", "scores", _mc_score)
+FREE_RESPONSES = ResponseStore("free_responses", "responses", _free_response)
+
+
+_STORY_WRITERS: dict[str, Callable[[], None]] = {}
+
+
+def register_story_writer(write: Callable[[], None]) -> Callable[[], None]:
+    """
+    Register the function that queues a story state write for the current
+    session, for changes that do not notify the local state. Returns a
+    function that unregisters it, for use as an effect cleanup.
+    """
+    kernel_id = solara.get_kernel_id()
+    _STORY_WRITERS[kernel_id] = write
+
+    def cleanup():
+        if _STORY_WRITERS.get(kernel_id) is write:
+            del _STORY_WRITERS[kernel_id]
+
+    return cleanup
+
+
+def request_story_write():
+    try:
+        kernel_id = solara.get_kernel_id()
+    except RuntimeError:
+        # Not in a session, so there is no story to write
+        return
+    write = _STORY_WRITERS.get(kernel_id)
+    if write is not None:
+        write()
@@ -0,0 +1,222 @@
+import copy
+import json
+import math
+from typing import Any, Iterable, NamedTuple
+
+from pydantic import BaseModel
+
+from cosmicds.utils import CDSJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Values that cannot change in place, so the same object always encodes to
+#  the same JSON
+IMMUTABLE_TYPES = (str, int, float, bool, type(None), bytes)
+
+_ENCODER = CDSJSONEncoder()
+
+
+def _orjson_default(value: Any) -> Any:
+    return _ENCODER.default(value)
+
+
+def _finite(value: Any) -> Any:
+    # Non-finite floats (including numpy's) as `None`, which orjson writes
+    #  them as, rather than as the invalid JSON tokens `NaN` and `Infinity`
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    return _finite(_ENCODER.default(value))
+
+
+def _encode_stdlib(value: Any) -> bytes:
+    # The same output as orjson's: compact, UTF-8, and non-finite floats as
+    #  `null`. Most values hold none, so they are only replaced on a retry.
+    options = dict(
+        cls=CDSJSONEncoder,
+        default=_json_default,
+        allow_nan=False,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    try:
+        return json.dumps(value, **options).encode()
+    except ValueError:
+        return json.dumps(_finite(value), **options).encode()
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Encode a value as JSON, with orjson if it is installed, and with the
+    `CDSJSONEncoder` otherwise. Values orjson does not know are converted
+    by the `CDSJSONEncoder`. Either way NaN and infinities are encoded as
+    ``null``.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return _encode_stdlib(value)
+
+
+class _Fragment(NamedTuple):
+    value: Any
+    snapshot: Any
+    dumped: Any
+    encoded: bytes
+
+
+def _is_immutable(value: Any) -> bool:
+    return isinstance(value, IMMUTABLE_TYPES)
+
+
+class FieldFragmentCache:
+    """
+    Encodes a pydantic model as a JSON object, one top-level field at a
+    time, and keeps the encoded fragment of each field. A field is only
+    encoded again once its value changes, so the cost of encoding the model
+    follows what changed rather than its size.
+
+    A fragment is reused when the field holds the same immutable object as
+    before, or a value equal to the one it was encoded from. The equality
+    check also catches containers that were changed in place.
+    """
+
+    def __init__(self):
+        self._fragments: dict[str, _Fragment] = {}
+        self.encoded = 0
+        self.reused = 0
+
+    @staticmethod
+    def field_names(model: BaseModel, exclude: Iterable[str] = ()) -> list[str]:
+        exclude = set(exclude)
+        names = [*model.__class__.model_fields, *model.__class__.model_computed_fields]
+        return [name for name in names if name not in exclude]
+
+    def _fragment(self, model: BaseModel, name: str) -> _Fragment | None:
+        value = getattr(model, name)
+        fragment = self._fragments.get(name)
+        if fragment is not None and (
+            (fragment.value is value and _is_immutable(value))
+            or fragment.snapshot == value
+        ):
+            self.reused += 1
+            return fragment
+
+        dumped = model.model_dump(include={name})
+        if name not in dumped:
+            return None
+        dumped = dumped[name]
+        if _is_immutable(value):
+            snapshot = value
+        elif isinstance(value, (dict, list)):
+            # Dumps are copies, which compare equal to the plain containers
+            #  the state is made of
+            snapshot = dumped
+        else:
+            snapshot = copy.deepcopy(value)
+        fragment = self._fragments[name] = _Fragment(
+            value, snapshot, dumped, encode_json(dumped)
+        )
+        self.encoded += 1
+        return fragment
+
+    def fragment(self, model: BaseModel, name: str) -> bytes | None:
+        """
+        The encoded value of field `name`, or `None` if the field is not
+        part of a dump of the model (e.g. it is excluded from it).
+        """
+        fragment = self._fragment(model, name)
+        return None if fragment is None else fragment.encoded
+
+    def fragments(
+        self, model: BaseModel, exclude: Iterable[str] = ()
+    ) -> dict[str, bytes]:
+        fragments = {}
+        for name in self.field_names(model, exclude):
+            fragment = self.fragment(model, name)
+            if fragment is not None:
+                fragments[name] = fragment
+        return fragments
+
+    def document(self, model: BaseModel, exclude: Iterable[str] = ()) -> dict:
+        """
+        The model as ``model.model_dump(exclude=exclude)`` would dump it.
+        Fields that did not change are the same objects as in the previous
+        document, which must not be changed in place.
+        """
+        document = {}
+        for name in self.field_names(model, exclude):
+            fragment = self._fragment(model, name)
+            if fragment is not None:
+                document[name] = fragment.dumped
+        return document
+
+    def encode(self, model: BaseModel, exclude: Iterable[str] = ()) -> bytes:
+        """
+        The model as a JSON object, as ``model.model_dump(exclude=exclude)``
+        would encode.
+        """
+        return splice_object(self.fragments(model, exclude))
+
+    def clear(self):
+        self._fragments.clear()
+
+
+def splice_object(fragments: dict[str, bytes]) -> bytes:
+    """
+    A JSON object from the encoded values of its members.
+    """
+    members = (encode_json(name) + b":" + encoded for name, encoded in fragments.items())
+    return b"{" + b",".join(members) + b"}"
+
+
+class StoryStateSerializer:
+    """
+    Builds the story state payload, ``{"app": ..., "story": ...}``, of one
+    session from cached field fragments of the app and local states.
+    """
+
+    def __init__(self):
+        self.app = FieldFragmentCache()
+        self.story = FieldFragmentCache()
+
+    def payload(
+        self,
+        app_state: BaseModel,
+        local_state: BaseModel,
+        exclude: Iterable[str] = (),
+    ) -> bytes:
+        return splice_object(
+            {
+                "app": self.app.encode(app_state),
+                "story": self.story.encode(local_state, exclude),
+            }
+        )
+
+    def document(
+        self,
+        app_state: BaseModel,
+        local_state: BaseModel,
+        exclude: Iterable[str] = (),
+    ) -> dict:
+        """
+        The story state as the plain values that `payload` encodes, for
+        finding what changed between writes.
+        """
+        return {
+            "app": self.app.document(app_state),
+            "story": self.story.document(local_state, exclude),
+        }
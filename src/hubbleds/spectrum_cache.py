@@ -0,0 +1,290 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from os import getenv
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from cosmicds.logger import setup_logger
+from hubbleds.state import SpectrumData
+from hubbleds.spectrum_pack import PackedSpectra, spectrum_key
+
+logger = setup_logger("SPECTRUM-CACHE")
+
+SPECTRUM_CACHE_DIR = Path(
+    getenv(
+        "HUBBLEDS_SPECTRUM_CACHE_DIR",
+        Path.home() / ".cache" / "hubbleds" / "spectra",
+    )
+)
+# Upper bound on the total size of the spectra kept on disk, in bytes
+SPECTRUM_CACHE_MAX_BYTES = int(getenv("HUBBLEDS_SPECTRUM_CACHE_MAX_BYTES", 512 * 2**20))
+# Number of spectra also kept in memory
+SPECTRUM_CACHE_HOT_SIZE = 64
+# Packed spectrum files (see `hubbleds.spectrum_pack`) to serve spectra from
+#  before downloading them, separated by `os.pathsep`
+PACKED_SPECTRA_PATHS = [
+    Path(path)
+    for path in getenv("HUBBLEDS_PACKED_SPECTRA", "").split(os.pathsep)
+    if path
+]
+
+# Arrays of each cached spectrum file, stored as float32 like `SpectrumData`
+#  and the packed spectrum files
+SPECTRUM_ARRAYS = ("wave", "flux", "ivar")
+
+
+class SpectrumCache:
+    """
+    Process-wide cache of decoded galaxy spectra, shared by all sessions.
+
+    Spectra are stored on local disk as one ``.npz`` file each, holding the
+    ``wave``, ``flux`` and ``ivar`` arrays of the spectrum as float32. When the
+    files grow beyond `max_bytes`, the least recently used ones are removed.
+    The most recently used spectra are additionally held in memory as
+    `SpectrumData`, and every caller is handed that same instance.
+
+    Spectra found in one of the packed spectrum files are served from there
+    instead, and never written to the cache directory.
+
+    Downloads of spectra that are not cached yet are shared as well: the
+    first caller of `download` for a spectrum downloads it, and later callers
+    wait on the future it returns until `finish_download` is called.
+
+    Parameters
+    ----------
+    directory : Path
+        Where the spectrum files are kept. Created when first written to.
+    max_bytes : int
+        Upper bound on the total size of the files in `directory`.
+    hot_size : int
+        Number of spectra held in memory.
+    packs : iterable of Path
+        Packed spectrum files to look spectra up in.
+    """
+
+    def __init__(
+        self,
+        directory: Path = SPECTRUM_CACHE_DIR,
+        max_bytes: int = SPECTRUM_CACHE_MAX_BYTES,
+        hot_size: int = SPECTRUM_CACHE_HOT_SIZE,
+        packs: Iterable[Path] = PACKED_SPECTRA_PATHS,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hot_size = hot_size
+
+        self.packs: list[PackedSpectra] = []
+        for path in packs:
+            try:
+                self.packs.append(PackedSpectra(path))
+            except (OSError, ValueError) as e:
+                logger.warning("Failed to open packed spectra `%s`: %s", path, e)
+
+        self.hits = 0
+        self.pack_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._hot: OrderedDict[str, SpectrumData] = OrderedDict()
+        # Downloads in progress, resolved with the downloaded spectrum
+        self._downloads: dict[str, Future] = {}
+        # File sizes on disk, least recently used first
+        self._files: OrderedDict[str, int] | None = None
+
+    key = staticmethod(spectrum_key)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def _index(self) -> OrderedDict[str, int]:
+        # Built from whatever an earlier process left behind, oldest first
+        if self._files is None:
+            files = []
+            if self.directory.is_dir():
+                for path in self.directory.glob("*.npz"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, path.stem, stat.st_size))
+            self._files = OrderedDict(
+                (key, size) for _, key, size in sorted(files)
+            )
+        return self._files
+
+    def cached(self, name: str, galaxy_type: str) -> bool:
+        """
+        Whether the spectrum of a galaxy can be served without downloading it.
+        Unlike `get`, this does not count as a hit or a miss.
+        """
+        key = self.key(name, galaxy_type)
+        if any(key in pack for pack in self.packs):
+            return True
+        with self._lock:
+            return key in self._hot or key in self._index()
+
+    def get(self, name: str, galaxy_type: str) -> SpectrumData | None:
+        """
+        The cached spectrum of a galaxy, or `None` if it has not been cached.
+        """
+        key = self.key(name, galaxy_type)
+
+        with self._lock:
+            spectrum = self._hot.get(key)
+            if spectrum is not None:
+                self._hot.move_to_end(key)
+                self.hits += 1
+                return spectrum
+
+        for pack in self.packs:
+            spectrum = pack.get(name, galaxy_type)
+            if spectrum is not None:
+                with self._lock:
+                    self._remember(key, spectrum)
+                    self.hits += 1
+                    self.pack_hits += 1
+                return spectrum
+
+        with self._lock:
+            files = self._index()
+            if key not in files:
+                self.misses += 1
+                return None
+
+        path = self._path(key)
+        try:
+            with np.load(path) as npz:
+                arrays = {array: npz[array] for array in SPECTRUM_ARRAYS}
+            os.utime(path)
+            spectrum = SpectrumData(name=name, **arrays)
+        except (OSError, KeyError, ValueError):
+            logger.warning("Discarding unreadable cached spectrum `%s`.", key)
+            with self._lock:
+                self._files.pop(key, None)
+                self.misses += 1
+            path.unlink(missing_ok=True)
+            return None
+
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+            self._remember(key, spectrum)
+            self.hits += 1
+            self.disk_hits += 1
+
+        return spectrum
+
+    def put(
+        self,
+        name: str,
+        galaxy_type: str,
+        loglam: np.ndarray,
+        flux: np.ndarray,
+        ivar: np.ndarray,
+    ) -> SpectrumData:
+        """
+        Cache the arrays of the spectrum of a galaxy, returning the spectrum
+        that later calls to `get` are handed while it is held in memory.
+        """
+        key = self.key(name, galaxy_type)
+        spectrum = self._spectrum_data(name, loglam, flux, ivar)
+
+        with self._lock:
+            self._remember(key, spectrum)
+
+        tmp_name = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Written under a temporary name so that other processes sharing
+            #  the directory never read a partial file
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f, **{array: getattr(spectrum, array) for array in SPECTRUM_ARRAYS}
+                )
+            size = os.path.getsize(tmp_name)
+            os.replace(tmp_name, self._path(key))
+            tmp_name = None
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to cache spectrum `%s` on disk: %s", key, e)
+            return spectrum
+        finally:
+            if tmp_name is not None:
+                Path(tmp_name).unlink(missing_ok=True)
+
+        with self._lock:
+            files = self._index()
+            files[key] = size
+            files.move_to_end(key)
+            self._evict(files)
+
+        return spectrum
+
+    def download(self, name: str, galaxy_type: str) -> tuple[Future, bool]:
+        """
+        The future of the download of the spectrum of a galaxy, and whether
+        the caller is the one to download it. If so, it has to resolve the
+        future and then call `finish_download`, whether or not the download
+        succeeded.
+        """
+        key = self.key(name, galaxy_type)
+        with self._lock:
+            future = self._downloads.get(key)
+            if future is not None:
+                return future, False
+            future = self._downloads[key] = Future()
+            return future, True
+
+    def finish_download(self, name: str, galaxy_type: str):
+        with self._lock:
+            self._downloads.pop(self.key(name, galaxy_type), None)
+
+    @staticmethod
+    def _spectrum_data(
+        name: str, loglam: np.ndarray, flux: np.ndarray, ivar: np.ndarray
+    ) -> SpectrumData:
+        return SpectrumData(name=name, wave=10 ** np.asarray(loglam), flux=flux, ivar=ivar)
+
+    def _remember(self, key: str, spectrum: SpectrumData):
+        self._hot[key] = spectrum
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
+
+    def _evict(self, files: OrderedDict[str, int]):
+        total = sum(files.values())
+        while total > self.max_bytes and len(files) > 1:
+            key, size = files.popitem(last=False)
+            total -= size
+            self._path(key).unlink(missing_ok=True)
+            logger.info("Evicted spectrum `%s` from disk cache.", key)
+
+    def clear(self):
+        with self._lock:
+            self._hot.clear()
+            for key in self._index():
+                self._path(key).unlink(missing_ok=True)
+            self._files.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            files = self._index()
+            return {
+                "hits": self.hits,
+                "pack_hits": self.pack_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hot_entries": len(self._hot),
+                "downloads": len(self._downloads),
+                "disk_entries": len(files),
+                "disk_bytes": sum(files.values()),
+            }
+
+
+SPECTRUM_CACHE = SpectrumCache()
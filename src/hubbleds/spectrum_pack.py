@@ -0,0 +1,184 @@
+"""
+Packed spectrum files, which hold many spectra as float32 arrays in a single
+file that can be memory-mapped, so that every process serving the app shares
+one copy of them through the page cache.
+
+A packed file is laid out as
+
+* the magic bytes ``HDSSPEC1``,
+* the length of the header as a little-endian unsigned 64-bit integer,
+* the header, a JSON object mapping each spectrum key to the name of its
+  galaxy, its offset into the data and its number of points,
+* padding up to a multiple of `ALIGNMENT` bytes,
+* the data, as little-endian float32 values, with the wavelength, flux and
+  inverse variance arrays of each spectrum stored one after the other.
+
+A packed file is built from the SDSS FITS files with::
+
+    python -m hubbleds.spectrum_pack --type Sp -o spiral.spectra spectra/spiral/*.fits
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from astropy.io import fits
+
+from cosmicds.logger import setup_logger
+from hubbleds.state import SpectrumData
+
+logger = setup_logger("SPECTRUM-PACK")
+
+MAGIC = b"HDSSPEC1"
+ALIGNMENT = 16
+DTYPE = np.dtype("<f4")
+
+
+def spectrum_key(name: str, galaxy_type: str) -> str:
+    return f"{galaxy_type}_{name.replace('.fits', '')}"
+
+
+def _data_offset(header_length: int) -> int:
+    end = len(MAGIC) + 8 + header_length
+    return -(-end // ALIGNMENT) * ALIGNMENT
+
+
+class PackedSpectra:
+    """
+    Read-only access to a packed spectrum file. The arrays of the spectra
+    it returns are views onto the memory-mapped file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a packed spectrum file.")
+            header_length = int.from_bytes(f.read(8), "little")
+            self._index: dict[str, dict] = json.loads(f.read(header_length))
+
+        size = sum(3 * entry["length"] for entry in self._index.values())
+        self._data = (
+            np.memmap(
+                self.path,
+                dtype=DTYPE,
+                mode="r",
+                offset=_data_offset(header_length),
+                shape=(size,),
+            )
+            if size
+            else np.empty(0, dtype=DTYPE)
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def get(self, name: str, galaxy_type: str) -> SpectrumData | None:
+        entry = self._index.get(spectrum_key(name, galaxy_type))
+        if entry is None:
+            return None
+
+        offset, length = entry["offset"], entry["length"]
+        arrays = self._data[offset : offset + 3 * length].reshape(3, length)
+        return SpectrumData(
+            name=entry["name"], wave=arrays[0], flux=arrays[1], ivar=arrays[2]
+        )
+
+
+def read_fits_spectrum(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+    """
+    The ``loglam``, ``flux`` and ``ivar`` arrays of the COADD extension of an
+    SDSS spectrum file, or `None` if it has no such extension.
+    """
+    with fits.open(path) as hdulist:
+        if "COADD" not in hdulist:
+            return None
+        data = hdulist["COADD"].data
+        return (
+            np.array(data["loglam"]),
+            np.array(data["flux"]),
+            np.array(data["ivar"]),
+        )
+
+
+def pack_spectra(paths: Iterable[Path], output: Path, galaxy_type: str) -> int:
+    """
+    Build a packed spectrum file from SDSS FITS files.
+
+    Parameters
+    ----------
+    paths : iterable of Path
+        The FITS files, all of galaxies of the same type.
+    output : Path
+        The packed file to write. It is replaced atomically if it exists.
+    galaxy_type : str
+        The type of the galaxies, as in `GalaxyData.type`.
+
+    Returns
+    -------
+    int
+        The number of spectra packed.
+    """
+    index: dict[str, dict] = {}
+    chunks: list[np.ndarray] = []
+    offset = 0
+
+    for path in map(Path, paths):
+        spectrum = read_fits_spectrum(path)
+        if spectrum is None:
+            logger.warning("No extension named 'COADD' in `%s`, skipping.", path)
+            continue
+
+        loglam, flux, ivar = spectrum
+        chunk = np.stack([10**loglam, flux, ivar]).astype(DTYPE)
+        index[spectrum_key(path.name, galaxy_type)] = {
+            "name": path.name,
+            "offset": offset,
+            "length": len(loglam),
+        }
+        chunks.append(chunk.ravel())
+        offset += chunk.size
+
+    header = json.dumps(index).encode()
+    padding = _data_offset(len(header)) - (len(MAGIC) + 8 + len(header))
+
+    output = Path(output)
+    fd, tmp_name = tempfile.mkstemp(dir=output.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * padding)
+        for chunk in chunks:
+            f.write(chunk.tobytes())
+    os.replace(tmp_name, output)
+
+    logger.info("Packed %d spectra into `%s`.", len(index), output)
+
+    return len(index)
+
+
+def main(args: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        description="Pack SDSS spectrum FITS files into a memory-mappable file."
+    )
+    parser.add_argument("paths", nargs="+", type=Path, help="FITS files to pack")
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument(
+        "-t", "--type", dest="galaxy_type", required=True, help="e.g. Sp, E or Ir"
+    )
+    parsed = parser.parse_args(args)
+
+    pack_spectra(parsed.paths, parsed.output, parsed.galaxy_type)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable
+
+import numpy as np
+from solara import Reactive
+
+from cosmicds.logger import setup_logger
+from hubbleds.galaxy_catalog import GALAXY_CATALOG, GalaxyCatalog
+from hubbleds.remote import LOCAL_API
+from hubbleds.spectrum_cache import SPECTRUM_CACHE
+from hubbleds.state import GalaxyData, LocalState
+from hubbleds.write_queue import Snapshot
+
+logger = setup_logger("SPECTRUM-PREFETCH")
+
+# Spectrum downloads running at once across all sessions
+PREFETCH_WORKERS = 4
+# Number of neighbouring galaxies whose spectra are fetched along with the
+#  galaxy a student is looking at
+PREFETCH_NEIGHBOURS = 4
+
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=PREFETCH_WORKERS, thread_name_prefix="spectrum-prefetch"
+)
+
+
+def nearest_galaxies(
+    ra: float,
+    decl: float,
+    catalog: GalaxyCatalog,
+    count: int,
+    exclude: int | None = None,
+) -> list[GalaxyData]:
+    """
+    The `count` galaxies of the catalog closest on the sky to the given
+    position (in degrees), closest first, leaving out the galaxy with id
+    `exclude`.
+    """
+    if len(catalog) == 0 or count <= 0:
+        return []
+
+    ras, decls = np.radians(catalog.ra), np.radians(catalog.decl)
+    ra, decl = np.radians(ra), np.radians(decl)
+
+    # Cosine of the angular separation, which decreases with distance
+    cos_separation = np.sin(decls) * np.sin(decl) + np.cos(decls) * np.cos(
+        decl
+    ) * np.cos(ras - ra)
+    if exclude is not None and exclude in catalog.index:
+        cos_separation[catalog.index[exclude]] = -np.inf
+
+    count = min(count, len(catalog) - (exclude in catalog.index))
+    if count <= 0:
+        return []
+    nearest = np.argpartition(-cos_separation, count - 1)[:count]
+    nearest = nearest[np.argsort(-cos_separation[nearest])]
+
+    return [catalog.galaxies[i] for i in nearest]
+
+
+class SpectrumPrefetcher:
+    """
+    Warms `SPECTRUM_CACHE` with the spectra a session is likely to show next,
+    on a worker pool shared by all sessions.
+
+    Each call to `prefetch` replaces the previous request of the session:
+    downloads that have not started yet are cancelled, so a student clicking
+    through galaxies does not queue up spectra they have already moved past.
+    A session asking for a spectrum that is being prefetched waits for that
+    download rather than starting its own (see `SpectrumCache.download`).
+    """
+
+    def __init__(
+        self, local_state: Reactive[LocalState], executor: ThreadPoolExecutor = _EXECUTOR
+    ):
+        self._local_state = local_state
+        self._executor = executor
+        self._futures: dict[int, Future] = {}
+
+    def prefetch(self, galaxies: Iterable[GalaxyData]):
+        galaxies = [
+            galaxy
+            for galaxy in galaxies
+            if not SPECTRUM_CACHE.cached(galaxy.name, galaxy.type)
+        ]
+        wanted = {galaxy.id for galaxy in galaxies}
+
+        for galaxy_id, future in list(self._futures.items()):
+            if galaxy_id not in wanted or future.done():
+                future.cancel()
+                del self._futures[galaxy_id]
+
+        # The worker threads have no session, so they get the current state
+        local_state = Snapshot(self._local_state.value)
+        for galaxy in galaxies:
+            if galaxy.id not in self._futures:
+                self._futures[galaxy.id] = self._executor.submit(
+                    self._load, galaxy, local_state
+                )
+
+    def prefetch_near(self, galaxy: GalaxyData, count: int = PREFETCH_NEIGHBOURS):
+        """
+        Prefetch the spectrum of `galaxy` and then those of its neighbours.
+        """
+        neighbours = nearest_galaxies(
+            galaxy.ra,
+            galaxy.decl,
+            GALAXY_CATALOG.get(self._local_state),
+            count,
+            exclude=galaxy.id,
+        )
+        self.prefetch([galaxy, *neighbours])
+
+    def prefetch_around(self, ra: float, decl: float, count: int = PREFETCH_NEIGHBOURS):
+        """
+        Prefetch the spectra of the galaxies closest to a position on the sky.
+        """
+        self.prefetch(
+            nearest_galaxies(ra, decl, GALAXY_CATALOG.get(self._local_state), count)
+        )
+
+    def cancel(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    @staticmethod
+    def _load(galaxy: GalaxyData, local_state: Snapshot[LocalState]):
+        try:
+            LOCAL_API.load_spectrum_data(galaxy, local_state)
+        except Exception:
+            logger.exception("Failed to prefetch spectrum of galaxy `%s`.", galaxy.id)
@@ -0,0 +1,173 @@
+import json
+import re
+from typing import Callable
+
+import httpx
+
+from cosmicds.logger import setup_logger
+
+from hubbleds import json_patch
+
+logger = setup_logger("STAND-IN")
+
+
+Handler = Callable[..., httpx.Response]
+
+
+class StandInServer:
+    """
+    In-memory stand-in for the parts of the CosmicDS API server that hubbleds
+    talks to, for exercising `AsyncLocalAPI` without network access::
+
+        server = StandInServer()
+        api = AsyncLocalAPI(LOCAL_API, transport=server.transport)
+
+    Every request that reaches the stand-in is recorded in `requests`, so
+    callers can check how many round trips an operation took.
+    """
+
+    def __init__(self):
+        # Measurements are keyed on (student id, galaxy id, measurement number)
+        self.measurements: dict[tuple[int, int, str | None], dict] = {}
+        self.sample_measurements: dict[tuple[int, int, str | None], dict] = {}
+        self.story_states: dict[tuple[int, str], dict] = {}
+        self.stage_states: dict[tuple[int, str, str], dict] = {}
+        # The body of `all-data` responses
+        self.all_data: dict[str, list[dict]] = {
+            "measurements": [],
+            "studentData": [],
+            "classData": [],
+        }
+        self.requests: list[httpx.Request] = []
+
+        self._routes: list[tuple[str, re.Pattern, Handler]] = [
+            ("PUT", re.compile(r"/(?P<story>[^/]+)/submit-measurements/$"), self._put_bulk_measurements),
+            ("PUT", re.compile(r"/(?P<story>[^/]+)/submit-sample-measurements/$"), self._put_bulk_sample_measurements),
+            ("PUT", re.compile(r"/(?P<story>[^/]+)/submit-measurement/$"), self._put_measurement),
+            ("PUT", re.compile(r"/(?P<story>[^/]+)/sample-measurement/$"), self._put_sample_measurement),
+            ("GET", re.compile(r"/(?P<story>[^/]+)/measurements/(?P<student>\d+)$"), self._get_measurements),
+            ("GET", re.compile(r"/(?P<story>[^/]+)/sample-measurements/(?P<student>\d+)$"), self._get_sample_measurements),
+            ("GET", re.compile(r"/(?P<story>[^/]+)/measurements/(?P<student>\d+)/(?P<galaxy>\d+)$"), self._get_measurement),
+            ("GET", re.compile(r"/(?P<story>[^/]+)/all-data$"), self._get_all_data),
+            ("GET", re.compile(r"/story-state/(?P<student>\d+)/(?P<story>[^/]+)$"), self._get_story_state),
+            ("PUT", re.compile(r"/story-state/(?P<student>\d+)/(?P<story>[^/]+)$"), self._put_story_state),
+            ("PATCH", re.compile(r"/story-state/(?P<student>\d+)/(?P<story>[^/]+)$"), self._patch_story_state),
+            ("GET", re.compile(r"/stage-state/(?P<student>\d+)/(?P<story>[^/]+)/(?P<stage>[^/]+)$"), self._get_stage_state),
+            ("PUT", re.compile(r"/stage-state/(?P<student>\d+)/(?P<story>[^/]+)/(?P<stage>[^/]+)$"), self._put_stage_state),
+        ]
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+
+        for method, pattern, handler in self._routes:
+            match = pattern.search(request.url.path)
+            if match and request.method == method:
+                return handler(request, **match.groupdict())
+
+        logger.warning("No stand-in route for %s %s.", request.method, request.url)
+        return httpx.Response(404, json={"error": "Not found"})
+
+    @staticmethod
+    def _measurement_key(measurement: dict) -> tuple[int, int, str | None]:
+        return (
+            measurement["student_id"],
+            measurement["galaxy_id"],
+            measurement.get("measurement_number"),
+        )
+
+    def _store(self, store: dict, measurement: dict) -> dict:
+        try:
+            store[self._measurement_key(measurement)] = measurement
+        except KeyError as e:
+            return {"status": 400, "error": f"Missing field {e}"}
+        return {"status": 200}
+
+    def _put_bulk(self, request: httpx.Request, store: dict) -> httpx.Response:
+        measurements = json.loads(request.content).get("measurements", [])
+        results = []
+        for measurement in measurements:
+            result = self._store(store, measurement)
+            result.update(
+                galaxy_id=measurement.get("galaxy_id"),
+                measurement_number=measurement.get("measurement_number"),
+            )
+            results.append(result)
+        return httpx.Response(200, json={"results": results})
+
+    def _put_bulk_measurements(self, request, story):
+        return self._put_bulk(request, self.measurements)
+
+    def _put_bulk_sample_measurements(self, request, story):
+        return self._put_bulk(request, self.sample_measurements)
+
+    def _put_measurement(self, request, story):
+        result = self._store(self.measurements, json.loads(request.content))
+        return httpx.Response(result["status"], json=result)
+
+    def _put_sample_measurement(self, request, story):
+        result = self._store(self.sample_measurements, json.loads(request.content))
+        return httpx.Response(result["status"], json=result)
+
+    def _get_measurements(self, request, story, student):
+        measurements = [
+            m for (sid, _, _), m in self.measurements.items() if sid == int(student)
+        ]
+        return httpx.Response(200, json={"measurements": measurements})
+
+    def _get_measurement(self, request, story, student, galaxy):
+        measurement = next(
+            (
+                m
+                for (sid, gid, _), m in self.measurements.items()
+                if (sid, gid) == (int(student), int(galaxy))
+            ),
+            None,
+        )
+        return httpx.Response(200, json={"measurements": measurement})
+
+    def _get_sample_measurements(self, request, story, student):
+        measurements = [
+            m
+            for (sid, _, _), m in self.sample_measurements.items()
+            if sid == int(student)
+        ]
+        return httpx.Response(200, json={"measurements": measurements})
+
+    def _get_all_data(self, request, story):
+        return httpx.Response(200, json=self.all_data)
+
+    def _get_story_state(self, request, student, story):
+        state = self.story_states.get((int(student), story))
+        return httpx.Response(200, json={"state": state})
+
+    def _put_story_state(self, request, student, story):
+        state = self.story_states[(int(student), story)] = json.loads(request.content)
+        return httpx.Response(200, json={"success": True, "hash": json_patch.document_hash(state)})
+
+    def _patch_story_state(self, request, student, story):
+        # The body is `{"base": <hash>, "patch": [<RFC 6902 operations>]}`,
+        #  which only applies to the state whose hash is `base`
+        key = (int(student), story)
+        body = json.loads(request.content)
+        state = self.story_states.get(key)
+        current = None if state is None else json_patch.document_hash(state)
+        if current is None or body.get("base") != current:
+            return httpx.Response(409, json={"error": "Base mismatch", "hash": current})
+        try:
+            state = json_patch.apply(state, body.get("patch", []))
+        except json_patch.JsonPatchError as e:
+            return httpx.Response(422, json={"error": str(e)})
+        self.story_states[key] = state
+        return httpx.Response(200, json={"success": True, "hash": json_patch.document_hash(state)})
+
+    def _get_stage_state(self, request, student, story, stage):
+        state = self.stage_states.get((int(student), story, stage))
+        return httpx.Response(200, json={"state": state})
+
+    def _put_stage_state(self, request, student, story, stage):
+        self.stage_states[(int(student), story, stage)] = json.loads(request.content)
+        return httpx.Response(200, json={"success": True})
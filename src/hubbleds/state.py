@@ -1,12 +1,16 @@
-from pydantic import BaseModel, computed_field, field_validator, Field
+from pydantic import BaseModel, ConfigDict, PrivateAttr, computed_field, field_validator, Field
 from solara import Reactive
 from cosmicds.state import BaseState, GLOBAL_STATE, BaseLocalState
 from hubbleds.base_component_state import BaseComponentState
-from typing import Optional
+from hubbleds.measurement_table import MeasurementTable
+from hubbleds.response_store import FREE_RESPONSES, MC_SCORES
+from typing import Mapping, Optional
 import solara
 import datetime
 from functools import cached_property
-from astropy.table import Table
+import numpy as np
+from pandas import DataFrame
+from glue.core import Data
 from pydantic import Field
 
 from solara.toestand import Ref
@@ -22,10 +26,34 @@ logger = setup_logger("HUBBLEDS-STATE")
 
 
 class SpectrumData(BaseModel):
+    """
+    The spectrum of a galaxy, as float32 arrays. Spectra are shared between
+    sessions, and may be memory-mapped from a packed spectrum file, so the
+    arrays are read-only, and the views below do not copy them.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
-    wave: list[float]
-    flux: list[float]
-    ivar: list[float]
+    wave: np.ndarray
+    flux: np.ndarray
+    ivar: np.ndarray
+
+    @field_validator("wave", "flux", "ivar", mode="before")
+    @classmethod
+    def read_only_array(cls, value) -> np.ndarray:
+        array = np.asarray(value, dtype=np.float32).view()
+        array.flags.writeable = False
+        return array
+
+    def as_data_frame(self) -> DataFrame:
+        return DataFrame({"wave": self.wave, "flux": self.flux}, copy=False)
+
+    def as_glue_data(self, label: str | None = None) -> Data:
+        return Data(label=label or self.name, wave=self.wave, flux=self.flux)
+
+    def as_plotly_arrays(self) -> dict[str, np.ndarray]:
+        return {"x": self.wave, "y": self.flux}
 
 
 class GalaxyData(BaseModel):
@@ -43,13 +71,9 @@ class GalaxyData(BaseModel):
 
         return LOCAL_API.load_spectrum_data(self, LOCAL_STATE)
 
-    @cached_property
+    @property
     def spectrum_as_data_frame(self):
-        from hubbleds.remote import LOCAL_API
-
-        spec_data = LOCAL_API.load_spectrum_data(self, LOCAL_STATE)
-
-        return Table({"wave": spec_data.wave, "flux": spec_data.flux}).to_pandas()
+        return self.spectrum.as_data_frame()
 
     @property
     def rest_wave_value(self) -> float:
@@ -111,13 +135,53 @@ class ClassSummary(BaseSummary):
 
 
 
+# Members of `LocalState` that are not part of the stored story state, either
+#  because they are stored elsewhere in the database or are session-only.
+NON_STORY_STATE_FIELDS = {
+    "example_measurements",
+    "measurements",
+    "measurements_loaded",
+    "class_measurements",
+    "all_measurements",
+    "student_summaries",
+    "class_summaries",
+}
+
+
+class MeasurementIndex:
+    """
+    Positions of the measurements in a list by `(galaxy_id, measurement_number)`
+    and by galaxy id alone, where the first measurement of a galaxy wins, as
+    with a linear scan. An index belongs to one list object, see `covers`.
+    """
+
+    def __init__(self, measurements: list[StudentMeasurement]):
+        self.measurements = measurements
+        self.size = len(measurements)
+        self.by_key: dict[tuple[int, str | None], int] = {}
+        self.by_galaxy: dict[int, int] = {}
+        for i, measurement in enumerate(measurements):
+            key = (measurement.galaxy_id, measurement.measurement_number)
+            self.by_key.setdefault(key, i)
+            self.by_galaxy.setdefault(measurement.galaxy_id, i)
+
+    def covers(self, measurements: list[StudentMeasurement]) -> bool:
+        # Lists are replaced rather than changed when the state is updated,
+        #  the length guards against items having been added in place
+        return self.measurements is measurements and self.size == len(measurements)
+
+
 class LocalState(BaseLocalState):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _measurement_indexes: dict[str, MeasurementIndex] = PrivateAttr(default_factory=dict)
+
     title: str = "Hubble's Law"
     story_id: str = "hubbles_law"
     measurements: list[StudentMeasurement] = []
     example_measurements: list[StudentMeasurement] = []
-    class_measurements: list[StudentMeasurement] = []
-    all_measurements: list[StudentMeasurement] = []
+    class_measurements: MeasurementTable = Field(default_factory=MeasurementTable.empty)
+    all_measurements: MeasurementTable = Field(default_factory=MeasurementTable.empty)
     student_summaries: list[StudentSummary] = []
     class_summaries: list[ClassSummary] = []
     measurements_loaded: bool = False
@@ -136,55 +200,68 @@ class LocalState(BaseLocalState):
     stage_5_class_data_students: list[int] = []
     last_route: Optional[str] = None
 
-    @cached_property
-    def galaxies(self) -> dict[int, GalaxyData]:
-        from hubbleds.remote import LOCAL_API
+    @property
+    def galaxies(self) -> Mapping[int, GalaxyData]:
+        from hubbleds.galaxy_catalog import GALAXY_CATALOG
 
-        gal_data = LOCAL_API.get_galaxies(LOCAL_STATE)
-        return { galaxy.id: galaxy for galaxy in gal_data }
+        return GALAXY_CATALOG.get(LOCAL_STATE).by_id
 
     def as_dict(self):
-        return self.model_dump(exclude={
-            "example_measurements",
-            "measurements",
-            "measurements_loaded",
-            "class_measurements",
-            "all_measurements",
-            "student_summaries",
-            "class_summaries",
-        })
+        return self.model_dump(exclude=NON_STORY_STATE_FIELDS)
+
+    def _measurement_index(self, name: str) -> MeasurementIndex:
+        measurements = getattr(self, name)
+        index = self._measurement_indexes.get(name)
+        if index is None or not index.covers(measurements):
+            index = MeasurementIndex(measurements)
+            self._measurement_indexes[name] = index
+        return index
+
+    def _find_measurement(self, name: str, galaxy_id: int, measurement_number=None, any_number=False) -> int | None:
+        index = self._measurement_index(name)
+        if any_number:
+            position = index.by_galaxy.get(galaxy_id)
+        else:
+            position = index.by_key.get((galaxy_id, measurement_number))
+        if position is None:
+            return None
+
+        # An item replaced in place for another galaxy makes the index stale
+        measurement = index.measurements[position]
+        if measurement.galaxy_id != galaxy_id or not (any_number or measurement.measurement_number == measurement_number):
+            self._measurement_indexes.pop(name, None)
+            return self._find_measurement(name, galaxy_id, measurement_number, any_number)
+        return position
 
     def get_measurement(self, galaxy_id: int) -> StudentMeasurement | None:
-        return next((x for x in self.measurements if x.galaxy_id == galaxy_id), None)
+        index = self.get_measurement_index(galaxy_id)
+        return None if index is None else self.measurements[index]
 
     def get_example_measurement(self, galaxy_id: int, measurement_number = 'first') -> StudentMeasurement | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (x for x in self.example_measurements if check_example_galaxy(x)), None
-        )
+        index = self.get_example_measurement_index(galaxy_id, measurement_number)
+        return None if index is None else self.example_measurements[index]
 
     def get_measurement_index(self, galaxy_id: int) -> int | None:
-        return next(
-            (i for i, x in enumerate(self.measurements) if x.galaxy_id == galaxy_id),
-            None,
-        )
+        return self._find_measurement("measurements", galaxy_id, any_number=True)
 
     def get_example_measurement_index(self, galaxy_id: int, measurement_number = 'first') -> int | None:
-        def check_example_galaxy(x: StudentMeasurement):
-            return x.galaxy_id == galaxy_id and x.measurement_number == measurement_number
-        
-        return next(
-            (
-                i
-                for i, x in enumerate(self.example_measurements)
-                if check_example_galaxy(x)
-            ),
-            None,
-        )
+        return self._find_measurement("example_measurements", galaxy_id, measurement_number)
+
+    def get_class_measurements(self, student_id: int | None = None, class_id: int | None = None) -> MeasurementTable:
+        """
+        The class measurements of a student, or those with a class id, looked
+        up in the index of the table rather than by scanning it.
+        """
+        return self.class_measurements.lookup(student_id=student_id, class_id=class_id)
+
+    def get_all_measurements(self, student_id: int | None = None, class_id: int | None = None) -> MeasurementTable:
+        return self.all_measurements.lookup(student_id=student_id, class_id=class_id)
 
     def question_completed(self, tag: str) -> bool:
+        # Free responses are updated quietly (see `fr_callback`), so a
+        #  component asking this subscribes to the tag itself
+        FREE_RESPONSES.entry(tag).value
+        MC_SCORES.entry(tag).value
         if tag in self.free_responses['responses']:
             return self.free_responses['responses'][tag]['response'] != ""
         elif tag in self.mc_scoring['scores']:
@@ -201,37 +278,19 @@ BaseComponentStateT = TypeVar('BaseComponentStateT', bound='BaseComponentState')
 
 def get_free_response(local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT], tag: str):
     logger.info(f"Getting Free Response for tag: {tag}")
-    # check if the question present
-    if tag in local_state.value.free_responses['responses']:
-        
-        return local_state.value.free_responses['responses'][tag]
-    
-    # Create question on Ref
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
-    free_responses[tag] = dict(tag=tag, response="", initialized=True, stage=component_state.value.stage_id)
-    Ref(local_state.fields.free_responses).set({'responses': free_responses})
-    return free_responses[tag]
+    FREE_RESPONSES.ensure(local_state, tag, component_state.value.stage_id)
+    return FREE_RESPONSES.watch(local_state, tag)
 
 
 def fix_free_responses_stage_missing(tag, local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT]):
     # just add the state if it's missing
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
-    if tag not in free_responses.keys():
-        free_responses[tag] = dict(tag=tag, response="", initialized=True, stage=component_state.value.stage_id)
-        Ref(local_state.fields.free_responses).set({'responses': free_responses})
+    FREE_RESPONSES.ensure(local_state, tag, component_state.value.stage_id)
         
         
 def get_multiple_choice(local_state: Reactive[LocalState], component_state: Reactive[BaseComponentStateT], tag: str):
     logger.info(f"Getting MC Score for tag: {tag}")
-    if tag in local_state.value.mc_scoring['scores']:
-        if 'stage' not in local_state.value.mc_scoring['scores'][tag]:
-            local_state.value.mc_scoring['scores'][tag]['stage'] = component_state.value.stage_id
-        return local_state.value.mc_scoring['scores'][tag]
-    
-    mc_scoring = Ref(local_state.fields.mc_scoring).value.copy()['scores']
-    mc_scoring[tag] = dict(tag=tag, score=None, choice=None, tries=0, wrong_attempts=0, stage=component_state.value.stage_id)
-    Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
-    return mc_scoring[tag]
+    MC_SCORES.ensure(local_state, tag, component_state.value.stage_id)
+    return MC_SCORES.watch(local_state, tag)
 
 
 def mc_callback(
@@ -244,33 +303,19 @@ def mc_callback(
     Multiple Choice callback function
     """
 
-    mc_scoring = Ref(local_state.fields.mc_scoring).value.copy()['scores']
     piggybank_total = Ref(local_state.fields.piggybank_total)
     logger.info(f"MC Callback Event: {event[0]}")
 
     # mc-initialize-callback returns data which is a string
     if event[0] == "mc-initialize-response":
         # check for a missing tag
-        if event[1] not in mc_scoring.keys():
-            logger.info(f"Initializing MC Score for tag: {event[1]}")
-            mc_scoring[event[1]] = dict(
-                tag=event[1], 
-                score=None, 
-                choice=None, 
-                tries=0, 
-                wrong_attempts=0,
-                stage=component_state.value.stage_id
-                )
-            Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
+        if MC_SCORES.get(local_state, event[1]) is None:
+            MC_SCORES.ensure(local_state, event[1], component_state.value.stage_id)
 
     # mc-score event returns a data which is an mc-score dictionary (includes tag)
     elif event[0] == "mc-score":
-        new_score = mc_scoring[event[1]["tag"]].copy() # make a copy of the current score
-        if 'stage' not in new_score:
-            new_score['stage'] = component_state.value.stage_id
-        new_score.update(event[1]) # update with new score, choice, tries, and wrong_attempts, but keeps the stage
-        mc_scoring[event[1]["tag"]] = new_score
-        Ref(local_state.fields.mc_scoring).set({'scores': mc_scoring})
+        # update with new score, choice, tries, and wrong_attempts, but keeps the stage
+        MC_SCORES.update(local_state, event[1]["tag"], event[1], component_state.value.stage_id)
 
         # update piggybank_total
         try:
@@ -303,21 +348,23 @@ def fr_callback(
     """
     Free Response callback function
     """
-    
-    free_responses = Ref(local_state.fields.free_responses).value.copy()['responses']
-    
+
     logger.info(f"Free Response Callback Event: {event[0]}")
     if event[0] == "fr-initialize":
-        if event[1]["tag"] not in free_responses.keys():
-            free_responses[event[1]["tag"]] = dict(tag=event[1]["tag"], response="", initialized=True, stage=component_state.value.stage_id)
-            Ref(local_state.fields.free_responses).set({'responses': free_responses})
+        if FREE_RESPONSES.get(local_state, event[1]["tag"]) is None:
+            FREE_RESPONSES.ensure(local_state, event[1]["tag"], component_state.value.stage_id)
             if callback is not None:
                 callback()
     elif event[0] == "fr-update":
-        free_responses[event[1]["tag"]]['response'] = event[1]["response"]
-        if 'stage' not in free_responses[event[1]["tag"]]:
-            free_responses[event[1]["tag"]]['stage'] = component_state.value.stage_id
-        Ref(local_state.fields.free_responses).set({'responses': free_responses})
+        # Typing only touches this response, and is written without
+        #  re-rendering everything that depends on the local state
+        FREE_RESPONSES.update(
+            local_state,
+            event[1]["tag"],
+            {"response": event[1]["response"]},
+            component_state.value.stage_id,
+            quiet=True,
+        )
         if callback is not None:
                 callback()
     else:
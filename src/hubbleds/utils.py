@@ -1,7 +1,7 @@
-from collections import defaultdict
+import hashlib
+
 from astropy import units as u
-from astropy.modeling import models, fitting
-from numpy import argsort, array, pi
+from numpy import around, array, ascontiguousarray, bincount, errstate, geomspace, interp, isfinite, log, nan, ndarray, ones_like, partition, pi, sqrt, unique
 
 from cosmicds.utils import component_type_for_field, mode, percent_around_center_indices
 from pydantic import BaseModel
@@ -9,8 +9,9 @@ from pydantic import BaseModel
 from glue.core import Data
 from glue_jupyter.app import JupyterApplication
 from numbers import Number
-from typing import List, Set, Tuple, TypeVar, Optional, cast, Any
+from typing import List, NamedTuple, Tuple, TypeVar, Optional, cast, Any
 from collections.abc import Callable
+from functools import lru_cache
 from solara.toestand import Reactive
 
 from hubbleds.state import StudentMeasurement
@@ -47,6 +48,14 @@ DISTANCE_CONSTANT = (
 AGE_CONSTANT = round(1.0e6 * u.pc.to(u.km) / (1e9 * u.yr.to(u.s)) / 10) * 10  # t = d/v
 HST_KEY_AGE = 12.79687910  # (1/H_0) in Gyr
 
+# 1 / H0 in Gyr for H0 = 1 km/s/Mpc
+HUBBLE_TIME_GYR = u.Mpc.to(u.km) * u.s.to(u.Gyr)
+
+# H0 values (km/s/Mpc) covered by the Planck age table, and its size. The
+#  table points are evenly spaced in log(H0).
+AGE_TABLE_H0_RANGE = (10, 300)
+AGE_TABLE_SIZE = 65
+
 SPEED_OF_LIGHT = 3.0 * 10**5  # km/s
 # Both in angstroms
 H_ALPHA_REST_LAMBDA = 6565  # SDSS calibrates to wavelengths in a vacuum
@@ -68,42 +77,127 @@ def angle_from_json(jsn, _widget):
     return jsn["value"] * u.Unit(jsn["unit"])
 
 
+def _exact_age_in_gyr(H0):
+    return planck.clone(H0=H0).age(0).to_value(u.Gyr)
+
+
+@lru_cache(maxsize=None)
+def _planck_age_table() -> Tuple[ndarray, ndarray]:
+    h0 = geomspace(*AGE_TABLE_H0_RANGE, AGE_TABLE_SIZE)
+    ages = array([_exact_age_in_gyr(h) for h in h0])
+    return log(h0), ages * h0 / HUBBLE_TIME_GYR
+
+
 def age_in_gyr(H0):
     """
     Given a value for the Hubble constant, computes the age of the universe
     in Gyr, based on the Planck cosmology.
 
+    The age times H0 changes only slowly with H0, so it is interpolated from
+    a table of exact values, built on first use, over the H0 range
+    `AGE_TABLE_H0_RANGE`. Within that range the relative error is below
+    1e-4, i.e. under 2 Myr for ages up to 20 Gyr. Values outside the range
+    are computed exactly.
+
     Parameters
     ----------
-    H0: float
-        The value of the Hubble constant
+    H0: float or array-like
+        The value(s) of the Hubble constant, in km/s/Mpc
 
     Returns
     ----------
-    age: numpy.float64
-        The age of the universe, in Gyr
+    age: numpy.float64 or numpy.ndarray
+        The age(s) of the universe, in Gyr, NaN where H0 is not positive
     """
-    age = planck.clone(H0=H0).age(0)
-    unit = age.unit
-    return age.value * unit.to(u.Gyr)
+    h0 = asarray(H0, dtype=float)
+    log_h0, factors = _planck_age_table()
+    with errstate(divide="ignore", invalid="ignore"):
+        ages = asarray(interp(log(h0), log_h0, factors) * HUBBLE_TIME_GYR / h0)
+
+    low, high = AGE_TABLE_H0_RANGE
+    ages[h0 <= 0] = nan
+    outside = ((h0 > 0) & (h0 < low)) | (h0 > high)
+    if outside.any():
+        ages[outside] = [_exact_age_in_gyr(h) for h in h0[outside]]
+
+    return ages[()]
 
 
 def age_in_gyr_simple(H0):
-    inv = 1 / H0
-    mpc_to_km = u.Mpc.to(u.km)
-    s_to_gyr = u.s.to(u.Gyr)
-    return round(inv * mpc_to_km * s_to_gyr, 3)
+    return around(HUBBLE_TIME_GYR / H0, 3)
+
+
+class LineFit(NamedTuple):
+    slope: float
+    intercept: float
+    slope_error: float
+    count: int
+
+    def __call__(self, x):
+        return self.slope * x + self.intercept
 
 
-def fit_line(x, y):
-    try:
-        fit = fitting.LinearLSQFitter()
-        line_init = models.Linear1D(intercept=0, fixed={"intercept": True})
-        fitted_line = fit(line_init, x, y)
-        return fitted_line
-    except ValueError as e:
-        print(e)
-        return None
+def fit_line(x, y, weights=None, fit_intercept=False) -> LineFit:
+    """
+    Least-squares fit of a line to the given points, computed directly from
+    sums over the points. By default the line goes through the origin, as a
+    fit of velocity against distance for the Hubble constant does.
+
+    Points where `x`, `y` or the weight is NaN are left out. If there are
+    too few points left to fit, the slope and intercept are NaN.
+
+    Parameters
+    ----------
+    x: array-like
+        The x values of the points
+    y: array-like
+        The y values of the points
+    weights: array-like, optional
+        Weights applied to the residual of each point, i.e. 1 / uncertainty
+        in `y`, as for astropy fitters
+    fit_intercept: bool
+        Whether to fit the intercept, rather than fixing it at 0
+
+    Returns
+    ----------
+    line: LineFit
+        The slope and intercept of the line, the standard error of the slope
+        (NaN when there are no degrees of freedom left), and the number of
+        points used
+    """
+    x = asarray(x, dtype=float).ravel()
+    y = asarray(y, dtype=float).ravel()
+    w2 = ones_like(x) if weights is None else asarray(weights, dtype=float).ravel() ** 2
+
+    used = isfinite(x) & isfinite(y) & isfinite(w2)
+    x, y, w2 = x[used], y[used], w2[used]
+    count = len(x)
+    dof = count - (2 if fit_intercept else 1)
+
+    with errstate(divide="ignore", invalid="ignore"):
+        if fit_intercept:
+            total = w2.sum()
+            x_mean = (w2 * x).sum() / total
+            y_mean = (w2 * y).sum() / total
+            dx = x - x_mean
+            sxx = (w2 * dx * dx).sum()
+            slope = (w2 * dx * (y - y_mean)).sum() / sxx
+            intercept = y_mean - slope * x_mean
+        else:
+            sxx = (w2 * x * x).sum()
+            slope = (w2 * x * y).sum() / sxx
+            intercept = 0.0
+
+        if dof > 0:
+            residuals = y - slope * x - intercept
+            slope_error = sqrt((w2 * residuals * residuals).sum() / dof / sxx)
+        else:
+            slope_error = nan
+
+    if dof < 0 or not isfinite(slope):
+        slope, intercept = nan, nan if fit_intercept else 0.0
+
+    return LineFit(float(slope), float(intercept), float(slope_error), count)
 
 
 def format_fov(fov, units=True):
@@ -118,7 +212,7 @@ def format_measured_angle(angle):
 
 
 def velocity_from_wavelengths(lamb_meas, lamb_rest):
-    return round((3 * (10**5) * (lamb_meas / lamb_rest - 1)), 0)
+    return around(3 * (10**5) * (lamb_meas / lamb_rest - 1), 0)
 
 def w2v(lambda_meas, lamb_rest):
     return SPEED_OF_LIGHT * (lambda_meas / lamb_rest - 1)
@@ -127,7 +221,7 @@ def v2w(velocity, lamb_rest):
     return lamb_rest * (velocity / SPEED_OF_LIGHT + 1)
 
 def distance_from_angular_size(theta):
-    return round(DISTANCE_CONSTANT / theta, 0)
+    return around(DISTANCE_CONSTANT / theta, 0)
 
 
 def data_summary_for_component(data, component_id):
@@ -136,18 +230,35 @@ def data_summary_for_component(data, component_id):
         "median": data.compute_statistic("median", component_id),
         "mode": mode(data, component_id),
     }
-    values = data[component_id]
+    values = asarray(data[component_id])
     percents = [50, 68, 95]
-    sorted_indices = argsort(values)
+    bounds = {
+        percent: percent_around_center_indices(data.size, percent)
+        for percent in percents
+    }
 
-    for percent in percents:
-        bottom_index, top_index = percent_around_center_indices(data.size, percent)
-        bottom = values[sorted_indices[bottom_index]]
-        top = values[sorted_indices[top_index]]
-        summary[f"{percent}%"] = (bottom, top)
+    # The ends of every range with one partial sort instead of a full one
+    kth = sorted({index for indices in bounds.values() for index in indices})
+    partitioned = partition(values, kth) if kth else values
+
+    for percent, (bottom_index, top_index) in bounds.items():
+        summary[f"{percent}%"] = (partitioned[bottom_index], partitioned[top_index])
 
     return summary
 
+
+def data_version(*arrays) -> str:
+    """
+    A digest of the contents of the given arrays, which changes whenever
+    any of their values do.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = ascontiguousarray(values)
+        digest.update(str((values.dtype, values.shape)).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
 def measurement_list_to_glue_data(measurements: list[StudentMeasurement] | list[dict], label = ""):
     x = []
     for measurement in measurements:
@@ -178,41 +289,82 @@ def models_to_glue_data(items: List[M],
 
 def create_single_summary(distances: List[Number], velocities: List[Number]) -> Tuple[float, float]:
     line = fit_line(distances, velocities)
-    h0 = line.slope.value
+    h0 = line.slope
     age = age_in_gyr_simple(h0)
     return h0, age
 
 
+class GroupedHubbleFit(NamedTuple):
+    ids: ndarray
+    hubble_fit_value: ndarray
+    age_value: ndarray
+    count: ndarray
+    scatter: ndarray
+
+
+def grouped_hubble_fit(ids, distances, velocities) -> GroupedHubbleFit:
+    """
+    Fits a line through the origin to the distances and velocities of each
+    group of measurements at once, with the slope of group `i` given by
+    sum(d * v) / sum(d * d) over its measurements.
+
+    Measurements missing a distance or a velocity (None or NaN) are left out.
+    Groups with no complete measurements get NaN values.
+
+    Parameters
+    ----------
+    ids: array-like
+        The group (e.g. student or class id) of each measurement
+    distances: array-like
+        The distance of each measurement, in Mpc
+    velocities: array-like
+        The velocity of each measurement, in km/s
+
+    Returns
+    ----------
+    fit: GroupedHubbleFit
+        The sorted unique group ids, and for each group the Hubble constant
+        in km/s/Mpc, the age of the universe in Gyr, the number of complete
+        measurements, and the standard deviation of the velocity residuals
+        about the fitted line, in km/s (NaN for fewer than two measurements)
+    """
+    group_ids, inverse = unique(asarray(ids), return_inverse=True)
+    distances = asarray(distances, dtype=float)
+    velocities = asarray(velocities, dtype=float)
+
+    complete = isfinite(distances) & isfinite(velocities)
+    inverse = inverse.ravel()[complete]
+    distances = distances[complete]
+    velocities = velocities[complete]
+
+    n_groups = len(group_ids)
+    count = bincount(inverse, minlength=n_groups)
+    sum_xx = bincount(inverse, weights=distances * distances, minlength=n_groups)
+    sum_xy = bincount(inverse, weights=distances * velocities, minlength=n_groups)
+
+    with errstate(divide="ignore", invalid="ignore"):
+        hubble = sum_xy / sum_xx
+        residuals = velocities - hubble[inverse] * distances
+        sum_rr = bincount(inverse, weights=residuals * residuals, minlength=n_groups)
+        scatter = sqrt(sum_rr / (count - 1))
+        age = age_in_gyr_simple(hubble)
+    scatter[count < 2] = nan
+
+    return GroupedHubbleFit(group_ids, hubble, age, count, scatter)
+
+
 def make_summary_data(measurement_data: Data,
                       input_id_field: str="id",
                       output_id_field: str | None=None,
                       label: str | None=None
 ) -> Data:
-    dists = defaultdict(list)
-    vels = defaultdict(list)
-    d = measurement_data["est_dist_value"]
-    v = measurement_data["velocity_value"]
-    ids: Set[int] = set()
-
-    for i in range(measurement_data.size):
-        id_num = measurement_data[input_id_field][i]
-        ids.add(id_num)
-        dist = d[i]
-        vel = v[i]
-        if dist is not None and vel is not None:
-            dists[id_num].append(dist)
-            vels[id_num].append(vel)
-
-    hubbles: List[float] = []
-    ages: List[float] = []
-    for id_num in ids:
-        h0, age = create_single_summary(dists[id_num], vels[id_num])
-        hubbles.append(h0)
-        ages.append(age)
-
-    data_kwargs: dict = { "hubble_fit_value": hubbles, "age_value": ages }
+    fit = grouped_hubble_fit(measurement_data[input_id_field],
+                             measurement_data["est_dist_value"],
+                             measurement_data["velocity_value"])
+
+    data_kwargs: dict = { "hubble_fit_value": fit.hubble_fit_value, "age_value": fit.age_value }
     output_id_field = output_id_field or input_id_field
-    data_kwargs[output_id_field] = list(ids)
+    data_kwargs[output_id_field] = fit.ids
 
     if label:
         data_kwargs["label"] = label
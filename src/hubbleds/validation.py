@@ -0,0 +1,149 @@
+from typing import Iterable, NamedTuple
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import Angle
+
+from hubbleds.galaxy_catalog import GalaxyCatalog
+from hubbleds.measurement_table import MeasurementTable
+from hubbleds.state import StudentMeasurement
+from hubbleds.utils import DISTANCE_CONSTANT
+
+# Largest fractional difference between the measured and catalog redshift of
+#  a galaxy before its wavelength counts as poorly measured
+REDSHIFT_TOLERANCE = 0.5
+
+# Bounds on angular size used by the distance tool guard
+GALAXY_MAX_SIZE = Angle("60 arcmin")  # 2 x Pinwheel galaxy (d = 7 Mpc, r = 1.7 Rmw)
+GALAXY_MIN_SIZE = Angle("6 arcsec")  # 3 x sdss resolution
+MAX_WWT_SIZE = Angle("60 deg")
+
+# Largest difference (in Mpc) between a stored distance and the distance
+#  computed from the stored angular size, which is rounded to whole Mpc
+DISTANCE_TOLERANCE = 1
+
+
+class ValidationMasks(NamedTuple):
+    """
+    One boolean array per validation rule, true where a measurement fails
+    it. A measurement that is missing the values a rule checks does not fail
+    that rule.
+    """
+
+    missing_wavelength: np.ndarray
+    bad_redshift: np.ndarray
+    bad_angular_size: np.ndarray
+    bad_distance: np.ndarray
+
+    @property
+    def any_bad(self) -> np.ndarray:
+        return self.bad_redshift | self.bad_angular_size | self.bad_distance
+
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def poorly_measured_wavelengths(obs_wave, rest_wave, z, tolerance=REDSHIFT_TOLERANCE):
+    """
+    Whether the redshift implied by each observed wavelength is more than
+    `tolerance` (as a fraction) away from the galaxy's catalog redshift.
+    """
+    obs_wave = np.asarray(obs_wave, dtype=float)
+    rest_wave = np.asarray(rest_wave, dtype=float)
+    z = np.asarray(z, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_meas = (obs_wave - rest_wave) / rest_wave
+        fractional_difference = np.abs((z_meas - z) / z)
+    return fractional_difference > tolerance
+
+
+def bad_angular_sizes(
+    ang_size,
+    min_size: Angle = GALAXY_MIN_SIZE,
+    max_size: Angle = GALAXY_MAX_SIZE,
+):
+    """
+    Whether each angular size (in arcseconds) is outside the bounds that
+    the distance tool guard accepts.
+    """
+    ang_size = np.asarray(ang_size, dtype=float)
+    with np.errstate(invalid="ignore"):
+        inside = (
+            (ang_size < MAX_WWT_SIZE.to_value(u.arcsec))
+            & (ang_size >= min_size.to_value(u.arcsec))
+            & (ang_size <= max_size.to_value(u.arcsec))
+        )
+    return ~inside & ~np.isnan(ang_size)
+
+
+def bad_distances(est_dist, ang_size, tolerance=DISTANCE_TOLERANCE):
+    """
+    Whether each distance (in Mpc) is not positive, or does not follow from
+    the angular size it was computed from.
+    """
+    est_dist = np.asarray(est_dist, dtype=float)
+    ang_size = np.asarray(ang_size, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        expected = DISTANCE_CONSTANT / ang_size
+        mismatch = np.abs(est_dist - expected) > tolerance
+        not_positive = est_dist <= 0
+    return not_positive | (mismatch & ~np.isnan(ang_size))
+
+
+def validate_measurements(
+    obs_wave,
+    rest_wave,
+    z,
+    ang_size,
+    est_dist,
+    tolerance=REDSHIFT_TOLERANCE,
+    min_size: Angle = GALAXY_MIN_SIZE,
+    max_size: Angle = GALAXY_MAX_SIZE,
+) -> ValidationMasks:
+    """
+    Check all measurements at once against every rule. The values are
+    arrays with one entry per measurement, NaN where a value is missing.
+    """
+    return ValidationMasks(
+        missing_wavelength=np.isnan(np.asarray(obs_wave, dtype=float)),
+        bad_redshift=poorly_measured_wavelengths(obs_wave, rest_wave, z, tolerance),
+        bad_angular_size=bad_angular_sizes(ang_size, min_size, max_size),
+        bad_distance=bad_distances(est_dist, ang_size),
+    )
+
+
+def validate_measurement_list(
+    measurements: Iterable[StudentMeasurement], **kwargs
+) -> ValidationMasks:
+    """
+    `validate_measurements` for a student's own list of measurements.
+    """
+    measurements = list(measurements)
+    return validate_measurements(
+        _floats(m.obs_wave_value for m in measurements),
+        _floats(m.rest_wave_value for m in measurements),
+        _floats(m.galaxy.z if m.galaxy else None for m in measurements),
+        _floats(m.ang_size_value for m in measurements),
+        _floats(m.est_dist_value for m in measurements),
+        **kwargs,
+    )
+
+
+def validate_table(
+    measurements: MeasurementTable, catalog: GalaxyCatalog, **kwargs
+) -> ValidationMasks:
+    """
+    `validate_measurements` for a table of measurements, such as those of a
+    whole class, taking each galaxy's redshift and rest wavelength from the
+    catalog.
+    """
+    galaxies = [catalog.by_id.get(int(i)) for i in measurements.galaxy_id]
+    return validate_measurements(
+        measurements.obs_wave_value,
+        _floats(g.rest_wave_value if g else None for g in galaxies),
+        _floats(g.z if g else None for g in galaxies),
+        measurements.ang_size_value,
+        measurements.est_dist_value,
+        **kwargs,
+    )
@@ -11,6 +11,7 @@ from traitlets import Instance, Bool, Float, Int, Unicode, observe, Dict
 
 from ...utils import GALAXY_FOV, angle_to_json, \
     angle_from_json
+from ...validation import GALAXY_MAX_SIZE, GALAXY_MIN_SIZE, MAX_WWT_SIZE
 
 
 class DistanceTool(v.VueTemplate):
@@ -43,8 +44,8 @@ class DistanceTool(v.VueTemplate):
     
     # Guard
     guard = Bool(False).tag(sync=True)
-    galaxy_max_size = Angle("60 arcmin") # 2 x Pinwheel galaxy (d = 7 Mpc, r = 1.7 Rmw)
-    galaxy_min_size = Angle("6 arcsec") # 3 x sdss resolution
+    galaxy_max_size = GALAXY_MAX_SIZE
+    galaxy_min_size = GALAXY_MIN_SIZE
     bad_measurement = Bool(False).tag(sync=True)
 
     SDSS = "SDSS9 color"
@@ -189,8 +190,7 @@ class DistanceTool(v.VueTemplate):
             return True
         if not check:
             return self.bad_measurement
-        max_wwt_size = Angle("60 deg")
-        c1 = (angular_size < max_wwt_size) 
+        c1 = (angular_size < MAX_WWT_SIZE) 
         c2 = (angular_size >= self.galaxy_min_size) 
         c3 = (angular_size <= self.galaxy_max_size)
         self.bad_measurement = not (c1 and c2 and c3)
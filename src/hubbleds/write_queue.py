@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+import solara
+from solara.toestand import ValueBase
+
+from cosmicds.logger import setup_logger
+from hubbleds.remote import ASYNC_LOCAL_API, DEBOUNCE_TIMEOUT, AsyncLocalAPI
+
+logger = setup_logger("WRITE-QUEUE")
+
+T = TypeVar("T")
+
+# Number of completed writes that flush latency statistics are computed over
+LATENCY_HISTORY = 100
+
+
+class Snapshot(Generic[T]):
+    """
+    Stand-in for a reactive variable, holding the value the variable had when
+    a write was queued. Queued writes run outside of the session that queued
+    them, where the reactive variables themselves cannot be read.
+    """
+
+    def __init__(self, value: T):
+        self.value = value
+
+
+@dataclass
+class _PendingWrite:
+    write: Callable[..., Awaitable[bool]]
+    args: tuple
+    kwargs: dict
+    queued_at: float
+
+
+class WriteBehindQueue:
+    """
+    Collects the database writes of one session and sends them after a quiet
+    period, so that a burst of state changes (e.g. a student typing into a
+    free response box) results in a single write.
+
+    Writes are queued under a key naming what they write to, such as the story
+    state or the state of one stage. A write replaces any write still waiting
+    under the same key, and at most one write per key is in flight at any
+    time; a write queued meanwhile is sent once the in-flight one completes.
+
+    Queued writes run on the event loop of `ASYNC_LOCAL_API`, so `submit` and
+    `flush` can be called from any thread.
+
+    Parameters
+    ----------
+    window : float
+        Seconds without new writes under a key before its write is sent.
+    api : AsyncLocalAPI
+        The API whose event loop the writes run on.
+    """
+
+    def __init__(
+        self, window: float = DEBOUNCE_TIMEOUT, api: AsyncLocalAPI = ASYNC_LOCAL_API
+    ):
+        self.window = window
+        self._api = api
+
+        # Only accessed from the API event loop
+        self._pending: dict[str, _PendingWrite] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_HISTORY)
+
+    @property
+    def depth(self) -> int:
+        """
+        The number of writes that are waiting to be sent or are in flight.
+        """
+        return len(self._pending) + len(self._in_flight)
+
+    def submit(
+        self, key: str, write: Callable[..., Awaitable[bool]], *args, **kwargs
+    ):
+        """
+        Queue ``write(*args, **kwargs)`` under `key`. Reactive variables among
+        the arguments are replaced by a `Snapshot` of their current value.
+        `write` should return whether the write succeeded.
+        """
+        args = tuple(self._snapshot(arg) for arg in args)
+        kwargs = {k: self._snapshot(v) for k, v in kwargs.items()}
+        pending = _PendingWrite(write, args, kwargs, time.monotonic())
+        self._api.loop.call_soon_threadsafe(self._queue, key, pending)
+
+    def flush(self) -> Future[None]:
+        """
+        Send all waiting writes now. Returns a `concurrent.futures.Future`
+        that completes once every write, including those that were already
+        in flight, has finished.
+        """
+        return self._api.submit(self._flush())
+
+    def metrics(self) -> dict[str, Any]:
+        latencies = list(self._latencies)
+        return {
+            "depth": self.depth,
+            "in_flight": len(self._in_flight),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed": self.failed,
+            "flush_latency_last": latencies[-1] if latencies else None,
+            "flush_latency_mean": (
+                sum(latencies) / len(latencies) if latencies else None
+            ),
+            "flush_latency_max": max(latencies) if latencies else None,
+        }
+
+    @staticmethod
+    def _snapshot(value):
+        if isinstance(value, ValueBase):
+            return Snapshot(value.value)
+        return value
+
+    def _queue(self, key: str, pending: _PendingWrite):
+        self.submitted += 1
+
+        replaced = self._pending.get(key)
+        if replaced is not None:
+            self.coalesced += 1
+            # Latency is measured from the first change that is still unsent
+            pending.queued_at = replaced.queued_at
+        self._pending[key] = pending
+
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[key] = self._api.loop.call_later(self.window, self._start, key)
+
+    def _start(self, key: str):
+        self._timers.pop(key, None)
+
+        # Started again once the write in flight completes
+        if key in self._in_flight:
+            return
+
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self._in_flight[key] = self._api.loop.create_task(
+                self._run(key, pending)
+            )
+
+    async def _run(self, key: str, pending: _PendingWrite):
+        try:
+            success = await pending.write(*pending.args, **pending.kwargs)
+        except Exception:
+            logger.exception("Queued write of `%s` raised an error.", key)
+            success = False
+        finally:
+            del self._in_flight[key]
+
+        if success:
+            self.written += 1
+            self._latencies.append(time.monotonic() - pending.queued_at)
+            logger.info("Wrote `%s` to database.", key)
+        else:
+            self.failed += 1
+            logger.info("Did not write `%s` to database.", key)
+
+        if key in self._pending and key not in self._timers:
+            self._start(key)
+
+    async def _flush(self):
+        for key, timer in list(self._timers.items()):
+            timer.cancel()
+            self._start(key)
+
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+
+_QUEUES: dict[str, WriteBehindQueue] = {}
+_QUEUES_LOCK = threading.Lock()
+
+
+def get_write_queue() -> WriteBehindQueue:
+    """
+    The write queue of the current session.
+    """
+    kernel_id = solara.get_kernel_id()
+    with _QUEUES_LOCK:
+        queue = _QUEUES.get(kernel_id)
+        if queue is None:
+            queue = _QUEUES[kernel_id] = WriteBehindQueue()
+    return queue
+
+
+def _flush_on_disconnect():
+    kernel_id = solara.get_kernel_id()
+
+    def cleanup():
+        with _QUEUES_LOCK:
+            queue = _QUEUES.pop(kernel_id, None)
+        if queue is not None:
+            logger.info("Flushing writes of disconnected session `%s`.", kernel_id)
+            queue.flush()
+
+    return cleanup
+
+
+solara.lab.on_kernel_start(_flush_on_disconnect)
@@ -1,10 +1,67 @@
 """
-    Dummy conftest.py for hubbleds.
+    Shared fixtures for the hubbleds tests.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     - https://docs.pytest.org/en/stable/fixture.html
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import pytest
+import solara
+
+from hubbleds.remote import AsyncLocalAPI, LocalAPI
+from hubbleds.stand_in_server import StandInServer
+from hubbleds.state import GLOBAL_STATE, GalaxyData, LocalState, StudentMeasurement
+
+STUDENT_ID = 7
+
+
+@pytest.fixture
+def server():
+    return StandInServer()
+
+
+@pytest.fixture
+def api(server):
+    # A fresh LocalAPI, so that what one test learns about the server (e.g.
+    #  that it does not accept patches) does not carry over to the next
+    return AsyncLocalAPI(LocalAPI(), transport=server.transport)
+
+
+@pytest.fixture
+def global_state():
+    state = GLOBAL_STATE.value
+    student = state.student.model_copy(update={"id": STUDENT_ID})
+    return solara.reactive(state.model_copy(update={"student": student, "update_db": True}))
+
+
+def make_galaxy(galaxy_id: int) -> GalaxyData:
+    return GalaxyData(
+        id=galaxy_id,
+        name=f"galaxy_{galaxy_id}.fits",
+        ra=10.0 + galaxy_id,
+        decl=20.0 - galaxy_id,
+        z=0.01 * galaxy_id,
+        type="Sp",
+        element="H-α",
+    )
+
+
+def make_measurement(galaxy_id: int, **kwargs) -> StudentMeasurement:
+    return StudentMeasurement(
+        student_id=STUDENT_ID, galaxy=make_galaxy(galaxy_id), **kwargs
+    )
+
+
+@pytest.fixture(name="make_measurement")
+def make_measurement_fixture():
+    return make_measurement
+
+
+@pytest.fixture
+def local_state():
+    measurements = [
+        make_measurement(i, velocity_value=1000.0 * i, est_dist_value=15.0 * i)
+        for i in range(1, 4)
+    ]
+    return solara.reactive(LocalState(measurements=measurements))
@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from hubbleds import bootstrap
+from hubbleds.bootstrap import BootstrapCache, bootstrap_hubble_fit
+from hubbleds.utils import HUBBLE_TIME_GYR
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(11)
+    ids = rng.permutation(np.repeat([4, 2, 8], 10))
+    distances = rng.uniform(20, 400, len(ids))
+    velocities = 70 * distances + rng.normal(0, 1500, len(ids))
+    return ids, distances, velocities
+
+
+def test_groups_and_missing_values():
+    ids = [3, 1, 3, 1, 7, 5]
+    distances = [10.0, 20.0, np.nan, 40.0, 50.0, None]
+    velocities = [700.0, 1600.0, 900.0, np.nan, 3000.0, 100.0]
+
+    result = bootstrap_hubble_fit(ids, distances, velocities, n_resamples=50)
+
+    np.testing.assert_array_equal(result.ids, [1, 3, 5, 7])
+    np.testing.assert_array_equal(result.count, [1, 1, 0, 1])
+    # Groups with a single complete point resample to it every time
+    np.testing.assert_allclose(result.hubble_fit_value[0], 80.0)
+    np.testing.assert_allclose(result.hubble_fit_value[1], 70.0)
+    np.testing.assert_allclose(result.hubble_fit_value[3], 60.0)
+    np.testing.assert_allclose(result.age_value[1], HUBBLE_TIME_GYR / 70.0)
+    assert np.isnan(result.hubble_fit_value[2]).all()
+
+
+def test_resamples_stay_within_their_group(data):
+    ids, distances, velocities = data
+    result = bootstrap_hubble_fit(ids, distances, velocities, n_resamples=200)
+
+    for i, group in enumerate(result.ids):
+        ratios = velocities[ids == group] / distances[ids == group]
+        assert result.hubble_fit_value[i].min() >= ratios.min()
+        assert result.hubble_fit_value[i].max() <= ratios.max()
+
+
+@pytest.mark.parametrize("chunk_points", [bootstrap.BOOTSTRAP_CHUNK_POINTS, 100])
+def test_seeds(data, chunk_points):
+    first = bootstrap_hubble_fit(*data, n_resamples=40, seed=1, chunk_points=chunk_points)
+    again = bootstrap_hubble_fit(*data, n_resamples=40, seed=1, chunk_points=chunk_points)
+    other = bootstrap_hubble_fit(*data, n_resamples=40, seed=2, chunk_points=chunk_points)
+
+    np.testing.assert_array_equal(first.hubble_fit_value, again.hubble_fit_value)
+    assert not np.array_equal(first.hubble_fit_value, other.hubble_fit_value)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        spread = bootstrap_hubble_fit(
+            *data, n_resamples=40, seed=1, chunk_points=chunk_points, executor=executor
+        )
+    np.testing.assert_array_equal(first.hubble_fit_value, spread.hubble_fit_value)
+
+
+def test_bands(data):
+    result = bootstrap_hubble_fit(*data, n_resamples=500)
+
+    bands = result.bands()
+
+    assert list(bands) == ["50%", "68%", "95%"]
+    for level, (low, high) in bands.items():
+        percent = float(level[:-1])
+        expected = np.percentile(result.age_value, [50 - percent / 2, 50 + percent / 2], axis=1)
+        np.testing.assert_allclose(low, expected[0])
+        np.testing.assert_allclose(high, expected[1])
+    # Wider levels hold the narrower ones
+    assert (bands["95%"][0] <= bands["68%"][0]).all() and (bands["68%"][0] <= bands["50%"][0]).all()
+    assert (bands["50%"][1] <= bands["68%"][1]).all() and (bands["68%"][1] <= bands["95%"][1]).all()
+
+
+def test_bands_of_a_group_without_data():
+    result = bootstrap_hubble_fit([1, 2], [10.0, np.nan], [700.0, 800.0], n_resamples=10)
+    low, high = result.interval(68)
+    assert low[0] == high[0] == pytest.approx(HUBBLE_TIME_GYR / 70.0)
+    assert np.isnan(low[1]) and np.isnan(high[1])
+
+
+def test_cache_is_keyed_on_the_data_version(monkeypatch, data):
+    calls = []
+    original = bootstrap.bootstrap_hubble_fit
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(bootstrap, "bootstrap_hubble_fit", counted)
+    cache = BootstrapCache(max_size=2)
+    ids, distances, velocities = data
+
+    result = cache.get("class", ids, distances, velocities, n_resamples=20)
+    # Equal data in other arrays is the same version
+    assert cache.get("class", ids.copy(), distances.copy(), velocities.copy(), n_resamples=20) is result
+    assert len(calls) == 1
+
+    changed = velocities.copy()
+    changed[0] += 1
+    assert cache.get("class", ids, distances, changed, n_resamples=20) is not result
+    assert len(calls) == 2
+
+    # The least recently used result is dropped
+    cache.get("all", ids, distances, velocities, n_resamples=20)
+    cache.get("class", ids, distances, velocities, n_resamples=20)
+    assert len(calls) == 4
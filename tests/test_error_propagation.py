@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from hubbleds.error_propagation import propagate_measurement_errors
+from hubbleds.utils import distance_from_angular_size, velocity_from_wavelengths
+
+REST_WAVE = 6563.0
+
+
+def test_students_are_fit_separately():
+    # Without errors, every sample is the through-origin fit of the values
+    ids = np.array([5, 3, 5, 9, 3, 5])
+    obs_wave = np.array([6700.0, 6650.0, 6800.0, 6900.0, 6600.0, 6750.0])
+    ang_size = np.array([60.0, 80.0, 40.0, 30.0, 90.0, 50.0])
+    rest_wave = np.full(len(ids), REST_WAVE)
+
+    result = propagate_measurement_errors(
+        ids, obs_wave, rest_wave, ang_size, obs_wave_sigma=0, ang_size_sigma=0, n_samples=3
+    )
+
+    np.testing.assert_array_equal(result.ids, [3, 5, 9])
+    velocities = velocity_from_wavelengths(obs_wave, rest_wave)
+    distances = distance_from_angular_size(ang_size)
+    for i, student in enumerate(result.ids):
+        d, v = distances[ids == student], velocities[ids == student]
+        np.testing.assert_allclose(result.hubble_fit_value[i], (d @ v) / (d @ d), rtol=1e-5)
+
+
+def test_missing_values_are_left_out():
+    ids = [1, 1, 2]
+    result = propagate_measurement_errors(
+        ids,
+        [6700.0, np.nan, 6700.0],
+        [REST_WAVE, REST_WAVE, REST_WAVE],
+        [50.0, 50.0, np.nan],
+        obs_wave_sigma=0,
+        ang_size_sigma=0,
+        n_samples=2,
+    )
+
+    expected = velocity_from_wavelengths(6700.0, REST_WAVE) / distance_from_angular_size(50.0)
+    np.testing.assert_allclose(result.hubble_fit_value[0], expected, rtol=1e-5)
+    # Nothing of the second student is usable
+    assert np.isnan(result.hubble_fit_value[1]).all()
+    assert np.isnan(result.age_value[1]).all()
+
+
+def test_no_measurements():
+    result = propagate_measurement_errors([], [], [], [], n_samples=4)
+    assert result.hubble_fit_value.shape == (0, 4)
+
+
+def test_same_seed_same_samples():
+    args = ([1, 2, 1], [6700.0, 6800.0, 6650.0], [REST_WAVE] * 3, [50.0, 40.0, 70.0])
+
+    first = propagate_measurement_errors(*args, n_samples=100, seed=4)
+    second = propagate_measurement_errors(*args, n_samples=100, seed=4)
+    other = propagate_measurement_errors(*args, n_samples=100, seed=5)
+
+    np.testing.assert_array_equal(first.hubble_fit_value, second.hubble_fit_value)
+    assert not np.array_equal(first.hubble_fit_value, other.hubble_fit_value)
+
+
+def test_spread_matches_linear_propagation():
+    # One measurement, with errors small enough for linear propagation
+    obs_wave, ang_size = 6900.0, 40.0
+    obs_wave_sigma, ang_size_sigma = 5.0, 1.0
+
+    result = propagate_measurement_errors(
+        [1], [obs_wave], [REST_WAVE], [ang_size],
+        obs_wave_sigma=obs_wave_sigma, ang_size_sigma=ang_size_sigma, n_samples=20_000, seed=0,
+    )
+
+    velocity = 3e5 * (obs_wave / REST_WAVE - 1)
+    distance = distance_from_angular_size(ang_size) * 1.0
+    hubble = velocity / distance
+    relative = np.hypot(3e5 * obs_wave_sigma / REST_WAVE / velocity, ang_size_sigma / ang_size)
+
+    spread = result.spread("hubble_fit_value", 68)
+    assert spread["mean"][0] == pytest.approx(hubble, rel=0.005)
+    assert spread["std"][0] == pytest.approx(hubble * relative, rel=0.05)
+    assert spread["low"][0] == pytest.approx(hubble * (1 - relative), rel=0.01)
+    assert spread["high"][0] == pytest.approx(hubble * (1 + relative), rel=0.01)
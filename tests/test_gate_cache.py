@@ -0,0 +1,102 @@
+import enum
+
+import pytest
+import solara
+from pydantic import BaseModel
+
+from hubbleds.base_component_state import BaseComponentState
+from hubbleds.base_marker import BaseMarker
+from hubbleds.gate_cache import GateCache, gate
+from hubbleds.response_store import FREE_RESPONSES
+from hubbleds.state import LOCAL_STATE, LocalState
+
+
+class Marker(enum.Enum, BaseMarker):
+    one = enum.auto()
+    two = enum.auto()
+    three = enum.auto()
+    four = enum.auto()
+
+
+CALLS = []
+
+
+class ComponentState(BaseComponentState, BaseModel):
+    current_step: Marker = Marker.first()
+    clicks: int = 0
+
+    @gate(fields=["clicks"])
+    def two_gate(self) -> bool:
+        CALLS.append("two")
+        return self.clicks > 0
+
+    @gate(questions=["fr-1"])
+    def three_gate(self) -> bool:
+        CALLS.append("three")
+        return LOCAL_STATE.value.question_completed("fr-1")
+
+    @property
+    def four_gate(self) -> bool:
+        CALLS.append("four")
+        return True
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    LOCAL_STATE.set(LocalState())
+    CALLS.clear()
+
+
+def test_gates_are_only_evaluated_again_once_their_state_changed():
+    cache = GateCache()
+    state = ComponentState()
+
+    assert not cache.evaluate(state, "two_gate")
+    assert not cache.evaluate(state, "two_gate")
+    assert CALLS == ["two"]
+
+    state = state.model_copy(update={"clicks": 1})
+    assert cache.evaluate(state, "two_gate")
+    assert CALLS == ["two", "two"]
+
+
+def test_question_gates_follow_their_responses():
+    cache = GateCache()
+    state = ComponentState()
+
+    assert not cache.evaluate(state, "three_gate")
+    FREE_RESPONSES.ensure(LOCAL_STATE, "fr-1", 1)
+    assert not cache.evaluate(state, "three_gate")
+    # Updated without notifying the local state, as typing does
+    FREE_RESPONSES.update(LOCAL_STATE, "fr-1", {"response": "text"}, 1, quiet=True)
+    assert cache.evaluate(state, "three_gate")
+    assert cache.evaluate(state, "three_gate")
+
+    assert CALLS == ["three"] * 3
+
+
+def test_undeclared_gates_are_always_evaluated():
+    cache = GateCache()
+    state = ComponentState()
+
+    assert cache.evaluate(state, "four_gate")
+    assert cache.evaluate(state, "four_gate")
+    assert CALLS == ["four", "four"]
+    # Steps without a gate are always open
+    assert cache.evaluate(state, "one_gate")
+
+
+def test_reachable_steps():
+    state = ComponentState()
+    assert state.reachable_steps() == (True, False, False, True)
+    assert not state.can_advance(state.reachable_steps())
+
+    state = ComponentState(current_step=Marker.two, clicks=1)
+    FREE_RESPONSES.update(LOCAL_STATE, "fr-1", {"response": "text"}, 1)
+    reachable = state.reachable_steps()
+    assert reachable == (True, True, True, True)
+    assert state.can_advance(reachable) == state.can_transition(next=True)
+
+    # There is nothing to advance to from the last step
+    state = ComponentState(current_step=Marker.four)
+    assert not state.can_advance(state.reachable_steps())
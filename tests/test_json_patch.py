@@ -0,0 +1,84 @@
+import copy
+import math
+
+import pytest
+
+from hubbleds import json_patch
+from hubbleds.json_patch import JsonPatchError
+
+
+DOCUMENTS = [
+    ({}, {}),
+    ({"a": 1}, {"a": 2}),
+    ({"a": 1, "b": 2}, {"b": 2, "c": 3}),
+    ({"a": {"b": {"c": [1, 2]}}}, {"a": {"b": {"c": [1, 2, 3]}, "d": None}}),
+    ({"a/b": 1, "c~d": 2}, {"a/b": 3, "c~d": 2, "e~/f": 4}),
+    ({"a": [1, {"b": 2}]}, {"a": "replaced"}),
+    ({"a": 1}, [1, 2]),
+    ({"a": 1}, {"a": 1.0}),
+    ({"responses": {"fr-1": {"response": ""}}}, {"responses": {"fr-1": {"response": "hi"}, "fr-2": {}}}),
+]
+
+
+@pytest.mark.parametrize("old,new", DOCUMENTS)
+def test_diff_apply_round_trip(old, new):
+    before = copy.deepcopy(old)
+    patch = json_patch.diff(old, new)
+    assert json_patch.apply(old, patch) == new
+    # Neither the document nor the hash of it are changed by a patch
+    assert old == before
+    assert json_patch.document_hash(json_patch.apply(old, patch)) == json_patch.document_hash(new)
+
+
+def test_diff_of_equal_documents_is_empty():
+    document = {"a": [1, 2, {"b": None}], "c": "d"}
+    assert json_patch.diff(document, copy.deepcopy(document)) == []
+
+
+def test_diff_changes_only_the_changed_member():
+    patch = json_patch.diff({"a": {"b": 1, "c": 2}}, {"a": {"b": 1, "c": 3}})
+    assert patch == [{"op": "replace", "path": "/a/c", "value": 3}]
+
+
+def test_diff_treats_nan_as_unchanged():
+    old = {"a": math.nan, "b": [1.0, math.nan], "c": {"d": math.nan}}
+    new = {"a": math.nan, "b": [1.0, math.nan], "c": {"d": math.nan}}
+    assert json_patch.diff(old, new) == []
+    assert json_patch.diff({"a": math.nan}, {"a": 1.0}) == [
+        {"op": "replace", "path": "/a", "value": 1.0}
+    ]
+
+
+def test_document_hash_ignores_member_order():
+    assert json_patch.document_hash({"a": 1, "b": 2}) == json_patch.document_hash({"b": 2, "a": 1})
+    assert json_patch.document_hash({"a": 1}) != json_patch.document_hash({"a": 2})
+
+
+def test_apply_list_operations():
+    document = {"a": [1, 2, 3]}
+    assert json_patch.apply(document, [{"op": "add", "path": "/a/-", "value": 4}]) == {"a": [1, 2, 3, 4]}
+    assert json_patch.apply(document, [{"op": "add", "path": "/a/3", "value": 4}]) == {"a": [1, 2, 3, 4]}
+    assert json_patch.apply(document, [{"op": "add", "path": "/a/0", "value": 0}]) == {"a": [0, 1, 2, 3]}
+    assert json_patch.apply(document, [{"op": "remove", "path": "/a/1"}]) == {"a": [1, 3]}
+    assert json_patch.apply(document, [{"op": "replace", "path": "/a/2", "value": 5}]) == {"a": [1, 2, 5]}
+    assert document == {"a": [1, 2, 3]}
+
+
+@pytest.mark.parametrize(
+    "operation",
+    [
+        {"op": "add", "path": "/a/4", "value": 5},
+        {"op": "add", "path": "/a/-1", "value": 5},
+        {"op": "replace", "path": "/a/3", "value": 5},
+        {"op": "remove", "path": "/a/3"},
+        {"op": "remove", "path": "/b"},
+        {"op": "replace", "path": "/b", "value": 1},
+        {"op": "add", "path": "/b/c", "value": 1},
+        {"op": "add", "path": "a", "value": 1},
+        {"op": "remove", "path": ""},
+        {"op": "move", "from": "/a", "path": "/b"},
+    ],
+)
+def test_apply_rejects_invalid_operations(operation):
+    with pytest.raises(JsonPatchError):
+        json_patch.apply({"a": [1, 2, 3]}, [operation])
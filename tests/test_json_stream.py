@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from hubbleds.json_stream import iter_array_items
+
+
+DOCUMENT = {
+    "measurements": [
+        {"id": 1, "value": 1.5e-3, "name": "Ωmega ☃", "nested": {"list": [1, 2, [3]]}},
+        {"id": 22, "value": -12345.678, "name": "with \"quotes\" and ] , }", "nested": None},
+        {"id": 333, "value": 1e22, "name": "", "nested": {}},
+    ],
+    "skipped": {"a": [1, 2, 3]},
+    "empty": [],
+    "numbers": [0, 123456789, -1.25e-10, 3.0],
+    "studentData": [{"student_id": 1}, {"student_id": 2}],
+}
+
+EXPECTED = [
+    (key, item)
+    for key, value in DOCUMENT.items()
+    if isinstance(value, list)
+    for item in value
+]
+
+
+def chunked(data: bytes, sizes):
+    position = 0
+    for size in sizes:
+        if position >= len(data):
+            return
+        yield data[position:position + size]
+        position += size
+    if position < len(data):
+        yield data[position:]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64, 1 << 16])
+def test_items_do_not_depend_on_chunk_boundaries(indent, size):
+    data = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode()
+    assert list(iter_array_items(chunked(data, [size] * len(data)))) == EXPECTED
+
+
+def test_items_with_irregular_chunks():
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+    # Splits inside multi-byte characters, numbers and strings, and includes
+    #  empty chunks
+    sizes = [0, 1, 4, 0, 9, 2, 17, 1, 1, 30, 0, 3]
+    for offset in range(len(sizes)):
+        rotated = sizes[offset:] + sizes[:offset]
+        assert list(iter_array_items(chunked(data, rotated * len(data)))) == EXPECTED
+
+
+def test_number_at_chunk_boundary_is_not_cut_short():
+    assert list(iter_array_items([b'{"a": [12', b'34, 5', b'6]}'])) == [("a", 1234), ("a", 56)]
+
+
+def test_empty_object():
+    assert list(iter_array_items([b" { } "])) == []
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'{"a": [1, 2']))
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import json
+
+import httpx
+import pytest
+
+from hubbleds import remote
+from hubbleds.change_tracking import ChangeTracker
+from hubbleds.remote import AsyncLocalAPI, LocalAPI
+from hubbleds.stand_in_server import StandInServer
+from hubbleds.state import ClassSummary, StudentSummary
+
+
+def without_routes(server: StandInServer, method: str, *suffixes: str) -> StandInServer:
+    # The stand-in of an older server, which does not provide these routes
+    server._routes = [
+        route
+        for route in server._routes
+        if not (route[0] == method and route[1].pattern.endswith(suffixes))
+    ]
+    return server
+
+
+def sent(server: StandInServer) -> list[tuple[str, str]]:
+    return [(r.method, r.url.path) for r in server.requests]
+
+
+def test_bulk_measurement_write(server, api, global_state, local_state):
+    tracker = ChangeTracker()
+    assert asyncio.run(api.put_measurements(global_state, local_state, tracker))
+
+    assert sent(server) == [("PUT", "/hubbles_law/submit-measurements/")]
+    assert sorted(server.measurements) == [(7, 1, None), (7, 2, None), (7, 3, None)]
+    assert tracker.changed_measurements(local_state.value.measurements) == []
+
+    # Nothing has changed since, so nothing is sent
+    server.requests.clear()
+    asyncio.run(api.put_measurements(global_state, local_state, tracker))
+    assert sent(server) == []
+
+
+def test_measurement_write_falls_back_to_single_rows(server, global_state, local_state):
+    without_routes(server, "PUT", "submit-measurements/$")
+    api = AsyncLocalAPI(LocalAPI(), transport=server.transport)
+    tracker = ChangeTracker()
+
+    asyncio.run(api.put_measurements(global_state, local_state, tracker))
+
+    assert sent(server) == [("PUT", "/hubbles_law/submit-measurements/")] + [
+        ("PUT", "/hubbles_law/submit-measurement/")
+    ] * 3
+    assert sorted(server.measurements) == [(7, 1, None), (7, 2, None), (7, 3, None)]
+    assert tracker.changed_measurements(local_state.value.measurements) == []
+
+
+def test_sample_measurement_write(server, api, global_state, local_state, make_measurement):
+    examples = [
+        make_measurement(1, measurement_number="first"),
+        make_measurement(1, measurement_number="second"),
+    ]
+    local_state.set(local_state.value.model_copy(update={"example_measurements": examples}))
+
+    asyncio.run(api.put_sample_measurements(global_state, local_state))
+
+    assert sent(server) == [("PUT", "/hubbles_law/submit-sample-measurements/")]
+    assert sorted(server.sample_measurements) == [(7, 1, "first"), (7, 1, "second")]
+
+
+def test_failed_rows_are_not_committed(server, api, global_state, local_state):
+    measurements = local_state.value.measurements
+    # The server reports a result for the first row only
+    response = httpx.Response(200, json={"results": [{"status": 200}]})
+    assert api._api._failed_bulk_measurements(response, measurements) == measurements[1:]
+
+    response = httpx.Response(500, text="error")
+    assert api._api._failed_bulk_measurements(response, measurements) == measurements
+    assert api._api._failed_bulk_measurements(httpx.Response(404), measurements) is None
+
+    tracker = ChangeTracker()
+    api._api._commit_measurements(tracker, measurements, measurements[1:])
+    assert tracker.changed_measurements(measurements) == measurements[1:]
+
+
+def test_measurements_round_trip(server, api, global_state, local_state):
+    written = local_state.value.measurements
+    asyncio.run(api.put_measurements(global_state, local_state))
+    local_state.set(local_state.value.model_copy(update={"measurements": []}))
+
+    loaded = asyncio.run(api.get_measurements(global_state, local_state))
+
+    assert [m.velocity_value for m in loaded] == [m.velocity_value for m in written]
+    assert [m.est_dist_value for m in loaded] == [m.est_dist_value for m in written]
+    assert local_state.value.measurements == loaded
+
+
+def put_story_state(api, global_state, local_state, tracker, **changes):
+    if changes:
+        local_state.set(local_state.value.model_copy(update=changes))
+    return asyncio.run(api.put_story_state(global_state, local_state, tracker))
+
+
+def stored_story_state(server) -> dict:
+    return server.story_states[(7, "hubbles_law")]
+
+
+def test_story_state_delta_write(server, api, global_state, local_state):
+    tracker = ChangeTracker()
+    assert put_story_state(api, global_state, local_state, tracker)
+    assert put_story_state(api, global_state, local_state, tracker, last_route="stage-2")
+
+    assert [method for method, _ in sent(server)] == ["PUT", "PATCH"]
+    patch = json.loads(server.requests[-1].content)["patch"]
+    assert all(operation["path"].endswith("/last_route") for operation in patch)
+    assert stored_story_state(server)["story"]["last_route"] == "stage-2"
+
+
+def test_story_state_base_mismatch_writes_full_state(server, api, global_state, local_state):
+    tracker = ChangeTracker()
+    put_story_state(api, global_state, local_state, tracker)
+    # Written by another session in the meantime
+    stored_story_state(server)["story"]["title"] = "Changed elsewhere"
+
+    assert put_story_state(api, global_state, local_state, tracker, last_route="stage-2")
+
+    assert [method for method, _ in sent(server)] == ["PUT", "PATCH", "PUT"]
+    assert stored_story_state(server)["story"]["title"] == local_state.value.title
+    assert stored_story_state(server)["story"]["last_route"] == "stage-2"
+
+    # The full write is the base of the next patch
+    put_story_state(api, global_state, local_state, tracker, last_route="stage-3")
+    assert sent(server)[-1][0] == "PATCH"
+    assert stored_story_state(server)["story"]["last_route"] == "stage-3"
+
+
+def test_story_state_patch_unsupported_writes_full_state(server, global_state, local_state):
+    without_routes(server, "PATCH", "(?P<story>[^/]+)$")
+    api = AsyncLocalAPI(LocalAPI(), transport=server.transport)
+    tracker = ChangeTracker()
+
+    put_story_state(api, global_state, local_state, tracker)
+    assert put_story_state(api, global_state, local_state, tracker, last_route="stage-2")
+    assert [method for method, _ in sent(server)] == ["PUT", "PATCH", "PUT"]
+    assert stored_story_state(server)["story"]["last_route"] == "stage-2"
+
+    # Once turned down, patches are not tried again
+    put_story_state(api, global_state, local_state, tracker, last_route="stage-3")
+    assert [method for method, _ in sent(server)] == ["PUT", "PATCH", "PUT", "PUT"]
+
+
+def test_sync_calls_from_a_running_loop_share_a_thread(api):
+    sync = api._api
+
+    async def where():
+        return threading.current_thread().name, id(asyncio.get_running_loop())
+
+    async def main():
+        return [sync._run(where()) for _ in range(3)]
+
+    places = asyncio.run(main())
+    assert len(set(places)) == 1
+    assert places[0][0].startswith("hubbleds-api-sync")
+
+
+def test_single_measurement_read(server, api, global_state, local_state):
+    asyncio.run(api.put_measurements(global_state, local_state))
+    server.requests.clear()
+
+    measurement = asyncio.run(api.get_measurement(2, global_state, local_state))
+
+    assert sent(server) == [("GET", "/hubbles_law/measurements/7/2")]
+    assert measurement["velocity_value"] == 2000.0
+    assert local_state.value.measurements[-1] is measurement
+
+
+def test_all_data_is_streamed(monkeypatch, server, api, global_state, local_state, make_measurement):
+    # Small chunks, so that rows are cut off between them
+    monkeypatch.setattr(remote, "STREAM_CHUNK_SIZE", 7)
+    server.all_data["measurements"] = [
+        make_measurement(i, class_id=None if i == 3 else 1, velocity_value=100.0 * i).model_dump(mode="json")
+        for i in range(1, 4)
+    ]
+    server.all_data["studentData"] = [StudentSummary(student_id=7, age_value=13.5).model_dump(mode="json")]
+    server.all_data["classData"] = [
+        ClassSummary(class_id=1, age_value=14.0, hubble_fit_value=70.0).model_dump(mode="json")
+    ]
+
+    measurements, students, classes = asyncio.run(api.get_all_data(global_state, local_state))
+
+    assert sent(server) == [("GET", "/hubbles_law/all-data")]
+    # Measurements without a class are dropped
+    assert measurements.velocity_value.tolist() == [100.0, 200.0]
+    assert [s.age_value for s in students] == [13.5]
+    assert [c.hubble_fit_value for c in classes] == [70.0]
+    assert local_state.value.all_measurements is measurements
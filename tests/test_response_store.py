@@ -0,0 +1,100 @@
+import pytest
+import solara
+
+from hubbleds import response_store
+from hubbleds.response_store import FREE_RESPONSES, MC_SCORES, ResponseStore
+from hubbleds.state import LocalState
+
+
+@pytest.fixture
+def store():
+    # A store of its own, so that the variables of its tags start out unset
+    return ResponseStore("free_responses", "responses", response_store._free_response)
+
+
+@pytest.fixture
+def local_state():
+    return solara.reactive(LocalState())
+
+
+def listen(variable) -> list:
+    values = []
+    variable.subscribe(values.append)
+    return values
+
+
+def test_entries_are_replaced_rather_than_changed(store, local_state):
+    first = store.ensure(local_state, "a", 1)
+    other = store.ensure(local_state, "b", 1)
+
+    updated = store.update(local_state, "a", {"response": "text"}, 2)
+
+    assert first == {"tag": "a", "response": "", "initialized": True, "stage": 1}
+    assert updated == {**first, "response": "text"}
+    assert store.get(local_state, "a") is updated
+    # Untouched entries are shared with the previous mapping
+    assert store.get(local_state, "b") is other
+
+
+def test_update_notifies_only_the_tag(store, local_state):
+    store.ensure(local_state, "a", 1)
+    store.ensure(local_state, "b", 1)
+    state_values = listen(local_state)
+    a_values = listen(store.entry("a"))
+    b_values = listen(store.entry("b"))
+
+    store.update(local_state, "a", {"response": "text"}, 1, quiet=True)
+
+    assert state_values == []
+    assert [entry["response"] for entry in a_values] == ["text"]
+    assert b_values == []
+    assert store.watch(local_state, "a")["response"] == "text"
+
+    store.update(local_state, "a", {"response": "more"}, 1)
+    assert len(state_values) == 1
+    assert local_state.value.free_responses["responses"]["a"]["response"] == "more"
+
+
+def test_unchanged_update_notifies_nothing(store, local_state):
+    store.update(local_state, "a", {"response": "text"}, 1)
+    state_values = listen(local_state)
+    a_values = listen(store.entry("a"))
+
+    store.update(local_state, "a", {"response": "text"}, 1)
+
+    assert state_values == a_values == []
+
+
+def test_quiet_updates_request_a_story_write(monkeypatch, store, local_state):
+    monkeypatch.setattr(solara, "get_kernel_id", lambda: "kernel")
+    writes = []
+    cleanup = response_store.register_story_writer(lambda: writes.append(True))
+
+    store.update(local_state, "a", {"response": "text"}, 1, quiet=True)
+    store.update(local_state, "a", {"response": "more"}, 1)
+    assert writes == [True]
+
+    cleanup()
+    store.update(local_state, "a", {"response": "again"}, 1, quiet=True)
+    assert writes == [True]
+
+
+def test_sync_sets_tags_from_the_local_state(store, local_state):
+    store.ensure(local_state, "a", 1)
+    loaded = {"responses": {"a": {"tag": "a", "response": "loaded", "stage": 1}}}
+    local_state.set(local_state.value.model_copy(update={"free_responses": loaded}))
+
+    store.sync(local_state)
+
+    assert store.entry("a").value["response"] == "loaded"
+
+
+def test_question_completed(local_state):
+    assert not local_state.value.question_completed("fr")
+    FREE_RESPONSES.update(local_state, "fr", {"response": "text"}, 1, quiet=True)
+    assert local_state.value.question_completed("fr")
+
+    MC_SCORES.ensure(local_state, "mc", 1)
+    assert not local_state.value.question_completed("mc")
+    MC_SCORES.update(local_state, "mc", {"score": 10}, 1)
+    assert local_state.value.question_completed("mc")
@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from hubbleds import serialization
+from hubbleds.serialization import encode_json, splice_object
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_non_finite_floats_are_encoded_as_null(encoder):
+    value = {
+        "nan": float("nan"),
+        "inf": float("-inf"),
+        "numpy": np.float64("nan"),
+        "array": np.array([1.5, np.nan]),
+        "nested": [{"x": float("nan")}, (2.0, float("inf"))],
+    }
+
+    encoded = encode_json(value)
+
+    assert json.loads(encoded) == {
+        "nan": None,
+        "inf": None,
+        "numpy": None,
+        "array": [1.5, None],
+        "nested": [{"x": None}, [2.0, None]],
+    }
+
+
+def test_encoders_agree(encoder):
+    value = {"name": "Hα", "count": 3, "value": 0.25, "ok": True, "none": None, 1: [1, 2]}
+    assert encode_json(value) == '{"name":"Hα","count":3,"value":0.25,"ok":true,"none":null,"1":[1,2]}'.encode()
+
+
+def test_splice_object(encoder):
+    fragments = {"a": encode_json([1, 2]), "b": encode_json({"c": None})}
+    assert json.loads(splice_object(fragments)) == {"a": [1, 2], "b": {"c": None}}
+
+
+def test_fragments_are_only_encoded_again_once_changed():
+    class Model(BaseModel):
+        title: str = "story"
+        responses: dict = {}
+
+    cache = serialization.FieldFragmentCache()
+    model = Model(responses={"a": {"response": "x"}})
+    assert json.loads(cache.encode(model)) == model.model_dump()
+    assert (cache.encoded, cache.reused) == (2, 0)
+
+    cache.encode(model)
+    assert (cache.encoded, cache.reused) == (2, 2)
+
+    # Changed in place
+    model.responses["a"]["response"] = "y"
+    assert json.loads(cache.encode(model)) == model.model_dump()
+    assert (cache.encoded, cache.reused) == (3, 3)
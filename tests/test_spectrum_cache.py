@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from hubbleds.spectrum_cache import SpectrumCache
+
+
+def arrays(points: int = 100, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    loglam = np.linspace(3.6, 3.9, points)
+    return loglam, rng.random(points), rng.random(points)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SpectrumCache(tmp_path / "spectra", hot_size=2, packs=[])
+
+
+def test_put_and_get(cache):
+    loglam, flux, ivar = arrays()
+
+    spectrum = cache.put("galaxy_1.fits", "Sp", loglam, flux, ivar)
+
+    assert cache.get("galaxy_1.fits", "Sp") is spectrum
+    assert cache.get("galaxy_1.fits", "E") is None
+    assert spectrum.wave.dtype == np.float32
+    np.testing.assert_allclose(spectrum.wave, 10**loglam, rtol=1e-6)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_spectra_are_read_back_from_disk(cache, tmp_path):
+    loglam, flux, ivar = arrays()
+    spectrum = cache.put("galaxy_1.fits", "Sp", loglam, flux, ivar)
+
+    # A new process finds the spectra an earlier one left behind
+    fresh = SpectrumCache(tmp_path / "spectra", packs=[])
+    assert fresh.cached("galaxy_1.fits", "Sp")
+    loaded = fresh.get("galaxy_1.fits", "Sp")
+
+    np.testing.assert_array_equal(loaded.flux, spectrum.flux)
+    np.testing.assert_array_equal(loaded.ivar, spectrum.ivar)
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_hot_spectra_are_bounded(cache):
+    for i in range(3):
+        cache.put(f"galaxy_{i}.fits", "Sp", *arrays(seed=i))
+
+    assert cache.stats()["hot_entries"] == 2
+    # Evicted from memory, but still on disk
+    cache.get("galaxy_0.fits", "Sp")
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = SpectrumCache(tmp_path, hot_size=0, packs=[])
+    cache.put("galaxy_0.fits", "Sp", *arrays())
+    size = cache.stats()["disk_bytes"]
+    cache.max_bytes = 2 * size
+
+    cache.put("galaxy_1.fits", "Sp", *arrays(seed=1))
+    cache.get("galaxy_0.fits", "Sp")
+    cache.put("galaxy_2.fits", "Sp", *arrays(seed=2))
+
+    stats = cache.stats()
+    assert stats["disk_entries"] == 2
+    assert stats["disk_bytes"] <= cache.max_bytes
+    assert cache.cached("galaxy_0.fits", "Sp")
+    assert not cache.cached("galaxy_1.fits", "Sp")
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "Sp_galaxy_0.npz",
+        "Sp_galaxy_2.npz",
+    ]
+
+
+def test_unreadable_files_are_discarded(cache, tmp_path):
+    cache.put("galaxy_1.fits", "Sp", *arrays())
+    path = tmp_path / "spectra" / "Sp_galaxy_1.npz"
+    path.write_bytes(b"not a spectrum")
+
+    fresh = SpectrumCache(tmp_path / "spectra", packs=[])
+
+    assert fresh.get("galaxy_1.fits", "Sp") is None
+    assert not path.exists()
+    assert fresh.stats()["misses"] == 1
+
+
+def test_downloads_are_shared(cache):
+    future, first = cache.download("galaxy_1.fits", "Sp")
+    again, second = cache.download("galaxy_1.fits", "Sp")
+
+    assert first and not second
+    assert again is future
+
+    cache.finish_download("galaxy_1.fits", "Sp")
+    _, third = cache.download("galaxy_1.fits", "Sp")
+    assert third
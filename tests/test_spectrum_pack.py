@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hubbleds.spectrum_cache import SpectrumCache
+from hubbleds.spectrum_pack import PackedSpectra, pack_spectra, spectrum_key
+
+
+def write_fits(path, points: int, seed: int, coadd: bool = True):
+    rng = np.random.default_rng(seed)
+    columns = [
+        fits.Column(name="loglam", format="E", array=np.linspace(3.6, 3.9, points)),
+        fits.Column(name="flux", format="E", array=rng.random(points)),
+        fits.Column(name="ivar", format="E", array=rng.random(points)),
+    ]
+    table = fits.BinTableHDU.from_columns(columns, name="COADD" if coadd else "OTHER")
+    fits.HDUList([fits.PrimaryHDU(), table]).writeto(path)
+    return path
+
+
+@pytest.fixture
+def fits_files(tmp_path):
+    return [write_fits(tmp_path / f"galaxy_{i}.fits", 50 + i, seed=i) for i in range(3)]
+
+
+def test_spectrum_key():
+    assert spectrum_key("galaxy_1.fits", "Sp") == "Sp_galaxy_1"
+
+
+def test_round_trip(tmp_path, fits_files):
+    output = tmp_path / "spiral.spectra"
+    skipped = write_fits(tmp_path / "no_coadd.fits", 10, seed=9, coadd=False)
+
+    assert pack_spectra([*fits_files, skipped], output, "Sp") == 3
+
+    packed = PackedSpectra(output)
+    assert len(packed) == 3
+    assert "Sp_galaxy_1" in packed
+    assert packed.get("galaxy_1.fits", "E") is None
+    assert packed.get("no_coadd.fits", "Sp") is None
+
+    for path in fits_files:
+        spectrum = packed.get(path.name, "Sp")
+        with fits.open(path) as hdulist:
+            data = hdulist["COADD"].data
+            assert spectrum.name == path.name
+            np.testing.assert_allclose(spectrum.wave, 10 ** data["loglam"], rtol=1e-6)
+            np.testing.assert_array_equal(spectrum.flux, data["flux"])
+            np.testing.assert_array_equal(spectrum.ivar, data["ivar"])
+
+
+def test_empty_pack(tmp_path):
+    output = tmp_path / "empty.spectra"
+
+    assert pack_spectra([], output, "Sp") == 0
+    assert len(PackedSpectra(output)) == 0
+
+
+def test_not_a_pack(tmp_path):
+    path = tmp_path / "other.spectra"
+    path.write_bytes(b"something else")
+
+    with pytest.raises(ValueError):
+        PackedSpectra(path)
+
+
+def test_cache_serves_packed_spectra(tmp_path, fits_files):
+    output = tmp_path / "spiral.spectra"
+    pack_spectra(fits_files, output, "Sp")
+    cache = SpectrumCache(tmp_path / "cache", packs=[output, tmp_path / "missing.spectra"])
+
+    assert cache.cached("galaxy_0.fits", "Sp")
+    spectrum = cache.get("galaxy_0.fits", "Sp")
+
+    assert cache.get("galaxy_0.fits", "Sp") is spectrum
+    assert cache.stats()["pack_hits"] == 1
+    # Packed spectra are never written to the cache directory
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,35 @@
+from hubbleds.galaxy_catalog import GalaxyCatalog
+from hubbleds.spectrum_prefetch import nearest_galaxies
+from hubbleds.state import GalaxyData
+
+
+def catalog(positions):
+    return GalaxyCatalog.from_galaxies(
+        GalaxyData(
+            id=i, name=f"galaxy_{i}.fits", ra=ra, decl=decl, z=0.01, type="Sp", element="H-α"
+        )
+        for i, (ra, decl) in enumerate(positions, start=1)
+    )
+
+
+def test_nearest_galaxies_closest_first():
+    galaxies = catalog([(10, 0), (40, 0), (11, 0), (200, 0), (10, 3)])
+
+    nearest = nearest_galaxies(10, 0, galaxies, count=3)
+
+    assert [g.id for g in nearest] == [1, 3, 5]
+
+
+def test_nearest_galaxies_wrap_around():
+    galaxies = catalog([(359, 0), (5, 0), (180, 0)])
+
+    assert [g.id for g in nearest_galaxies(1, 0, galaxies, count=2)] == [1, 2]
+
+
+def test_nearest_galaxies_exclude():
+    galaxies = catalog([(10, 0), (11, 0), (20, 0)])
+
+    assert [g.id for g in nearest_galaxies(10, 0, galaxies, count=5, exclude=1)] == [2, 3]
+    assert nearest_galaxies(10, 0, catalog([(10, 0)]), count=2, exclude=1) == []
+    assert nearest_galaxies(10, 0, galaxies, count=0) == []
+    assert nearest_galaxies(10, 0, catalog([]), count=2) == []
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+from astropy.modeling import fitting, models
+from cosmicds.utils import percent_around_center_indices
+
+from hubbleds import utils
+from hubbleds.utils import (
+    AGE_TABLE_H0_RANGE,
+    _exact_age_in_gyr,
+    age_in_gyr,
+    age_in_gyr_simple,
+    data_summary_for_component,
+    data_version,
+    fit_line,
+    grouped_hubble_fit,
+)
+
+
+def astropy_fit(x, y, weights=None, fit_intercept=False):
+    model = models.Linear1D(slope=1, intercept=0, fixed={"intercept": not fit_intercept})
+    return fitting.LinearLSQFitter()(model, x, y, weights=weights)
+
+
+def slope_error(x, y, weights=None, fit_intercept=False):
+    # Standard error of the slope from the weighted normal equations
+    w2 = np.ones_like(x) if weights is None else np.asarray(weights) ** 2
+    design = np.column_stack([x, np.ones_like(x)] if fit_intercept else [x])
+    normal = design.T @ (w2[:, None] * design)
+    coefficients = np.linalg.solve(normal, design.T @ (w2 * y))
+    residuals = y - design @ coefficients
+    variance = (w2 * residuals**2).sum() / (len(x) - design.shape[1])
+    return np.sqrt(variance * np.linalg.inv(normal)[0, 0])
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(42)
+    x = rng.uniform(10, 500, 40)
+    y = 70 * x + rng.normal(0, 2000, 40) + 300
+    weights = rng.uniform(0.5, 2, 40)
+    return x, y, weights
+
+
+@pytest.mark.parametrize("fit_intercept", [False, True])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_fit_line_matches_astropy(points, fit_intercept, weighted):
+    x, y, weights = points
+    weights = weights if weighted else None
+
+    line = fit_line(x, y, weights=weights, fit_intercept=fit_intercept)
+    expected = astropy_fit(x, y, weights=weights, fit_intercept=fit_intercept)
+
+    assert line.count == len(x)
+    assert line.slope == pytest.approx(expected.slope.value, rel=1e-9)
+    assert line.intercept == pytest.approx(expected.intercept.value, rel=1e-9, abs=1e-9)
+    assert line.slope_error == pytest.approx(
+        slope_error(x, y, weights, fit_intercept), rel=1e-9
+    )
+    assert line(2.0) == pytest.approx(expected(2.0), rel=1e-9)
+
+
+def test_fit_line_skips_missing_points(points):
+    x, y, _ = points
+    x_missing, y_missing = x.copy(), y.copy()
+    x_missing[3] = np.nan
+    y_missing[7] = np.nan
+
+    line = fit_line(x_missing, y_missing)
+    keep = np.ones(len(x), dtype=bool)
+    keep[[3, 7]] = False
+
+    assert line.count == len(x) - 2
+    assert line.slope == pytest.approx(astropy_fit(x[keep], y[keep]).slope.value, rel=1e-9)
+
+
+def test_fit_line_without_enough_points():
+    assert np.isnan(fit_line([], []).slope)
+    assert np.isnan(fit_line([1.0], [2.0], fit_intercept=True).slope)
+
+    line = fit_line([2.0], [4.0])
+    assert line.slope == pytest.approx(2.0)
+    assert np.isnan(line.slope_error)
+
+
+def test_grouped_hubble_fit_matches_astropy(points):
+    x, y, _ = points
+    ids = np.arange(len(x)) % 4
+    ids[-1] = 9
+    y = y.copy()
+    y[5] = np.nan
+
+    fit = grouped_hubble_fit(ids, x, y)
+
+    np.testing.assert_array_equal(fit.ids, [0, 1, 2, 3, 9])
+    for i, group in enumerate(fit.ids):
+        used = (ids == group) & np.isfinite(y)
+        expected = astropy_fit(x[used], y[used])
+        assert fit.count[i] == used.sum()
+        assert fit.hubble_fit_value[i] == pytest.approx(expected.slope.value, rel=1e-9)
+        assert fit.age_value[i] == age_in_gyr_simple(fit.hubble_fit_value[i])
+        if used.sum() > 1:
+            residuals = y[used] - expected(x[used])
+            rms = np.sqrt((residuals**2).sum() / (used.sum() - 1))
+            assert fit.scatter[i] == pytest.approx(rms, rel=1e-9)
+        else:
+            assert np.isnan(fit.scatter[i])
+
+
+def test_grouped_hubble_fit_of_empty_group():
+    fit = grouped_hubble_fit([1, 1, 2], [10.0, 20.0, np.nan], [700.0, 1400.0, 500.0])
+    assert fit.count.tolist() == [2, 0]
+    assert fit.hubble_fit_value[0] == pytest.approx(70.0)
+    assert np.isnan(fit.hubble_fit_value[1])
+
+
+def test_age_in_gyr_error_bound():
+    low, high = AGE_TABLE_H0_RANGE
+    # Between the table points as well as on them
+    h0 = np.geomspace(low, high, 301)
+    ages = age_in_gyr(h0)
+    exact = np.array([_exact_age_in_gyr(h) for h in h0])
+
+    assert np.max(np.abs(ages - exact) / exact) < 1e-4
+
+
+def test_age_in_gyr_outside_table():
+    h0 = np.array([5.0, 500.0])
+    np.testing.assert_allclose(age_in_gyr(h0), [_exact_age_in_gyr(h) for h in h0], rtol=1e-12)
+    assert np.isnan(age_in_gyr(0))
+    assert np.isnan(age_in_gyr(-70))
+    assert np.ndim(age_in_gyr(70)) == 0
+
+
+class SummaryData:
+    # The parts of a glue `Data` that summaries read
+    def __init__(self, values):
+        self.values = np.asarray(values)
+        self.size = self.values.size
+
+    def __getitem__(self, component_id):
+        return self.values
+
+    def compute_statistic(self, statistic, component_id):
+        return getattr(np, statistic)(self.values)
+
+
+def test_data_summary_ranges_match_a_full_sort(monkeypatch):
+    monkeypatch.setattr(utils, "mode", lambda data, component_id: None)
+    data = SummaryData(np.random.default_rng(3).normal(13.8, 2, 101))
+
+    summary = data_summary_for_component(data, "age")
+
+    ordered = np.sort(data.values)
+    for percent in (50, 68, 95):
+        bottom, top = percent_around_center_indices(data.size, percent)
+        assert summary[f"{percent}%"] == (ordered[bottom], ordered[top])
+    assert summary["median"] == np.median(data.values)
+
+
+def test_data_version():
+    values = np.arange(5.0)
+    assert data_version(values) == data_version(values.copy())
+    assert data_version(values) != data_version(values[::-1])
+    assert data_version(values) != data_version(values.astype(np.float32))
+    assert data_version(values, values) != data_version(values)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from hubbleds.utils import DISTANCE_CONSTANT
+from hubbleds.validation import validate_measurement_list, validate_measurements
+
+
+def test_one_mask_per_rule():
+    rest = 6565.0
+    z = np.array([0.02, 0.02, 0.02, 0.02, 0.02])
+    obs_wave = np.array([rest * 1.02, rest * 1.05, np.nan, rest * 1.02, rest * 1.02])
+    ang_size = np.array([60.0, 60.0, np.nan, 1.0, 60.0])
+    est_dist = np.round(DISTANCE_CONSTANT / ang_size)
+    est_dist[4] += 10
+
+    masks = validate_measurements(obs_wave, np.full(5, rest), z, ang_size, est_dist)
+
+    np.testing.assert_array_equal(masks.missing_wavelength, [0, 0, 1, 0, 0])
+    np.testing.assert_array_equal(masks.bad_redshift, [0, 1, 0, 0, 0])
+    np.testing.assert_array_equal(masks.bad_angular_size, [0, 0, 0, 1, 0])
+    np.testing.assert_array_equal(masks.bad_distance, [0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(masks.any_bad, [0, 1, 0, 1, 1])
+
+
+def test_measurement_list(make_measurement):
+    rest = make_measurement(1).rest_wave_value
+    good = make_measurement(
+        1,
+        obs_wave_value=rest * 1.01,
+        ang_size_value=60,
+        est_dist_value=round(DISTANCE_CONSTANT / 60),
+    )
+    empty = make_measurement(2)
+    negative = make_measurement(3, est_dist_value=-5.0)
+
+    masks = validate_measurement_list([good, empty, negative])
+
+    np.testing.assert_array_equal(masks.missing_wavelength, [0, 1, 1])
+    np.testing.assert_array_equal(masks.any_bad, [0, 0, 1])
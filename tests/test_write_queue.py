@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import solara
+
+from hubbleds.write_queue import Snapshot, WriteBehindQueue
+
+
+class Recorder:
+    """
+    A queued write that records its arguments, and how many of its calls
+    ran at once.
+    """
+
+    def __init__(self, duration: float = 0.0, success: bool = True):
+        self.duration = duration
+        self.success = success
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, *args, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.duration)
+        self.running -= 1
+        self.calls.append((args, kwargs))
+        return self.success
+
+
+def test_burst_is_written_once(api):
+    queue = WriteBehindQueue(window=0.05, api=api)
+    write = Recorder()
+
+    for value in range(5):
+        queue.submit("story", write, value, tag="fr")
+    time.sleep(0.3)
+
+    assert write.calls == [((4,), {"tag": "fr"})]
+    metrics = queue.metrics()
+    assert metrics["submitted"] == 5
+    assert metrics["coalesced"] == 4
+    assert metrics["written"] == 1
+    assert metrics["depth"] == 0
+    assert metrics["flush_latency_last"] >= 0.05
+
+
+def test_keys_are_written_separately(api):
+    queue = WriteBehindQueue(window=0.05, api=api)
+    write = Recorder()
+
+    queue.submit("story", write, 1)
+    queue.submit("stage-1", write, 2)
+    queue.flush().result(timeout=5)
+
+    assert sorted(args for args, _ in write.calls) == [(1,), (2,)]
+
+
+def test_flush_skips_the_window(api):
+    queue = WriteBehindQueue(window=60, api=api)
+    write = Recorder()
+
+    queue.submit("story", write, 1)
+    queue.flush().result(timeout=5)
+
+    assert write.calls == [((1,), {})]
+    assert queue.depth == 0
+
+
+def test_one_write_per_key_in_flight(api):
+    queue = WriteBehindQueue(window=0.0, api=api)
+    write = Recorder(duration=0.1)
+
+    queue.submit("story", write, 1)
+    time.sleep(0.05)
+    # Sent once the first write completes
+    queue.submit("story", write, 2)
+    queue.flush().result(timeout=5)
+
+    assert [args for args, _ in write.calls] == [(1,), (2,)]
+    assert write.max_running == 1
+    assert queue.metrics()["written"] == 2
+
+
+def test_reactive_arguments_are_snapshots(api):
+    queue = WriteBehindQueue(window=60, api=api)
+    write = Recorder()
+    state = solara.reactive(1)
+
+    queue.submit("story", write, state, other=state)
+    # Changes after queueing are not written
+    state.set(2)
+    queue.flush().result(timeout=5)
+
+    [(args, kwargs)] = write.calls
+    assert isinstance(args[0], Snapshot) and args[0].value == 1
+    assert kwargs["other"].value == 1
+
+
+def test_failed_writes_are_counted(api):
+    queue = WriteBehindQueue(window=60, api=api)
+
+    async def raises():
+        raise RuntimeError("no database")
+
+    queue.submit("story", Recorder(success=False))
+    queue.submit("stage-1", raises)
+    queue.flush().result(timeout=5)
+
+    metrics = queue.metrics()
+    assert metrics["failed"] == 2
+    assert metrics["written"] == 0
+    assert metrics["flush_latency_last"] is None